@@ -0,0 +1,3 @@
+"""
+Benchmarks for LLM Chat Indexer.
+"""
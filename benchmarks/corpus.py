@@ -0,0 +1,175 @@
+"""
+Synthetic chat corpus generator for the LLM Chat Indexer benchmarks.
+
+Writes reproducible chat exports in all supported formats (.txt, .md, .json,
+.html, .csv) with configurable file count, chat length and share of duplicate
+chats, so pipeline throughput can be measured on corpora of any size.
+"""
+
+import os
+import csv
+import json
+import random
+import argparse
+from datetime import datetime, timedelta
+from html import escape
+
+FORMATS = (".txt", ".md", ".json", ".html", ".csv")
+
+TOPICS = {
+    "machine learning": ["model", "training", "overfitting", "features", "validation", "gradient descent"],
+    "web development": ["React", "CSS grid", "REST API", "caching", "deployment", "accessibility"],
+    "databases": ["index", "query plan", "transaction", "replication", "schema migration", "PostgreSQL"],
+    "cooking": ["recipe", "oven temperature", "sourdough", "spices", "meal prep", "knife skills"],
+    "travel": ["itinerary", "train tickets", "visa", "budget", "museums", "packing list"],
+    "finance": ["budgeting", "index funds", "interest rate", "taxes", "emergency fund", "mortgage"],
+}
+
+USER_TEMPLATES = [
+    "Can you explain how {a} relates to {b}?",
+    "I'm stuck with {a}. What should I check first?",
+    "What's the difference between {a} and {b} in {topic}?",
+    "Could you give me an example of {a}?",
+    "Is {a} worth learning before {b}?",
+]
+ASSISTANT_TEMPLATES = [
+    "Good question. In {topic}, {a} usually comes first because it shapes how you approach {b}.",
+    "Start by looking at {a}. Most problems with {b} come from a small mistake there.",
+    "{a} and {b} solve different problems: the first is about structure, the second about behaviour.",
+    "Here is a short example: imagine you are working on {a} and need to adjust {b} along the way.",
+    "It depends on your goals, but understanding {a} makes {b} much easier later on.",
+]
+CODE_SNIPPET = "```python\nfor epoch in range(10):\n    loss = train_step(batch)\n    print(f'epoch {epoch}: {loss:.3f}')\n```"
+
+
+def generate_chat(rng, messages, start=None, code_ratio=0.1):
+    """
+    Generate one synthetic conversation.
+
+    Args:
+        rng (random.Random): Random source
+        messages (int): Number of messages
+        start (datetime, optional): Time of the first message
+        code_ratio (float): Share of assistant messages followed by a code snippet
+
+    Returns:
+        list: (role, text, timestamp) tuples
+    """
+    topic = rng.choice(sorted(TOPICS))
+    terms = TOPICS[topic]
+    time = start or datetime(2025, 1, 1) + timedelta(minutes=rng.randrange(500000))
+    chat = []
+    for i in range(messages):
+        role = "User" if i % 2 == 0 else "Assistant"
+        template = rng.choice(USER_TEMPLATES if role == "User" else ASSISTANT_TEMPLATES)
+        a, b = rng.sample(terms, 2)
+        text = template.format(a=a, b=b, topic=topic)
+        if role == "Assistant" and rng.random() < code_ratio:
+            text += "\n" + CODE_SNIPPET
+        chat.append((role, text, time.isoformat()))
+        time += timedelta(seconds=rng.randrange(20, 600))
+    return chat
+
+
+def render(chat, ext):
+    """
+    Render a conversation in one of the supported export formats.
+
+    Args:
+        chat (list): (role, text, timestamp) tuples
+        ext (str): Target extension
+
+    Returns:
+        str: File content; CSV is written separately by ``write_chat``
+    """
+    if ext == ".txt":
+        return "\n".join(f"{role}: {text}".replace("\n", " ") for role, text, _ in chat) + "\n"
+    if ext == ".md":
+        return "## Conversation\n\n" + "\n\n".join(f"**{role}**: {text}".replace("\n", " ") for role, text, _ in chat) + "\n"
+    if ext == ".json":
+        return json.dumps(
+            {"messages": [{"role": role.lower(), "content": text, "timestamp": ts} for role, text, ts in chat]}, indent=1
+        )
+    if ext == ".html":
+        body = "\n".join(f"<p>{escape(role)}: {escape(text)}</p>" for role, text, _ in chat)
+        return f"<html><body>\n{body}\n</body></html>\n"
+    raise ValueError(f"Unsupported format: {ext}")
+
+
+def write_chat(path, chat):
+    """Write a conversation to ``path`` in the format given by its extension."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["role", "message", "timestamp"])
+            writer.writerows((role.lower(), text, ts) for role, text, ts in chat)
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(render(chat, ext))
+
+
+def generate_corpus(
+    output_dir, files=100, formats=FORMATS, min_messages=4, max_messages=40, duplicate_ratio=0.0, seed=0
+):
+    """
+    Write a synthetic corpus.
+
+    Args:
+        output_dir (str): Directory to write chat files to
+        files (int): Number of files
+        formats (tuple): Extensions to cycle through
+        min_messages (int): Fewest messages per chat
+        max_messages (int): Most messages per chat
+        duplicate_ratio (float): Share of files that repeat an earlier chat in another format
+        seed (int): Random seed; the same arguments always produce the same corpus
+
+    Returns:
+        dict: File count, total messages and bytes, per format
+    """
+    rng = random.Random(seed)
+    os.makedirs(output_dir, exist_ok=True)
+    chats = []
+    stats = {"files": 0, "messages": 0, "bytes": 0, "by_format": {ext: 0 for ext in formats}}
+    for i in range(files):
+        ext = formats[i % len(formats)]
+        if chats and rng.random() < duplicate_ratio:
+            chat = rng.choice(chats)
+        else:
+            chat = generate_chat(rng, rng.randint(min_messages, max_messages))
+            chats.append(chat)
+        path = os.path.join(output_dir, f"chat_{i:06d}{ext}")
+        write_chat(path, chat)
+        stats["files"] += 1
+        stats["messages"] += len(chat)
+        stats["bytes"] += os.path.getsize(path)
+        stats["by_format"][ext] += 1
+    return stats
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Generate a synthetic chat corpus")
+    parser.add_argument("output_dir", help="Directory to write chat files to")
+    parser.add_argument("--files", type=int, default=100, help="Number of files")
+    parser.add_argument("--formats", default=",".join(FORMATS), help="Comma-separated extensions")
+    parser.add_argument("--min-messages", type=int, default=4, help="Fewest messages per chat")
+    parser.add_argument("--max-messages", type=int, default=40, help="Most messages per chat")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.0, help="Share of duplicate chats")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    stats = generate_corpus(
+        args.output_dir,
+        files=args.files,
+        formats=tuple(ext.strip() for ext in args.formats.split(",") if ext.strip()),
+        min_messages=args.min_messages,
+        max_messages=args.max_messages,
+        duplicate_ratio=args.duplicate_ratio,
+        seed=args.seed,
+    )
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
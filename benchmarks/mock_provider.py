@@ -0,0 +1,140 @@
+"""
+Local mock LLM provider for the LLM Chat Indexer benchmarks.
+
+Serves an OpenAI-compatible chat completions endpoint on localhost that
+answers topic, summary and batch prompts in the format the pipeline expects,
+after a configurable latency and with a configurable rate of 429/503 errors.
+"""
+
+import re
+import json
+import time
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Model name to use with litellm once ``OPENAI_API_BASE`` points at the server
+MOCK_MODEL = "openai/mock-model"
+
+
+def _answer(messages):
+    """Build an answer matching the prompt type, as a well-behaved model would."""
+    prompt = messages[-1]["content"] if messages else ""
+    batch = re.match(r"For each of the (\d+) chat conversations", prompt)
+    if batch:
+        keywords = int(re.search(r"extract exactly (\d+) key topics", prompt).group(1))
+        return json.dumps(
+            [
+                {"id": i, "topics": [f"topic {t}" for t in range(1, keywords + 1)], "summary": f"Conversation {i} summary."}
+                for i in range(1, int(batch.group(1)) + 1)
+            ]
+        )
+    topics = re.match(r"Extract exactly (\d+) key topics", prompt)
+    if topics:
+        return ", ".join(f"topic {t}" for t in range(1, int(topics.group(1)) + 1))
+    return "The participants discussed the subject and agreed on next steps."
+
+
+class MockCompletionHandler(BaseHTTPRequestHandler):
+    """Chat completions endpoint with injected latency and errors."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            failed = server.random.random() < server.error_rate
+            latency = max(0.0, server.random.gauss(server.latency, server.latency_jitter))
+        time.sleep(latency)
+
+        if failed:
+            with server.lock:
+                server.errors += 1
+            status = server.random.choice((429, 503))
+            body = {"error": {"message": "Injected mock provider error", "type": "mock_error", "code": status}}
+        else:
+            messages = request.get("messages", [])
+            content = _answer(messages)
+            prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4
+            completion_tokens = max(1, len(content) // 4)
+            status = 200
+            body = {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "mock-model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            }
+
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockProvider:
+    """Mock provider running in a background thread."""
+
+    def __init__(self, latency=0.05, latency_jitter=0.0, error_rate=0.0, seed=0):
+        """
+        Initialize the provider; call ``start`` or use it as a context manager.
+
+        Args:
+            latency (float): Mean seconds before each answer
+            latency_jitter (float): Standard deviation of the latency
+            error_rate (float): Share of requests answered with HTTP 429 or 503
+            seed (int): Random seed for latencies and errors
+        """
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), MockCompletionHandler)
+        self.server.daemon_threads = True
+        self.server.latency = latency
+        self.server.latency_jitter = latency_jitter
+        self.server.error_rate = error_rate
+        self.server.random = random.Random(seed)
+        self.server.lock = threading.Lock()
+        self.server.requests = 0
+        self.server.errors = 0
+        self._thread = None
+
+    @property
+    def base_url(self):
+        """OpenAI-compatible base URL of the running server."""
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def start(self):
+        """Start serving in a background thread."""
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the server."""
+        self.server.shutdown()
+        self.server.server_close()
+
+    def snapshot(self):
+        """
+        Summarize the requests served.
+
+        Returns:
+            dict: Request and injected error counts
+        """
+        return {"requests": self.server.requests, "injected_errors": self.server.errors}
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
@@ -0,0 +1,362 @@
+"""
+Throughput benchmark for LLM Chat Indexer.
+
+Generates a synthetic corpus, parses it, and runs the full
+``discover_and_process_files`` pipeline against a local mock provider,
+reporting files/sec, tokens/sec, request latency percentiles and peak RSS
+per stage as JSON, optionally compared against an earlier result.
+
+Usage:
+    python -m benchmarks.run --files 500 --latency 0.05 --error-rate 0.02 --output results.json
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import importlib.util
+from contextlib import contextmanager
+import numpy as np
+
+from benchmarks.corpus import FORMATS, generate_corpus
+from benchmarks.mock_provider import MOCK_MODEL, MockProvider
+from src.config import Config
+from src.budget import RunBudget
+from src.circuit_breaker import CircuitBreaker
+from src.file_parser import parse_path
+from src.http_pool import HTTPPool
+from src.llm_client import LLMClient, estimate_tokens
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Lower is better for these metrics when comparing results
+LOWER_IS_BETTER = ("seconds", "latency_p50", "latency_p95", "peak_rss_mb")
+
+
+class TimedLLMClient(LLMClient):
+    """LLMClient that records the latency of every provider call."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latencies = []
+        self._latency_lock = threading.Lock()
+
+    def _timed(self, start):
+        with self._latency_lock:
+            self.latencies.append(time.monotonic() - start)
+
+    def _call_provider(self, model, messages):
+        start = time.monotonic()
+        try:
+            return super()._call_provider(model, messages)
+        finally:
+            self._timed(start)
+
+    async def _acall_provider(self, model, messages):
+        start = time.monotonic()
+        try:
+            return await super()._acall_provider(model, messages)
+        finally:
+            self._timed(start)
+
+
+def _load_pipeline():
+    """Import chat-indexer.py, whose file name is not a valid module name."""
+    spec = importlib.util.spec_from_file_location("chat_indexer", os.path.join(REPO_ROOT, "chat-indexer.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _reset_peak_rss():
+    """Reset the kernel's peak RSS counter so the next stage is measured on its own (Linux only)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb():
+    """Peak resident set size of this process in MiB."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in KiB on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+@contextmanager
+def stage(results, name, files):
+    """
+    Time a benchmark stage and record its peak memory.
+
+    Args:
+        results (dict): Stage results, keyed by stage name
+        name (str): Stage name
+        files (int): Files handled by the stage, for files/sec
+
+    Yields:
+        dict: Stage result to add metrics to
+    """
+    result = {"files": files}
+    resettable = _reset_peak_rss()
+    start = time.perf_counter()
+    yield result
+    seconds = time.perf_counter() - start
+    result["seconds"] = round(seconds, 4)
+    result["files_per_sec"] = round(files / seconds, 2) if seconds else None
+    if "tokens" in result:
+        result["tokens_per_sec"] = round(result["tokens"] / seconds, 1) if seconds else None
+    result["peak_rss_mb"] = round(_peak_rss_mb() or 0.0, 1)
+    # Without a resettable counter the peak is the process peak so far
+    result["peak_rss_scope"] = "stage" if resettable else "process"
+    results[name] = result
+
+
+@contextmanager
+def _overrides(obj, **values):
+    """Temporarily set attributes (Config settings) or, for ``os.environ``, variables."""
+    is_env = obj is os.environ
+    saved = {key: (obj.get(key) if is_env else getattr(obj, key)) for key in values}
+    for key, value in values.items():
+        if is_env:
+            obj[key] = value
+        else:
+            setattr(obj, key, value)
+    try:
+        yield
+    finally:
+        for key, value in saved.items():
+            if not is_env:
+                setattr(obj, key, value)
+            elif value is None:
+                obj.pop(key, None)
+            else:
+                obj[key] = value
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(
+    files=200,
+    formats=FORMATS,
+    min_messages=4,
+    max_messages=40,
+    duplicate_ratio=0.0,
+    latency=0.05,
+    latency_jitter=0.0,
+    error_rate=0.0,
+    rate_limit_delay=0.0,
+    batch_token_budget=0,
+    dedup=False,
+    seed=0,
+    work_dir=None,
+):
+    """
+    Run all benchmark stages.
+
+    Args:
+        files (int): Files in the synthetic corpus
+        formats (tuple): Extensions to generate
+        min_messages (int): Fewest messages per chat
+        max_messages (int): Most messages per chat
+        duplicate_ratio (float): Share of duplicate chats
+        latency (float): Mean mock provider latency in seconds
+        latency_jitter (float): Standard deviation of the mock latency
+        error_rate (float): Share of mock requests failing with 429/503
+        rate_limit_delay (float): LLMClient delay between requests
+        batch_token_budget (int): Batch small chats into shared requests (0 disables)
+        dedup (bool): Enable duplicate detection
+        seed (int): Random seed for the corpus and the mock provider
+        work_dir (str, optional): Directory for the corpus and index; a temporary one when omitted
+
+    Returns:
+        dict: Parameters, environment and per-stage metrics
+    """
+    params = {key: value for key, value in locals().items() if key != "work_dir"}
+    params["formats"] = list(formats)
+    stages = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = work_dir or tmp
+        corpus_dir = os.path.join(work_dir, "corpus")
+        output_dir = os.path.join(work_dir, "output")
+
+        with stage(stages, "generate", files) as result:
+            corpus = generate_corpus(
+                corpus_dir, files, formats, min_messages, max_messages, duplicate_ratio=duplicate_ratio, seed=seed
+            )
+            result["messages"] = corpus["messages"]
+            result["bytes"] = corpus["bytes"]
+
+        chat_files = sorted(os.path.join(corpus_dir, name) for name in os.listdir(corpus_dir))
+        with stage(stages, "parse", files) as result:
+            messages = tokens = 0
+            for file_path in chat_files:
+                parsed = parse_path(file_path, Config.LARGE_FILE_THRESHOLD, Config.PARSE_WORKERS)
+                messages += len(parsed)
+                tokens += sum(estimate_tokens(str(message)) for message in parsed)
+            result["messages"] = messages
+            result["tokens"] = tokens
+
+        pipeline = _load_pipeline()
+        logger = logging.getLogger("LLMChatIndexer")
+        with MockProvider(latency, latency_jitter, error_rate, seed) as provider, _overrides(
+            os.environ, OPENAI_API_KEY="benchmark", OPENAI_API_BASE=provider.base_url, OPENAI_BASE_URL=provider.base_url
+        ), _overrides(Config, OUTPUT_DIR=output_dir, BATCH_TOKEN_BUDGET=batch_token_budget, DEDUP_ENABLED=dedup):
+            budget = RunBudget()
+            client = TimedLLMClient(
+                MOCK_MODEL,
+                rate_limit_delay=rate_limit_delay,
+                batch_token_budget=batch_token_budget,
+                budget=budget,
+                request_timeout=Config.REQUEST_TIMEOUT or None,
+                http_pool=HTTPPool(http2=False) if Config.HTTP_POOL_ENABLED else None,
+                circuit_breaker=CircuitBreaker() if Config.CIRCUIT_BREAKER_ENABLED else None,
+            )
+            try:
+                with stage(stages, "pipeline", files) as result:
+                    processed = pipeline.discover_and_process_files(corpus_dir, list(formats), client, logger)
+                    usage = budget.snapshot()["total"]
+                    result["tokens"] = usage["input_tokens"] + usage["output_tokens"]
+            finally:
+                client.close()
+
+            latencies = np.array(client.latencies) if client.latencies else np.zeros(1)
+            served = provider.snapshot()
+            result.update(
+                {
+                    "indexed_entries": len(processed),
+                    "requests": usage["requests"],
+                    "provider_calls": len(client.latencies),
+                    "degraded_calls": client.degraded_calls,
+                    "latency_p50": round(float(np.percentile(latencies, 50)), 4),
+                    "latency_p95": round(float(np.percentile(latencies, 95)), 4),
+                    "served_requests": served["requests"],
+                    "injected_errors": served["injected_errors"],
+                }
+            )
+
+    return {
+        "benchmark": params,
+        "environment": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "stages": stages,
+    }
+
+
+def compare(result, baseline, tolerance=0.1):
+    """
+    Relative change of each shared metric against a baseline result.
+
+    Args:
+        result (dict): Current benchmark result
+        baseline (dict): Earlier benchmark result
+        tolerance (float): Relative change in the worse direction still treated as noise
+
+    Returns:
+        dict: Per stage, metric -> {"baseline", "current", "change", "regressed"}
+    """
+    changes = {}
+    for name, current in result["stages"].items():
+        previous = baseline.get("stages", {}).get(name, {})
+        for metric in ("seconds", "files_per_sec", "tokens_per_sec", "latency_p50", "latency_p95", "peak_rss_mb"):
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            changes.setdefault(name, {})[metric] = {
+                "baseline": old,
+                "current": new,
+                "change": round(change, 4),
+                "regressed": change > tolerance if metric in LOWER_IS_BETTER else change < -tolerance,
+            }
+    return changes
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark LLM Chat Indexer throughput against a mock provider")
+    parser.add_argument("--files", type=int, default=200, help="Files in the synthetic corpus")
+    parser.add_argument("--formats", default=",".join(FORMATS), help="Comma-separated extensions to generate")
+    parser.add_argument("--min-messages", type=int, default=4, help="Fewest messages per chat")
+    parser.add_argument("--max-messages", type=int, default=40, help="Most messages per chat")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.0, help="Share of duplicate chats")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mean mock provider latency in seconds")
+    parser.add_argument("--latency-jitter", type=float, default=0.0, help="Standard deviation of the mock latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of mock requests failing with 429/503")
+    parser.add_argument("--rate-limit-delay", type=float, default=0.0, help="Client delay between requests")
+    parser.add_argument("--batch-token-budget", type=int, default=0, help="Batch small chats (0 disables)")
+    parser.add_argument("--dedup", action="store_true", help="Enable duplicate detection")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--output", help="Write the JSON result to this file")
+    parser.add_argument("--compare", help="Earlier JSON result to compare against; exits 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Relative change treated as noise when comparing")
+    parser.add_argument("--log-level", default="WARNING", help="Log level of the pipeline")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level)
+    logging.getLogger("LLMChatIndexer").setLevel(args.log_level)
+
+    result = run_benchmark(
+        files=args.files,
+        formats=tuple(ext.strip() for ext in args.formats.split(",") if ext.strip()),
+        min_messages=args.min_messages,
+        max_messages=args.max_messages,
+        duplicate_ratio=args.duplicate_ratio,
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate,
+        rate_limit_delay=args.rate_limit_delay,
+        batch_token_budget=args.batch_token_budget,
+        dedup=args.dedup,
+        seed=args.seed,
+    )
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            result["comparison"] = compare(result, json.load(f), args.tolerance)
+
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    print(output)
+
+    if any(m["regressed"] for metrics in result.get("comparison", {}).values() for m in metrics.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,18 +8,48 @@ Processes chat files to create a searchable index and summary using LLM.
 import os
 import sys
 import glob
+import json
+import time
+import asyncio
 import argparse
+import queue
+import signal
 import logging
+import threading
+from collections import Counter
+from contextlib import nullcontext
 from typing import List
 
 # Add src directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), "src"))
 
 from src.config import Config
-from src.logger import setup_logger
-from src.file_parser import parse_file
-from src.llm_client import LLMClient
-from src.index_builder import build_index, get_timestamp
+from src.logger import setup_logger, log_context
+from src.file_parser import parse_path, MappedLines
+from src.llm_client import LLMClient, estimate_tokens, file_deadline
+from src.router import ProviderRouter
+from src.circuit_breaker import CircuitBreaker
+from src.cascade import CascadePolicy
+from src.planner import build_plan
+from src.concurrency import AdaptiveLimiter
+from src.http_pool import HTTPPool
+from src.cassette import Cassette, LATENCY_MODES as CASSETTE_LATENCY_MODES
+from src.budget import RunBudget, ACTIONS as BUDGET_ACTIONS, STOP, DOWNGRADE
+from src.index_builder import build_index, get_timestamp, StreamingIndexWriter
+from src.segmenter import segment_messages
+from src.dedup import Deduplicator
+from src.watcher import DirectoryWatcher
+from src.work_queue import JobQueue, ROLES as QUEUE_ROLES
+from src.scheduler import schedule, sort_key, POLICIES as SCHEDULE_POLICIES
+from src.sharding import parse_shard, select_shard, shard_filename, write_manifest, merge_shards
+from src.compressor import compress_messages
+from src import metrics
+from src.metrics import RunMetrics
+from src.exporter import MetricsExporter
+from src import progress
+from src.progress import MODES as PROGRESS_MODES
+from src import profiling
+from src.profiling import Profiler, MODES as PROFILE_MODES
 
 
 def parse_arguments():
@@ -36,6 +66,207 @@ def parse_arguments():
         default=",".join(Config.SUPPORTED_FILE_EXTENSIONS),
     )
     parser.add_argument("--llm-provider", type=str, help="LLM provider to use", default=Config.LLM_PROVIDER)
+    parser.add_argument(
+        "--llm-providers",
+        type=str,
+        help='Weighted providers to route between, e.g. "gemini/gemini-2.0-flash=3,openai/gpt-4o-mini=1"',
+        default=Config.LLM_PROVIDERS,
+    )
+    parser.add_argument(
+        "--hedge-percentile",
+        type=float,
+        help="Send a duplicate request when a call runs longer than this latency percentile (0 disables)",
+        default=Config.HEDGE_PERCENTILE,
+    )
+    parser.add_argument(
+        "--cascade-models",
+        type=str,
+        help='Models from cheapest to strongest; answers failing validation escalate, e.g. "gemini/gemini-2.0-flash-lite,gemini/gemini-2.0-flash"',
+        default=Config.CASCADE_MODELS,
+    )
+    parser.add_argument(
+        "--max-input-tokens", type=int, help="Prompt token budget for the run (0 = unlimited)", default=Config.BUDGET_MAX_INPUT_TOKENS
+    )
+    parser.add_argument(
+        "--max-output-tokens",
+        type=int,
+        help="Completion token budget for the run (0 = unlimited)",
+        default=Config.BUDGET_MAX_OUTPUT_TOKENS,
+    )
+    parser.add_argument(
+        "--max-cost", type=float, help="Estimated cost budget in USD for the run (0 = unlimited)", default=Config.BUDGET_MAX_COST
+    )
+    parser.add_argument(
+        "--max-seconds", type=float, help="Wall-clock budget in seconds for the run (0 = unlimited)", default=Config.BUDGET_MAX_SECONDS
+    )
+    parser.add_argument(
+        "--budget-action",
+        type=str,
+        choices=BUDGET_ACTIONS,
+        help="What to do once a budget is exhausted: stop, use offline fallbacks, or downgrade to a cheaper model",
+        default=Config.BUDGET_ACTION,
+    )
+    parser.add_argument(
+        "--batch-token-budget",
+        type=int,
+        help="Pack small chats into multi-document LLM requests of up to this many estimated tokens (0 disables)",
+        default=Config.BATCH_TOKEN_BUDGET,
+    )
+    parser.add_argument(
+        "--dedup",
+        action="store_true",
+        help="Reuse the analysis of earlier chats for exact and near-duplicate chats",
+        default=Config.DEDUP_ENABLED,
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="Shrink chats locally (drop boilerplate, collapse pasted logs, keep key sentences) before the LLM",
+        default=Config.COMPRESS_ENABLED,
+    )
+    parser.add_argument(
+        "--compress-token-budget",
+        type=int,
+        help="Target size in estimated tokens for compressed chats",
+        default=Config.COMPRESS_TOKEN_BUDGET,
+    )
+    parser.add_argument(
+        "--request-timeout",
+        type=float,
+        help="Seconds before a single LLM request is abandoned and retried (0 disables)",
+        default=Config.REQUEST_TIMEOUT,
+    )
+    parser.add_argument(
+        "--file-timeout",
+        type=float,
+        help="Seconds allowed for all LLM requests of one file before it is deferred (0 disables)",
+        default=Config.FILE_TIMEOUT,
+    )
+    parser.add_argument(
+        "--adaptive-concurrency",
+        action="store_true",
+        help="Adapt the number of concurrent LLM requests to observed latency and rate limits",
+        default=Config.ADAPTIVE_CONCURRENCY,
+    )
+    parser.add_argument(
+        "--record-cassette",
+        type=str,
+        help="Record LLM requests, responses and latencies to this cassette file",
+        default=Config.CASSETTE_RECORD,
+    )
+    parser.add_argument(
+        "--replay-cassette",
+        type=str,
+        help="Serve LLM calls from this cassette file instead of the provider",
+        default=Config.CASSETTE_REPLAY,
+    )
+    parser.add_argument(
+        "--replay-latency",
+        type=str,
+        choices=list(CASSETTE_LATENCY_MODES),
+        help="Latency of replayed calls: none, the recorded latency, or sampled from the recording",
+        default=Config.CASSETTE_REPLAY_LATENCY,
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Serve live Prometheus-format metrics on this local port at /metrics (0 disables)",
+        default=Config.METRICS_PORT,
+    )
+    parser.add_argument(
+        "--metrics-file",
+        type=str,
+        help="Rewrite live Prometheus-format metrics to this file periodically",
+        default=Config.METRICS_FILE,
+    )
+    parser.add_argument(
+        "--progress",
+        choices=PROGRESS_MODES,
+        help="Progress display: bar (redrawn status line), log (periodic log lines), auto (bar on a terminal) or off",
+        default=Config.PROGRESS,
+    )
+    parser.add_argument(
+        "--profile",
+        choices=PROFILE_MODES,
+        action="append",
+        help="Profile the run: cpu (sampling profiler), memory (top allocators per stage) or loop "
+        "(asyncio event-loop lag); may be repeated. Results are written next to the index",
+        default=None,
+    )
+    parser.add_argument(
+        "--shard",
+        type=str,
+        help="Only process shard i of N (0 <= i < N, files partitioned by path hash) and write a partial "
+        "index with a manifest for --merge",
+        default=Config.SHARD,
+    )
+    parser.add_argument(
+        "--merge",
+        nargs="+",
+        metavar="SHARD_DIR",
+        help="Merge the partial indexes of all shards found in these directories into the output directory",
+        default=None,
+    )
+    parser.add_argument(
+        "--queue",
+        type=str,
+        metavar="DB_PATH",
+        help="Share the files through a SQLite job table: workers on this or other hosts (on a shared "
+        "filesystem) lease files one at a time",
+        default=Config.QUEUE_PATH,
+    )
+    parser.add_argument(
+        "--queue-role",
+        choices=QUEUE_ROLES,
+        help="coordinator: enqueue the files, wait for the workers and write the index; worker: process "
+        "leased files until the queue is drained; all: both",
+        default="all",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and update the index incrementally as chat files are added, changed or deleted",
+        default=False,
+    )
+    parser.add_argument(
+        "--watch-interval",
+        type=float,
+        help="Seconds between polls of the input directory in watch mode",
+        default=Config.WATCH_INTERVAL,
+    )
+    parser.add_argument(
+        "--schedule",
+        choices=SCHEDULE_POLICIES,
+        help="Order to process files in: discovery, newest (recently modified first), smallest (fast early "
+        "coverage), largest (long chats start early, shortest runtime with concurrent workers) or cached "
+        "(files whose analysis in the index is current first)",
+        default=Config.SCHEDULE,
+    )
+    parser.add_argument(
+        "--priority",
+        nargs="+",
+        metavar="PATH",
+        help="Files, directories or glob patterns to process before all others, in the given order",
+        default=Config.PRIORITY_PATHS,
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Constant-memory run: discover, process and write index entries through bounded queues, "
+        "so memory stays flat however large the corpus is",
+        default=Config.STREAM_ENABLED,
+    )
+    parser.add_argument(
+        "--stream-workers",
+        type=int,
+        help="Files processed concurrently in stream mode",
+        default=Config.STREAM_WORKERS,
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Only parse the corpus and estimate requests, tokens, cost and runtime; no LLM calls are made",
+    )
     parser.add_argument(
         "--log-level",
         type=str,
@@ -43,9 +274,61 @@ def parse_arguments():
         help="Logging level",
         default=Config.LOG_LEVEL,
     )
+    parser.add_argument(
+        "--log-json",
+        action="store_true",
+        help="Write log records as JSON lines with per-file correlation IDs and durations",
+        default=Config.LOG_JSON,
+    )
+    parser.add_argument(
+        "--log-queue",
+        action="store_true",
+        help="Write log records from a background thread instead of the processing threads",
+        default=Config.LOG_QUEUE,
+    )
     return parser.parse_args()
 
 
+def iter_chat_files(directory: str, supported_extensions: List[str]):
+    """
+    Yield chat files with supported extensions from directory as the tree is walked.
+
+    Args:
+        directory (str): Directory to search
+        supported_extensions (List[str]): List of supported file extensions
+
+    Yields:
+        str: File path
+    """
+    # Normalize extensions to ensure they start with a dot
+    normalized_extensions = tuple(ext if ext.startswith(".") else f".{ext}" for ext in supported_extensions)
+
+    # Unlike os.walk, scandir entries are consumed one at a time, so a directory
+    # with millions of files is never listed into memory; the visiting order is the same
+    pending = [directory]
+    while pending:
+        try:
+            entries = os.scandir(pending.pop())
+        except OSError:
+            continue
+        subdirectories = []
+        with entries:
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                    # Like os.walk, symlinked directories are not followed
+                    is_link = is_dir and entry.is_symlink()
+                except OSError:
+                    continue
+                if is_dir:
+                    if not is_link:
+                        subdirectories.append(entry.path)
+                # Check if file has a supported extension
+                elif entry.name.endswith(normalized_extensions):
+                    yield entry.path
+        pending.extend(reversed(subdirectories))
+
+
 def get_chat_files(directory: str, supported_extensions: List[str]) -> List[str]:
     """
     Get all chat files with supported extensions from directory.
@@ -57,23 +340,10 @@ def get_chat_files(directory: str, supported_extensions: List[str]) -> List[str]
     Returns:
         List[str]: List of file paths
     """
-    # More efficient approach using os.walk to scan the directory tree once
-    files = []
-    # Normalize extensions to ensure they start with a dot
-    normalized_extensions = []
-    for ext in supported_extensions:
-        normalized_extensions.append(ext if ext.startswith(".") else f".{ext}")
+    return list(iter_chat_files(directory, supported_extensions))
 
-    # Walk through directory tree once
-    for root, _, filenames in os.walk(directory):
-        for filename in filenames:
-            # Check if file has a supported extension
-            if any(filename.endswith(ext) for ext in normalized_extensions):
-                files.append(os.path.join(root, filename))
-    return files
 
-
-def process_file(file_path: str, llm_client: LLMClient, max_topic_keywords: int) -> dict:
+def process_file(file_path: str, llm_client: LLMClient, max_topic_keywords: int, messages=None) -> dict:
     """
     Process a single chat file.
 
@@ -81,25 +351,25 @@ def process_file(file_path: str, llm_client: LLMClient, max_topic_keywords: int)
         file_path (str): Path to the file
         llm_client (LLMClient): LLM client instance
         max_topic_keywords (int): Maximum number of topics to extract
+        messages (Sequence[str], optional): Already parsed messages; the file is read when omitted
 
     Returns:
         dict: Processed file data
     """
     logger = logging.getLogger("LLMChatIndexer")
-    logger.info(f"Processing file: {file_path}")
+    logger.info("Processing file: %s", file_path)
 
     # Initialize timestamp before try block to avoid UnboundLocalError in exception handler
     timestamp = get_timestamp(file_path)
 
+    owns_messages = messages is None
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            content = f.read()
-
-        messages = parse_file(file_path, content)
+        if owns_messages:
+            messages = parse_path(file_path, Config.LARGE_FILE_THRESHOLD, Config.PARSE_WORKERS)
         timestamp = get_timestamp(file_path)
 
         if not messages:
-            logger.warning(f"No messages extracted from {file_path}")
+            logger.warning("No messages extracted from %s", file_path)
             return {
                 "filename": os.path.basename(file_path),
                 "path": file_path,
@@ -109,11 +379,21 @@ def process_file(file_path: str, llm_client: LLMClient, max_topic_keywords: int)
                 "message_count": 0,
             }
 
+        # Memory-mapped transcripts are only split at idle gaps: size splitting would turn
+        # a multi-GB file into thousands of sessions, each with its own LLM requests
+        max_chars = 0 if isinstance(messages, MappedLines) else Config.SESSION_MAX_CHARS
+        sessions = segment_messages(messages, Config.SESSION_GAP_MINUTES, max_chars, Config.SESSION_MAX_COUNT)
+        if len(sessions) > 1:
+            logger.info("Split %s into %d sessions", file_path, len(sessions))
+            return process_sessions(file_path, timestamp, messages, sessions, llm_client, max_topic_keywords)
+
+        llm_messages = prepare_for_llm(messages)
+
         # Extract topics
-        topics = llm_client.extract_topics(messages, max_topic_keywords)
+        topics = llm_client.extract_topics(llm_messages, max_topic_keywords)
 
         # Generate summary
-        summary = llm_client.summarize(messages)
+        summary = llm_client.summarize(llm_messages)
 
         return {
             "filename": os.path.basename(file_path),
@@ -126,7 +406,7 @@ def process_file(file_path: str, llm_client: LLMClient, max_topic_keywords: int)
 
     except Exception as e:
         # Enhanced error logging with full traceback
-        logger.exception(f"Error processing file {file_path}")
+        logger.exception("Error processing file %s", file_path)
         return {
             "filename": os.path.basename(file_path),
             "path": file_path,
@@ -135,6 +415,451 @@ def process_file(file_path: str, llm_client: LLMClient, max_topic_keywords: int)
             "summary": f"Error processing file: {str(e)}. Check logs for details.",
             "message_count": 0,
         }
+    finally:
+        # Large transcripts are memory-mapped and hold a file handle
+        if owns_messages and hasattr(messages, "close"):
+            messages.close()
+
+
+def prepare_for_llm(messages):
+    """
+    Apply the configured pre-LLM compression to a chat's messages.
+
+    Args:
+        messages (Sequence[str]): Parsed chat messages
+
+    Returns:
+        Sequence[str]: Messages to send to the LLM
+    """
+    if not Config.COMPRESS_ENABLED:
+        return messages
+    compressed = compress_messages(messages, Config.COMPRESS_TOKEN_BUDGET)
+    # A chat consisting only of boilerplate is better sent as-is than not at all
+    return compressed or messages
+
+
+def process_sessions(file_path, timestamp, messages, sessions, llm_client, max_topic_keywords):
+    """
+    Analyze the sessions of a long chat concurrently and build the parent entry.
+
+    Args:
+        file_path (str): Path to the file
+        timestamp (str): File timestamp
+        messages (Sequence[str]): All messages in the file
+        sessions (list): Sessions from segment_messages
+        llm_client (LLMClient): LLM client instance
+        max_topic_keywords (int): Maximum number of topics to extract
+
+    Returns:
+        dict: Parent file entry with session entries under "sessions"
+    """
+    results = asyncio.run(analyze_sessions(messages, sessions, llm_client, max_topic_keywords))
+
+    filename = os.path.basename(file_path)
+    session_entries = []
+    for session, (topics, summary) in zip(sessions, results):
+        session_entries.append({
+            "filename": f"{filename} (session {session['index']})",
+            "path": file_path,
+            "parent": file_path,
+            "session": session["index"],
+            "timestamp": session["start_time"] or timestamp,
+            "start_time": session["start_time"],
+            "end_time": session["end_time"],
+            "topics": topics,
+            "summary": summary,
+            "message_count": session["end"] - session["start"],
+        })
+
+    # Parent topics are the most common session topics; the parent summary
+    # condenses the session summaries instead of the truncated raw chat
+    topic_counts = Counter(topic for entry in session_entries for topic in entry["topics"])
+    topics = [topic for topic, _ in topic_counts.most_common(max_topic_keywords)]
+    summary = llm_client.summarize(
+        [f"Session {entry['session']} ({entry['start_time'] or 'undated'}): {entry['summary']}" for entry in session_entries]
+    )
+
+    return {
+        "filename": filename,
+        "path": file_path,
+        "timestamp": timestamp,
+        "topics": topics,
+        "summary": summary,
+        "message_count": len(messages),
+        "session_count": len(session_entries),
+        "sessions": session_entries,
+    }
+
+
+async def analyze_sessions(messages, sessions, llm_client, max_topic_keywords):
+    """
+    Extract topics and summaries for each session concurrently.
+
+    Args:
+        messages (Sequence[str]): All messages in the file
+        sessions (list): Sessions from segment_messages
+        llm_client (LLMClient): LLM client instance
+        max_topic_keywords (int): Maximum number of topics to extract
+
+    Returns:
+        list: (topics, summary) per session, in session order
+    """
+    # With adaptive concurrency the client's limiter decides how many requests run at once
+    limiter = getattr(llm_client, "concurrency", None)
+    semaphore = asyncio.Semaphore(max(limiter.max_limit if limiter else Config.SESSION_CONCURRENCY, 1))
+
+    async def analyze(session):
+        async with semaphore:
+            session_messages = prepare_for_llm(messages[session["start"] : session["end"]])
+            return await asyncio.gather(
+                llm_client.extract_topics_async(session_messages, max_topic_keywords),
+                llm_client.summarize_async(session_messages),
+            )
+
+    try:
+        async with profiling.watch_loop():
+            return await asyncio.gather(*(analyze(session) for session in sessions))
+    finally:
+        # Pooled connections belong to this loop, which asyncio.run closes on return
+        aclose = getattr(llm_client, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+def process_files_staged(chat_files, llm_client, max_topic_keywords, logger, deduplicator=None):
+    """
+    Process files through the optional pre-LLM stages: deduplication and batching.
+
+    Each file is parsed once. Exact and near duplicates of an earlier chat
+    (when a ``deduplicator`` is given) reuse that chat's analysis. When
+    ``Config.BATCH_TOKEN_BUDGET`` is set, chats with at most
+    ``Config.BATCH_MAX_MESSAGES`` messages are queued until their estimated
+    tokens fill the client's batch budget and then analyzed together. All
+    other chats go through ``process_file`` as usual.
+
+    Args:
+        chat_files (List[str]): Files to process
+        llm_client (LLMClient): LLM client instance
+        max_topic_keywords (int): Maximum number of topics to extract
+        logger (logging.Logger): Logger instance
+        deduplicator (Deduplicator, optional): Duplicate registry; None disables deduplication
+
+    Returns:
+        List[dict]: Index entries for all files
+    """
+    processed_files = []
+    duplicates = []
+    pending = []
+    pending_tokens = 0
+    batching = Config.BATCH_TOKEN_BUDGET > 0
+
+    def flush():
+        nonlocal pending_tokens
+        # The queue is emptied even when the batch fails, so later chats do not resend it
+        try:
+            logger.info(f"Analyzing {len(pending)} small chats in batched requests")
+            degraded_before = _degraded_count(llm_client)
+            budget = getattr(llm_client, "budget", None)
+            documents = [prepare_for_llm(messages) for _, _, messages in pending]
+            file_paths = [file_path for file_path, _, _ in pending]
+            usage_scope = budget.file_scope(file_paths) if budget is not None else nullcontext()
+            with metrics.file_scope(file_paths), usage_scope, file_deadline(Config.FILE_TIMEOUT):
+                results = llm_client.analyze_documents(documents, max_topic_keywords)
+            degraded = _degraded_count(llm_client) > degraded_before
+            for (file_path, timestamp, messages), (topics, summary) in zip(pending, results):
+                entry = {
+                    "filename": os.path.basename(file_path),
+                    "path": file_path,
+                    "timestamp": timestamp,
+                    "topics": topics,
+                    "summary": summary,
+                    "message_count": len(messages),
+                }
+                if degraded:
+                    entry["degraded"] = True
+                usage = budget.file_usage(file_path) if budget is not None else None
+                if usage:
+                    entry["usage"] = usage
+                processed_files.append(entry)
+            file_completed(file_paths)
+        finally:
+            pending.clear()
+            pending_tokens = 0
+            metrics.gauge("batch_queue_depth", 0)
+
+    for position, file_path in enumerate(chat_files):
+        if stop_requested(llm_client, logger, len(chat_files) - position):
+            break
+        messages = []
+        try:
+            canonical = None
+            with metrics.file_scope(file_path):
+                messages = parse_path(file_path, Config.LARGE_FILE_THRESHOLD, Config.PARSE_WORKERS)
+                if deduplicator is not None:
+                    with metrics.timed("dedup"):
+                        canonical, kind = deduplicator.check(file_path, messages)
+
+            if canonical:
+                metrics.count("dedup_hits")
+                file_completed(file_path)
+                logger.info(f"Skipping {file_path}: {kind} duplicate of {canonical}")
+                duplicates.append((file_path, get_timestamp(file_path), len(messages), canonical, kind))
+                continue
+
+            if batching and 0 < len(messages) <= Config.BATCH_MAX_MESSAGES and isinstance(messages, list):
+                pending.append((file_path, get_timestamp(file_path), messages))
+                pending_tokens += estimate_tokens("\n".join(messages))
+                metrics.gauge("batch_queue_depth", len(pending))
+                if pending_tokens >= llm_client.batch_token_budget:
+                    flush()
+                continue
+
+            file_data = process_file_tracked(file_path, llm_client, max_topic_keywords, messages=messages)
+            processed_files.extend(flatten_sessions(file_data))
+            file_completed(file_path)
+        except Exception as e:
+            logger.exception(f"Error processing file {file_path}: {str(e)}")
+        finally:
+            if hasattr(messages, "close"):
+                messages.close()
+
+    if pending and _cancelled(llm_client):
+        logger.warning(f"Run cancelled; {len(pending)} queued small chats were not processed")
+    elif pending:
+        try:
+            flush()
+        except Exception as e:
+            logger.exception(f"Error processing batched chats: {str(e)}")
+
+    if duplicates:
+        processed_files.extend(resolve_duplicates(duplicates, processed_files))
+        logger.info(f"Reused analysis for {len(duplicates)} duplicate chats")
+
+    return processed_files
+
+
+def resolve_duplicates(duplicates, processed_files):
+    """
+    Build index entries for duplicate chats from their canonical chat's analysis.
+
+    Args:
+        duplicates (list): (file_path, timestamp, message_count, canonical_path, kind) tuples
+        processed_files (List[dict]): Entries of the canonical chats
+
+    Returns:
+        List[dict]: Entries for the duplicate chats
+    """
+    canonical_entries = {entry["path"]: entry for entry in processed_files if "parent" not in entry}
+    entries = []
+    for file_path, timestamp, message_count, canonical, kind in duplicates:
+        canonical_entry = canonical_entries.get(canonical, {})
+        entries.append({
+            "filename": os.path.basename(file_path),
+            "path": file_path,
+            "timestamp": timestamp,
+            "topics": list(canonical_entry.get("topics", [])),
+            "summary": canonical_entry.get("summary", "No summary available"),
+            "message_count": message_count,
+            "duplicate_of": canonical,
+            "duplicate_type": kind,
+        })
+    return entries
+
+
+def _degraded_count(llm_client):
+    """Number of LLM calls the client has answered with offline fallbacks so far."""
+    return getattr(llm_client, "degraded_calls", 0)
+
+
+def process_file_tracked(file_path, llm_client, max_topic_keywords, **kwargs):
+    """
+    Process a file and flag the result if any LLM call fell back to offline output.
+
+    Args:
+        file_path (str): Path to the file
+        llm_client (LLMClient): LLM client instance
+        max_topic_keywords (int): Maximum number of topics to extract
+        **kwargs: Passed on to process_file
+
+    Returns:
+        dict: Processed file data, with "degraded" set when fallbacks were used
+    """
+    logger = logging.getLogger("LLMChatIndexer")
+    degraded_before = _degraded_count(llm_client)
+    budget = getattr(llm_client, "budget", None)
+    usage_scope = budget.file_scope(file_path) if budget is not None else nullcontext()
+    start = time.perf_counter()
+    with log_context(file_path), metrics.file_scope(file_path), usage_scope, file_deadline(Config.FILE_TIMEOUT) as deadline:
+        file_data = process_file(file_path, llm_client, max_topic_keywords, **kwargs)
+        duration = time.perf_counter() - start
+        logger.info("Finished %s in %.2fs", file_path, duration, extra={"duration": round(duration, 4)})
+
+    if budget is not None:
+        usage = budget.file_usage(file_path, release=Config.STREAM_ENABLED)
+        if usage:
+            file_data["usage"] = usage
+    if _degraded_count(llm_client) > degraded_before:
+        file_data["degraded"] = True
+        if deadline is not None and time.monotonic() >= deadline:
+            logger.warning("%s exceeded its %.0fs deadline; deferring it to the end of the run", file_path, Config.FILE_TIMEOUT)
+    return file_data
+
+
+def file_completed(file_paths):
+    """
+    Count files as done for the run metrics and the progress display.
+
+    Args:
+        file_paths (str | list): Path of a finished file, or the paths of a finished batch
+    """
+    metrics.count("files_completed", 1 if isinstance(file_paths, str) else len(file_paths))
+    progress.advance(file_paths)
+
+
+def _cancelled(llm_client):
+    """Whether the run was cancelled, e.g. by Ctrl-C."""
+    cancel_event = getattr(llm_client, "cancel_event", None)
+    return cancel_event is not None and cancel_event.is_set()
+
+
+def install_interrupt_handler(llm_client, logger):
+    """
+    Make the first Ctrl-C cancel the run cooperatively and the second abort it.
+
+    After the first interrupt no new LLM requests are started, the file in
+    progress is finished with offline fallbacks and the index is written
+    for all completed files.
+
+    Args:
+        llm_client (LLMClient): LLM client instance
+        logger (logging.Logger): Logger instance
+
+    Returns:
+        The previous SIGINT handler, to restore once the run is over
+    """
+
+    def handle_interrupt(signum, frame):
+        if _cancelled(llm_client):
+            raise KeyboardInterrupt
+        logger.warning("Interrupted: writing the index for completed files (press Ctrl-C again to abort)")
+        llm_client.cancel()
+
+    return signal.signal(signal.SIGINT, handle_interrupt)
+
+
+def stop_requested(llm_client, logger, remaining):
+    """
+    Check whether the run was cancelled or its budget is exhausted and configured to stop the run.
+
+    Args:
+        llm_client (LLMClient): LLM client instance
+        logger (logging.Logger): Logger instance
+        remaining (int): Files not processed yet, for the log message, or None
+            if the count is unknown (e.g. while files are still being discovered)
+
+    Returns:
+        bool: True if no further files should be processed
+    """
+    remaining = "the remaining" if remaining is None else remaining
+    if _cancelled(llm_client):
+        logger.warning(f"Run cancelled; {remaining} files were not processed")
+        return True
+    budget = getattr(llm_client, "budget", None)
+    if budget is None or budget.action != STOP or not budget.exceeded():
+        return False
+    logger.warning(f"Stopping early ({budget.exhausted_reason}); {remaining} files were not processed")
+    return True
+
+
+def requeue_degraded(processed_files, llm_client, max_topic_keywords, logger):
+    """
+    Reprocess files whose analysis fell back to offline output during a provider outage.
+
+    Runs once the circuit breaker lets a probe through (waiting at most
+    ``Config.CIRCUIT_REQUEUE_WAIT`` seconds) and stops as soon as the circuit
+    opens again. Files that could not be requeued keep ``"degraded": True``.
+
+    Args:
+        processed_files (List[dict]): Index entries from the main pass
+        llm_client (LLMClient): LLM client instance
+        max_topic_keywords (int): Maximum number of topics to extract
+        logger (logging.Logger): Logger instance
+
+    Returns:
+        List[dict]: Index entries with requeued files replaced
+    """
+    degraded_paths = list(
+        dict.fromkeys(entry["path"] for entry in processed_files if entry.get("degraded") and "duplicate_of" not in entry)
+    )
+    breaker = getattr(llm_client, "circuit_breaker", None)
+    if not degraded_paths or breaker is None:
+        return processed_files
+
+    if _cancelled(llm_client):
+        return processed_files
+
+    budget = getattr(llm_client, "budget", None)
+    if budget is not None and budget.action != DOWNGRADE and budget.exceeded():
+        logger.warning(f"Not requeueing {len(degraded_paths)} degraded files: {budget.exhausted_reason}")
+        return processed_files
+
+    wait = breaker.time_until_probe()
+    if wait > Config.CIRCUIT_REQUEUE_WAIT:
+        logger.warning(
+            f"{len(degraded_paths)} files used offline fallbacks and the provider is still unavailable; "
+            "they stay marked as degraded for a later run"
+        )
+        return processed_files
+    if wait:
+        logger.info(f"Waiting {wait:.0f}s for the provider to recover before requeueing degraded files")
+        time.sleep(wait)
+
+    logger.info(f"Requeueing {len(degraded_paths)} degraded files")
+    replacements = {}
+    for file_path in degraded_paths:
+        try:
+            replacements[file_path] = flatten_sessions(process_file_tracked(file_path, llm_client, max_topic_keywords))
+        except Exception as e:
+            logger.exception(f"Error requeueing file {file_path}: {str(e)}")
+        if breaker.is_open:
+            logger.warning("Provider failed again while requeueing; remaining files stay degraded")
+            break
+
+    result = []
+    for entry in processed_files:
+        replacement = replacements.get(entry["path"])
+        if replacement is None or "duplicate_of" in entry:
+            result.append(entry)
+        elif replacement:
+            # Emit the new parent and session entries in place of the first old one
+            result.extend(replacement)
+            replacements[entry["path"]] = []
+
+    # Duplicates copy their canonical chat's analysis
+    canonical_entries = {entry["path"]: entry for entry in result if "parent" not in entry and "duplicate_of" not in entry}
+    for entry in result:
+        canonical = canonical_entries.get(entry.get("duplicate_of"))
+        if canonical is not None:
+            entry["topics"] = list(canonical.get("topics", []))
+            entry["summary"] = canonical.get("summary", entry["summary"])
+
+    still_degraded = sum(1 for entry in result if entry.get("degraded") and "parent" not in entry)
+    logger.info(f"Requeue finished; {still_degraded} files remain degraded")
+    return result
+
+
+def flatten_sessions(file_data):
+    """
+    Expand a processed file into index entries, one per session after the parent.
+
+    Args:
+        file_data (dict): Processed file data
+
+    Returns:
+        List[dict]: Parent entry followed by its session entries
+    """
+    sessions = file_data.pop("sessions", [])
+    return [file_data] + sessions
 
 
 def main():
@@ -142,7 +867,7 @@ def main():
     args = parse_arguments()
 
     # Set up logger
-    logger = setup_logger(args.log_level, Config.LOG_FILE)
+    logger = setup_logger(args.log_level, Config.LOG_FILE, json_format=args.log_json, use_queue=args.log_queue)
     logger.info("Starting LLM Chat Indexer")
 
     # Process arguments
@@ -160,23 +885,439 @@ def main():
     logger.info(f"Supported extensions: {supported_extensions}")
     logger.info(f"LLM provider: {args.llm_provider}")
 
-    # Ensure API key is set
-    if not Config.LLM_API_KEY:
+    Config.OUTPUT_DIR = output_dir
+    Config.BATCH_TOKEN_BUDGET = args.batch_token_budget
+    Config.DEDUP_ENABLED = args.dedup
+    Config.PROGRESS = args.progress
+    Config.COMPRESS_ENABLED = args.compress
+    Config.COMPRESS_TOKEN_BUDGET = args.compress_token_budget
+
+    if args.merge:
+        merge_run(args.merge, output_dir, logger)
+        return
+
+    if args.stream and (args.watch or args.queue or args.shard):
+        logger.error("--stream cannot be combined with --watch, --queue or --shard")
+        sys.exit(1)
+    Config.STREAM_ENABLED = args.stream
+    Config.STREAM_WORKERS = args.stream_workers
+    Config.SCHEDULE = args.schedule
+    Config.PRIORITY_PATHS = args.priority
+
+    if args.shard:
+        try:
+            shard_index, shard_count = parse_shard(args.shard)
+        except ValueError as e:
+            logger.error(str(e))
+            sys.exit(1)
+        if args.watch or args.queue:
+            logger.error("--shard cannot be combined with --watch or --queue")
+            sys.exit(1)
+        Config.SHARD = args.shard
+        Config.INDEX_FILENAME = shard_filename(Config.INDEX_FILENAME, shard_index, shard_count)
+        Config.SUMMARY_FILENAME = shard_filename(Config.SUMMARY_FILENAME, shard_index, shard_count)
+        if Config.RUN_REPORT_FILENAME:
+            Config.RUN_REPORT_FILENAME = shard_filename(Config.RUN_REPORT_FILENAME, shard_index, shard_count)
+        logger.info(f"Running shard {shard_index} of {shard_count}")
+
+    if args.plan:
+        plan_run(input_dir, output_dir, supported_extensions, args, logger)
+        return
+
+    if args.record_cassette and args.replay_cassette:
+        logger.error("--record-cassette and --replay-cassette cannot be used together")
+        sys.exit(1)
+
+    # Record provider calls, or replay them without network access
+    cassette = None
+    if args.record_cassette:
+        cassette = Cassette(args.record_cassette, mode="record")
+        logger.info(f"Recording LLM calls to {args.record_cassette}")
+    elif args.replay_cassette:
+        try:
+            cassette = Cassette(
+                args.replay_cassette,
+                mode="replay",
+                latency=args.replay_latency,
+                latency_scale=Config.CASSETTE_LATENCY_SCALE,
+            )
+        except (OSError, ValueError) as e:
+            logger.error(f"Cannot replay cassette {args.replay_cassette}: {str(e)}")
+            sys.exit(1)
+
+    replaying = cassette is not None and cassette.replaying
+
+    # Ensure API key is set; replayed runs make no provider calls
+    if not Config.LLM_API_KEY and not replaying:
         logger.error("LLM API key not set. Please set LLM_API_KEY environment variable.")
         sys.exit(1)
 
+    # Route across several providers when configured
+    router = None
+    if args.llm_providers:
+        router = ProviderRouter.from_spec(args.llm_providers, hedge_percentile=args.hedge_percentile)
+        logger.info(f"Routing between providers: {[model for model, _ in router.providers]}")
+
+    # Without explicit hedging, re-issue only stragglers far above the p95 latency, and
+    # only to another provider; a single provider relies on the request and file deadlines
+    if not args.hedge_percentile and Config.STRAGGLER_FACTOR > 0 and router is not None and len(router.providers) > 1:
+        router.hedge_percentile = 95
+        router.hedge_multiplier = Config.STRAGGLER_FACTOR
+
+    # Try cheap models first when a cascade is configured
+    cascade = None
+    if args.cascade_models:
+        cascade = CascadePolicy.from_spec(
+            args.cascade_models,
+            token_threshold=Config.CASCADE_TOKEN_THRESHOLD,
+            complexity_threshold=Config.CASCADE_COMPLEXITY_THRESHOLD,
+        )
+        logger.info(f"Model cascade: {' -> '.join(cascade.tiers)}")
+
+    # Usage accounting, with optional run-level limits
+    try:
+        budget = RunBudget(
+            max_input_tokens=args.max_input_tokens,
+            max_output_tokens=args.max_output_tokens,
+            max_cost=args.max_cost,
+            max_seconds=args.max_seconds,
+            action=args.budget_action,
+            downgrade_model=Config.BUDGET_DOWNGRADE_MODEL or (cascade.tiers[0] if cascade else None),
+        )
+    except ValueError as e:
+        logger.error(f"Invalid budget configuration: {str(e)}")
+        sys.exit(1)
+
+    concurrency = None
+    if args.adaptive_concurrency:
+        concurrency = AdaptiveLimiter(
+            initial=Config.SESSION_CONCURRENCY,
+            min_limit=Config.CONCURRENCY_MIN,
+            max_limit=Config.CONCURRENCY_MAX,
+            latency_spike_factor=Config.LATENCY_SPIKE_FACTOR,
+        )
+
+    # Reuse HTTP connections across provider calls
+    http_pool = None
+    if Config.HTTP_POOL_ENABLED and not replaying:
+        http_pool = HTTPPool(
+            max_connections=Config.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=Config.HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=Config.HTTP_KEEPALIVE_EXPIRY,
+            http2=Config.HTTP2_ENABLED,
+        )
+
+    circuit_breaker = None
+    if Config.CIRCUIT_BREAKER_ENABLED:
+        circuit_breaker = CircuitBreaker(
+            failure_rate_threshold=Config.CIRCUIT_FAILURE_RATE,
+            window=Config.CIRCUIT_WINDOW,
+            min_calls=Config.CIRCUIT_MIN_CALLS,
+            reset_timeout=Config.CIRCUIT_RESET_TIMEOUT,
+        )
+
     # Initialize LLM client
-    llm_client = LLMClient(args.llm_provider)
+    llm_client = LLMClient(
+        router.primary if router else args.llm_provider,
+        batch_token_budget=Config.BATCH_TOKEN_BUDGET,
+        router=router,
+        circuit_breaker=circuit_breaker,
+        cascade=cascade,
+        budget=budget,
+        concurrency=concurrency,
+        request_timeout=args.request_timeout or None,
+        http_pool=http_pool,
+        cassette=cassette,
+    )
+    Config.FILE_TIMEOUT = args.file_timeout
+
+    # Time each stage of the run for the performance report; stream runs keep no per-file records
+    run_metrics = RunMetrics(keep_files=not args.stream)
+    metrics.activate(run_metrics)
+
+    exporter = None
+    if args.metrics_port or args.metrics_file:
+        exporter = MetricsExporter(
+            run_metrics,
+            llm_client,
+            port=args.metrics_port or None,
+            host=Config.METRICS_HOST,
+            path=args.metrics_file or None,
+            interval=Config.METRICS_INTERVAL,
+        )
+        try:
+            exporter.start()
+        except OSError as e:
+            logger.error(f"Cannot start metrics exporter: {str(e)}")
+            sys.exit(1)
+        if exporter.url:
+            logger.info(f"Serving live metrics at {exporter.url}")
+        if args.metrics_file:
+            logger.info(f"Writing live metrics to {args.metrics_file} every {Config.METRICS_INTERVAL:g}s")
+
+    profile_modes = args.profile or [mode.strip() for mode in Config.PROFILE.split(",") if mode.strip()]
+    profiler = None
+    if profile_modes:
+        try:
+            profiler = Profiler(profile_modes, Config.PROFILE_SAMPLE_INTERVAL, Config.LOOP_LAG_THRESHOLD)
+        except ValueError as e:
+            logger.error(f"Invalid profiling configuration: {str(e)}")
+            sys.exit(1)
+        logger.info(f"Profiling run: {', '.join(profile_modes)}")
+        profiler.start()
 
     # Discover files to process
-    processed_files = discover_and_process_files(input_dir, supported_extensions, llm_client, logger)
-    if not processed_files:
+    previous_handler = install_interrupt_handler(llm_client, logger)
+    try:
+        if args.stream:
+            entry_count = stream_and_index(input_dir, supported_extensions, llm_client, logger)
+        elif args.queue:
+            entry_count = len(run_queue(args.queue, args.queue_role, input_dir, supported_extensions, llm_client, logger))
+        elif args.watch:
+            Config.WATCH_INTERVAL = args.watch_interval
+            entry_count = len(watch_and_index(input_dir, supported_extensions, llm_client, logger))
+        else:
+            entry_count = len(discover_and_process_files(input_dir, supported_extensions, llm_client, logger))
+    finally:
+        signal.signal(signal.SIGINT, previous_handler)
+        if exporter:
+            exporter.stop()
+        metrics.activate(None)
+        if profiler:
+            profiler.stop()
+            logger.info(f"Profiles saved to {', '.join(profiler.write(Config.OUTPUT_DIR))}")
+        if http_pool:
+            logger.info(f"HTTP connection pool stats: {http_pool.snapshot()}")
+        llm_client.close()
+
+    if Config.RUN_REPORT_FILENAME:
+        write_run_report(run_metrics, llm_client, logger)
+    if not entry_count:
         logger.error("No files were processed successfully. Exiting.")
         sys.exit(1)
 
+    if llm_client.timed_out_requests:
+        logger.info(f"Timed out requests: {llm_client.timed_out_requests}")
+
+    if router:
+        logger.info(f"Provider routing stats: {router.snapshot()}")
+        if llm_client.hedged_requests:
+            logger.info(f"Hedged requests: {llm_client.hedged_requests}")
+
+    if cascade:
+        logger.info(f"Model cascade stats: {cascade.snapshot()}")
+
+    if concurrency:
+        logger.info(f"Adaptive concurrency stats: {concurrency.snapshot()}")
+
+    usage = budget.snapshot()["total"]
+    logger.info(
+        f"LLM usage: {usage['requests']} requests, {usage['input_tokens']} input / {usage['output_tokens']} output tokens, "
+        f"estimated cost ${usage['cost']:.4f}"
+    )
+
+    if cassette:
+        logger.info(f"Cassette stats: {cassette.snapshot()}")
+
+    if circuit_breaker and circuit_breaker.times_opened:
+        logger.info(f"Circuit breaker stats: {circuit_breaker.snapshot()}")
+
+    if llm_client.cancel_event.is_set():
+        logger.warning(f"Chat indexing cancelled; the index contains {entry_count} completed entries")
+        sys.exit(130)
+
     logger.info("Chat indexing completed successfully")
 
 
+def run_queue(queue_path, role, input_dir, supported_extensions, llm_client, logger, stop_event=None):
+    """
+    Process files through a shared job table instead of a fixed list.
+
+    The coordinator enqueues the discovered files (idempotently, so it can be
+    restarted), waits until every job is done or failed and writes the index
+    from the results the workers stored. Workers lease one file at a time,
+    largest first, renew the lease while processing it and store its index
+    entries; files of crashed workers are reassigned once their lease expires.
+
+    Args:
+        queue_path (str): SQLite job table shared by all processes
+        role (str): "coordinator", "worker" or "all" (both in one process)
+        input_dir (str): Directory containing chat files
+        supported_extensions (List[str]): List of supported file extensions
+        llm_client (LLMClient): LLM client instance
+        logger (logging.Logger): Logger instance
+        stop_event (threading.Event, optional): Stops working or waiting when set; defaults to the
+                                                client's cancel event (the first Ctrl-C)
+
+    Returns:
+        List[dict]: The index entries written (coordinator) or produced by this worker
+    """
+    stop_event = stop_event or getattr(llm_client, "cancel_event", None) or threading.Event()
+    queue = JobQueue(queue_path, Config.QUEUE_LEASE_SECONDS, Config.QUEUE_MAX_ATTEMPTS)
+
+    if role in ("coordinator", "all"):
+        with metrics.timed("discovery"):
+            chat_files = get_chat_files(input_dir, supported_extensions)
+        added = queue.enqueue(chat_files)
+        logger.info(f"Queued {added} new of {len(chat_files)} chat files in {queue_path}")
+
+    processed_files = []
+    if role in ("worker", "all"):
+        logger.info(f"Worker {queue.worker_id} leasing files from {queue_path}")
+        while not stop_event.is_set():
+            file_path = queue.lease()
+            if file_path is None:
+                if queue.drained():
+                    break
+                # Other workers hold the remaining leases; wait in case one of them expires
+                stop_event.wait(Config.QUEUE_POLL_INTERVAL)
+                continue
+            try:
+                with queue.heartbeat(file_path):
+                    entries = flatten_sessions(process_file_tracked(file_path, llm_client, Config.MAX_TOPIC_KEYWORDS))
+            except Exception as e:
+                logger.exception(f"Error processing file {file_path}: {str(e)}")
+                queue.fail(file_path, e)
+                continue
+            if queue.complete(file_path, entries):
+                processed_files.extend(entries)
+                file_completed(file_path)
+        if role == "worker":
+            logger.info(f"Worker finished after {len({entry['path'] for entry in processed_files})} files")
+            return processed_files
+
+    last_counts = None
+    while not queue.drained() and not stop_event.wait(Config.QUEUE_POLL_INTERVAL):
+        counts = queue.counts()
+        if counts != last_counts:
+            logger.info(f"Queue: {counts['done']} done, {counts['leased']} leased, {counts['pending']} pending, "
+                        f"{counts['failed']} failed")
+            last_counts = counts
+
+    counts = queue.counts()
+    if counts["failed"]:
+        logger.warning(f"{counts['failed']} files failed on every attempt; see the jobs table in {queue_path}")
+    processed_files = queue.results()
+    if not processed_files:
+        logger.error("No files were successfully processed")
+        return []
+
+    with profiling.stage("requeue"):
+        processed_files = requeue_degraded(processed_files, llm_client, Config.MAX_TOPIC_KEYWORDS, logger)
+    write_index(processed_files, llm_client)
+    logger.info(f"Index saved to {os.path.join(Config.OUTPUT_DIR, Config.INDEX_FILENAME)}")
+    return processed_files
+
+
+def merge_run(shard_dirs, output_dir, logger):
+    """
+    Merge the partial indexes of a sharded run into the final index and summaries.
+
+    Args:
+        shard_dirs (List[str]): Directories holding the shards' indexes and manifests
+        output_dir (str): Directory to write the merged index to
+        logger (logging.Logger): Logger instance
+    """
+    try:
+        index_data = merge_shards(shard_dirs, Config.INDEX_FILENAME)
+    except (OSError, ValueError, KeyError) as e:
+        logger.error(f"Cannot merge shards: {str(e)}")
+        sys.exit(1)
+    if not build_index(index_data, output_dir, Config.INDEX_FILENAME, Config.SUMMARY_FILENAME):
+        sys.exit(1)
+    logger.info(f"Index saved to {os.path.join(output_dir, Config.INDEX_FILENAME)}")
+    logger.info(f"Summaries saved to {os.path.join(output_dir, Config.SUMMARY_FILENAME)}")
+
+
+def write_run_report(run_metrics, llm_client, logger):
+    """
+    Write the run's performance report next to the index.
+
+    Args:
+        run_metrics (RunMetrics): Metrics recorded during the run
+        llm_client (LLMClient): LLM client instance, for cache and retry counters
+        logger (logging.Logger): Logger instance
+
+    Returns:
+        dict: The report
+    """
+    report = run_metrics.report(llm_client)
+    os.makedirs(Config.OUTPUT_DIR, exist_ok=True)
+    report_path = os.path.join(Config.OUTPUT_DIR, Config.RUN_REPORT_FILENAME)
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    stages = ", ".join(f"{stage} {stats['sum']:.2f}s" for stage, stats in report["stages"].items())
+    logger.info(f"Stage timings: {stages}")
+    logger.info(f"Run report saved to {report_path}")
+    return report
+
+
+def plan_run(input_dir, output_dir, supported_extensions, args, logger):
+    """
+    Estimate the cost and duration of indexing ``input_dir`` without calling the LLM.
+
+    The plan is logged and written to ``plan.json`` in the output directory.
+
+    Args:
+        input_dir (str): Directory containing chat files
+        output_dir (str): Directory to write the plan to
+        supported_extensions (List[str]): List of supported file extensions
+        args (argparse.Namespace): Parsed command line arguments
+        logger (logging.Logger): Logger instance
+
+    Returns:
+        dict: The plan from build_plan
+    """
+    chat_files = get_chat_files(input_dir, supported_extensions)
+    logger.info(f"Planning run over {len(chat_files)} chat files")
+
+    # Price the run with the model most requests go to
+    if args.cascade_models:
+        model = args.cascade_models.split(",")[0].strip()
+    elif args.llm_providers:
+        model = ProviderRouter.from_spec(args.llm_providers).primary
+    else:
+        model = args.llm_provider
+
+    start = time.monotonic()
+    plan = build_plan(
+        chat_files,
+        model,
+        batch_token_budget=Config.BATCH_TOKEN_BUDGET,
+        rate_limit_delay=1.0,  # LLMClient default
+        request_latency=Config.PLAN_REQUEST_LATENCY,
+        concurrency=Config.SESSION_CONCURRENCY,
+        workers=Config.PARSE_WORKERS,
+    )
+    logger.info(f"Planned {len(chat_files)} files in {time.monotonic() - start:.2f}s")
+
+    cost = plan["estimated_cost"]
+    logger.info(
+        f"Plan: {plan['requests']} requests, ~{plan['input_tokens']} input / ~{plan['output_tokens']} output tokens, "
+        f"estimated cost {f'${cost:.4f}' if cost is not None else f'unknown (no price for {model})'}, "
+        f"estimated runtime {plan['estimated_seconds'] / 60:.1f} min"
+    )
+    logger.info(
+        f"Skipped by deduplication: {plan['duplicates']} files; batched: {plan['batched_files']} files; "
+        f"parse errors: {plan['parse_errors']}"
+    )
+
+    if args.max_cost and cost is not None and cost > args.max_cost:
+        logger.warning(f"Estimated cost exceeds the ${args.max_cost:.2f} budget")
+    if args.max_seconds and plan["estimated_seconds"] > args.max_seconds:
+        logger.warning(f"Estimated runtime exceeds the {args.max_seconds:.0f}s budget")
+    if args.max_input_tokens and plan["input_tokens"] > args.max_input_tokens:
+        logger.warning(f"Estimated input tokens exceed the {args.max_input_tokens} token budget")
+
+    os.makedirs(output_dir, exist_ok=True)
+    plan_path = os.path.join(output_dir, "plan.json")
+    with open(plan_path, "w", encoding="utf-8") as f:
+        json.dump(plan, f, indent=2)
+    logger.info(f"Plan saved to {plan_path}")
+    return plan
+
+
 def discover_and_process_files(input_dir, supported_extensions, llm_client, logger):
     """
     Discover and process all chat files in the input directory.
@@ -194,41 +1335,426 @@ def discover_and_process_files(input_dir, supported_extensions, llm_client, logg
     os.makedirs(Config.OUTPUT_DIR, exist_ok=True)
 
     # Get all chat files
-    chat_files = get_chat_files(input_dir, supported_extensions)
+    with metrics.timed("discovery"), profiling.stage("discovery"):
+        chat_files = get_chat_files(input_dir, supported_extensions)
+    metrics.gauge("files_discovered", len(chat_files))
 
     if not chat_files:
         logger.error(f"No chat files found in {input_dir} with extensions: {supported_extensions}")
         return []
 
+    if Config.SHARD:
+        shard_index, shard_count = parse_shard(Config.SHARD)
+        discovered = len(chat_files)
+        chat_files = select_shard(chat_files, input_dir, shard_index, shard_count)
+        logger.info(f"Shard {Config.SHARD} holds {len(chat_files)} of {discovered} chat files")
+        metrics.gauge("files_discovered", len(chat_files))
+        if not chat_files:
+            # Still leave a manifest so the merge knows this shard is complete
+            write_index([], llm_client)
+            write_manifest(Config.OUTPUT_DIR, shard_index, shard_count, input_dir, [], [])
+            return []
+
     logger.info(f"Found {len(chat_files)} chat files to process")
+    scheduled_files = schedule_files(chat_files, logger)
 
     # Process each file
-    processed_files = []
-    for file_path in chat_files:
-        try:
-            file_data = process_file(file_path, llm_client, Config.MAX_TOPIC_KEYWORDS)
-            processed_files.append(file_data)
-        except Exception as e:
-            logger.exception(f"Error processing file {file_path}: {str(e)}")
+    with profiling.stage("processing"), progress.track(scheduled_files, Config.PROGRESS):
+        processed_files = process_chat_files(scheduled_files, llm_client, logger)
 
     if not processed_files:
         logger.error("No files were successfully processed")
         return []
 
+    with profiling.stage("requeue"):
+        processed_files = requeue_degraded(processed_files, llm_client, Config.MAX_TOPIC_KEYWORDS, logger)
+    if scheduled_files != chat_files:
+        processed_files = in_discovery_order(processed_files, chat_files)
+
     # Build index and save results
     logger.info("Building index and generating summaries")
-    index_path = os.path.join(Config.OUTPUT_DIR, Config.INDEX_FILENAME)
-    summary_path = os.path.join(Config.OUTPUT_DIR, Config.SUMMARY_FILENAME)
-
-    build_index({"files": processed_files}, Config.OUTPUT_DIR, Config.INDEX_FILENAME, Config.SUMMARY_FILENAME)
+    write_index(processed_files, llm_client)
 
     logger.info(f"Successfully processed {len(processed_files)} files")
-    logger.info(f"Index saved to {index_path}")
-    logger.info(f"Summaries saved to {summary_path}")
+    logger.info(f"Index saved to {os.path.join(Config.OUTPUT_DIR, Config.INDEX_FILENAME)}")
+    logger.info(f"Summaries saved to {os.path.join(Config.OUTPUT_DIR, Config.SUMMARY_FILENAME)}")
+
+    if Config.SHARD:
+        budget = getattr(llm_client, "budget", None)
+        manifest_path = write_manifest(
+            Config.OUTPUT_DIR,
+            *parse_shard(Config.SHARD),
+            input_dir,
+            chat_files,
+            processed_files,
+            usage=budget.snapshot() if budget is not None else None,
+        )
+        logger.info(f"Shard manifest saved to {manifest_path}")
 
     return processed_files
 
 
+def schedule_files(chat_files, logger):
+    """
+    Order files for processing by ``Config.SCHEDULE`` and ``Config.PRIORITY_PATHS``.
+
+    Args:
+        chat_files (List[str]): Files in discovery order
+        logger (logging.Logger): Logger instance
+
+    Returns:
+        List[str]: The files in processing order
+    """
+    cached = set()
+    if Config.SCHEDULE == "cached":
+        previous = load_index_entries(os.path.join(Config.OUTPUT_DIR, Config.INDEX_FILENAME), logger)
+        cached = {file_path for file_path in chat_files if is_current(previous.get(file_path), file_path)}
+        logger.info(f"{len(cached)} of {len(chat_files)} files have a current analysis in the index")
+    scheduled = schedule(chat_files, Config.SCHEDULE, Config.PRIORITY_PATHS, cached)
+    if Config.PRIORITY_PATHS:
+        logger.info(f"Processing files matching {', '.join(Config.PRIORITY_PATHS)} first")
+    return scheduled
+
+
+def in_discovery_order(processed_files, chat_files):
+    """
+    Put index entries back into discovery order after a scheduled run.
+
+    Args:
+        processed_files (List[dict]): Index entries in processing order
+        chat_files (List[str]): Files in discovery order
+
+    Returns:
+        List[dict]: The entries ordered like their files, sessions right after their parent
+    """
+    position = {file_path: i for i, file_path in enumerate(chat_files)}
+    return sorted(processed_files, key=lambda entry: position.get(entry.get("path"), len(position)))
+
+
+def stream_and_index(input_dir, supported_extensions, llm_client, logger):
+    """
+    Index the input directory in constant memory, writing entries as files finish.
+
+    Discovery, processing and output run as stages connected by queues of at
+    most ``Config.STREAM_QUEUE_SIZE`` items: a thread walks the tree lazily,
+    ``Config.STREAM_WORKERS`` threads process one file each and this thread
+    appends their entries to the index on disk. A full queue blocks the stage
+    feeding it, so a slow provider or disk holds back discovery instead of
+    letting files and results pile up in memory. Files are processed one by
+    one (no batching, deduplication or requeueing of degraded files, which all
+    need the whole corpus in memory). The path queue is ordered by
+    ``Config.SCHEDULE`` and ``Config.PRIORITY_PATHS``, so the schedule applies
+    to the files queued at any one time rather than to the whole corpus.
+
+    Args:
+        input_dir (str): Directory containing chat files
+        supported_extensions (List[str]): List of supported file extensions
+        llm_client (LLMClient): LLM client instance
+        logger (logging.Logger): Logger instance
+
+    Returns:
+        int: Number of index entries written
+    """
+    if Config.BATCH_TOKEN_BUDGET > 0 or Config.DEDUP_ENABLED:
+        logger.warning("Batching and deduplication are not available in stream mode; processing files one by one")
+
+    policy = Config.SCHEDULE
+    if policy == "cached":
+        logger.warning("The cached schedule needs the whole index in memory; stream mode uses discovery order")
+        policy = "discovery"
+    key = sort_key(policy, Config.PRIORITY_PATHS)
+
+    workers = max(1, Config.STREAM_WORKERS)
+    # Items are (key, discovery position, path); the position keeps equal keys in discovery order
+    paths = queue.PriorityQueue(maxsize=Config.STREAM_QUEUE_SIZE)
+    results = queue.Queue(maxsize=Config.STREAM_QUEUE_SIZE)
+    # Set when the writer fails, so blocked stages give up instead of waiting forever
+    abort = threading.Event()
+    discovered = [0]
+
+    def put(items, item):
+        while not abort.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(items):
+        while not abort.is_set():
+            try:
+                return items.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return None
+
+    def discover():
+        try:
+            for file_path in iter_chat_files(input_dir, supported_extensions):
+                if stop_requested(llm_client, logger, None):
+                    break
+                if not put(paths, (key(file_path), discovered[0], file_path)):
+                    break
+                discovered[0] += 1
+                metrics.gauge("files_discovered", discovered[0])
+        except Exception as e:
+            logger.exception(f"Error discovering chat files in {input_dir}: {str(e)}")
+        finally:
+            # End markers sort after every file
+            for _ in range(workers):
+                put(paths, ((float("inf"),), discovered[0], None))
+
+    def work():
+        try:
+            while True:
+                item = get(paths)
+                file_path = item[2] if item is not None else None
+                if file_path is None:
+                    break
+                try:
+                    file_data = process_file_tracked(file_path, llm_client, Config.MAX_TOPIC_KEYWORDS)
+                except Exception as e:
+                    logger.exception(f"Error processing file {file_path}: {str(e)}")
+                    continue
+                if not put(results, flatten_sessions(file_data)):
+                    break
+                file_completed(file_path)
+        finally:
+            put(results, None)
+
+    writer = StreamingIndexWriter(Config.OUTPUT_DIR, Config.INDEX_FILENAME, Config.SUMMARY_FILENAME)
+    threads = [threading.Thread(target=discover, name="stream-discovery", daemon=True)]
+    threads += [threading.Thread(target=work, name=f"stream-worker-{i}", daemon=True) for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    try:
+        finished = 0
+        while finished < workers:
+            entries = results.get()
+            if entries is None:
+                finished += 1
+                continue
+            with metrics.timed("build_index"):
+                for entry in entries:
+                    writer.add(entry)
+    except BaseException:
+        abort.set()
+        writer.abort()
+        raise
+    finally:
+        for thread in threads:
+            thread.join()
+
+    if not writer.count:
+        writer.abort()
+        if discovered[0]:
+            logger.error("No files were successfully processed")
+        else:
+            logger.error(f"No chat files found in {input_dir} with extensions: {supported_extensions}")
+        return 0
+
+    budget = getattr(llm_client, "budget", None)
+    with metrics.timed("build_index"):
+        writer.close({"usage": budget.snapshot()} if budget is not None else None)
+    logger.info(f"Streamed {discovered[0]} files into {writer.count} index entries")
+    logger.info(f"Index saved to {writer.index_path}")
+    logger.info(f"Summaries saved to {writer.summary_path}")
+    return writer.count
+
+
+def process_chat_files(chat_files, llm_client, logger):
+    """
+    Process chat files one by one, or through the staged pipeline when batching or deduplication is on.
+
+    Args:
+        chat_files (List[str]): Files to process
+        llm_client (LLMClient): LLM client instance
+        logger (logging.Logger): Logger instance
+
+    Returns:
+        List[dict]: Index entries for the processed files
+    """
+    if Config.BATCH_TOKEN_BUDGET > 0 or Config.DEDUP_ENABLED:
+        deduplicator = Deduplicator(Config.DEDUP_MAX_DISTANCE) if Config.DEDUP_ENABLED else None
+        return process_files_staged(chat_files, llm_client, Config.MAX_TOPIC_KEYWORDS, logger, deduplicator=deduplicator)
+
+    processed_files = []
+    for position, file_path in enumerate(chat_files):
+        if stop_requested(llm_client, logger, len(chat_files) - position):
+            break
+        try:
+            file_data = process_file_tracked(file_path, llm_client, Config.MAX_TOPIC_KEYWORDS)
+            processed_files.extend(flatten_sessions(file_data))
+            file_completed(file_path)
+        except Exception as e:
+            logger.exception(f"Error processing file {file_path}: {str(e)}")
+    return processed_files
+
+
+def write_index(processed_files, llm_client):
+    """
+    Write the JSON index and the markdown summaries for the given entries.
+
+    Args:
+        processed_files (List[dict]): Index entries
+        llm_client (LLMClient): LLM client instance, for the usage metadata
+    """
+    index_data = {"files": processed_files}
+    budget = getattr(llm_client, "budget", None)
+    if budget is not None:
+        index_data["metadata"] = {"usage": budget.snapshot()}
+
+    with metrics.timed("build_index"), profiling.stage("build_index"):
+        build_index(index_data, Config.OUTPUT_DIR, Config.INDEX_FILENAME, Config.SUMMARY_FILENAME)
+
+
+def load_index_entries(index_path, logger):
+    """
+    Read the entries of an existing index, grouped by chat file.
+
+    Args:
+        index_path (str): Path of the JSON index
+        logger (logging.Logger): Logger instance
+
+    Returns:
+        dict: path -> index entries of that file (parent, sessions or duplicate entry)
+    """
+    if not os.path.exists(index_path):
+        return {}
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            files = json.load(f).get("files", [])
+    except (OSError, ValueError, AttributeError) as e:
+        logger.warning(f"Ignoring unreadable index {index_path}: {str(e)}")
+        return {}
+    entries = {}
+    for entry in files:
+        if isinstance(entry, dict) and entry.get("path"):
+            entries.setdefault(entry["path"], []).append(entry)
+    return entries
+
+
+def is_current(old_entries, file_path):
+    """
+    Whether a file's entries from an earlier index can be reused.
+
+    Args:
+        old_entries (List[dict]): The file's entries in the earlier index, or None
+        file_path (str): Path of the file
+
+    Returns:
+        bool: True if the file is unchanged since and its analysis did not fall back to offline output
+    """
+    return bool(
+        old_entries
+        and old_entries[0].get("timestamp") == get_timestamp(file_path)
+        and not any(entry.get("degraded") for entry in old_entries)
+    )
+
+
+def watch_and_index(input_dir, supported_extensions, llm_client, logger, stop_event=None):
+    """
+    Keep the index up to date with the input directory until stopped.
+
+    On startup, entries of an existing index are reused for files whose
+    modification time is unchanged and whose analysis did not fall back to
+    offline output; everything else is processed in ``Config.SCHEDULE`` order,
+    ``Config.WATCH_BACKLOG_CHUNK`` files at a time, and files added or changed
+    while this backlog is worked through are indexed ahead of the rest of it.
+    Afterwards the directory is polled every ``Config.WATCH_INTERVAL`` seconds,
+    and new or changed files that have settled for ``Config.WATCH_DEBOUNCE``
+    seconds are processed and deleted files dropped, rewriting the index after
+    each batch of changes.
+
+    Args:
+        input_dir (str): Directory containing chat files
+        supported_extensions (List[str]): List of supported file extensions
+        llm_client (LLMClient): LLM client instance, kept warm between changes
+        logger (logging.Logger): Logger instance
+        stop_event (threading.Event, optional): Stops watching when set; defaults to the
+                                                client's cancel event (the first Ctrl-C)
+
+    Returns:
+        List[dict]: Index entries at the time watching stopped
+    """
+    stop_event = stop_event or getattr(llm_client, "cancel_event", None) or threading.Event()
+    os.makedirs(Config.OUTPUT_DIR, exist_ok=True)
+    watcher = DirectoryWatcher(input_dir, supported_extensions, Config.WATCH_DEBOUNCE)
+
+    with metrics.timed("discovery"):
+        chat_files = watcher.prime()
+    metrics.gauge("files_discovered", len(chat_files))
+
+    previous = load_index_entries(os.path.join(Config.OUTPUT_DIR, Config.INDEX_FILENAME), logger)
+    entries = {}
+    stale = []
+    for file_path in chat_files:
+        if is_current(previous.get(file_path), file_path):
+            entries[file_path] = previous[file_path]
+        else:
+            entries[file_path] = []
+            stale.append(file_path)
+    logger.info(f"Watching {input_dir}: {len(chat_files)} chat files, {len(stale)} to (re)process")
+
+    def process(changed, track=True):
+        changed = schedule_files(changed, logger)
+        with progress.track(changed, Config.PROGRESS if track and len(changed) > 1 else "off"):
+            results = process_chat_files(changed, llm_client, logger)
+        fresh = {}
+        for entry in results:
+            fresh.setdefault(entry["path"], []).append(entry)
+        for file_path in changed:
+            if file_path in fresh or file_path not in entries:
+                entries[file_path] = fresh.get(file_path, [])
+
+    def write():
+        metrics.gauge("files_discovered", len(watcher.known))
+        write_index([entry for file_entries in entries.values() for entry in file_entries], llm_client)
+
+    def apply(changed, deleted, track=True):
+        for file_path in deleted:
+            entries.pop(file_path, None)
+        if changed:
+            process(changed, track)
+        write()
+
+    # Work through the startup backlog in chunks, so files added or changed
+    # in the meantime are indexed ahead of the rest of it
+    backlog = schedule_files(stale, logger)
+    last_poll = time.monotonic()
+    with progress.track(backlog, Config.PROGRESS if len(backlog) > 1 else "off"):
+        while backlog and not stop_event.is_set():
+            if time.monotonic() - last_poll >= Config.WATCH_INTERVAL:
+                last_poll = time.monotonic()
+                changed, deleted = watcher.poll()
+                if changed or deleted:
+                    logger.info(
+                        f"Detected {len(changed)} new or changed and {len(deleted)} deleted chat files; "
+                        f"indexing them ahead of {len(backlog)} backlog files"
+                    )
+                    superseded = set(changed).union(deleted)
+                    backlog = [file_path for file_path in backlog if file_path not in superseded]
+                    apply(changed, deleted, track=False)
+            chunk = backlog[: max(1, Config.WATCH_BACKLOG_CHUNK)]
+            del backlog[: len(chunk)]
+            if chunk:
+                process(chunk, track=False)
+    write()
+    logger.info(f"Index up to date; polling for changes every {Config.WATCH_INTERVAL:g}s (Ctrl-C to stop)")
+
+    while not stop_event.wait(Config.WATCH_INTERVAL):
+        changed, deleted = watcher.poll()
+        if not changed and not deleted:
+            continue
+        logger.info(f"Detected {len(changed)} new or changed and {len(deleted)} deleted chat files")
+        start = time.monotonic()
+        apply(changed, deleted)
+        logger.info(f"Index updated in {time.monotonic() - start:.1f}s")
+
+    return [entry for file_entries in entries.values() for entry in file_entries]
+
+
 def ensure_directories():
     """Ensure required directories exist."""
     directories = [
@@ -0,0 +1,191 @@
+"""
+Run budget module for LLM Chat Indexer.
+
+Accounts token usage, estimated cost and wall-clock time of a run per file and
+per provider, using the ``usage`` reported in litellm responses, and decides
+what happens once a configured limit is reached.
+"""
+
+import time
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from litellm import completion_cost
+
+logger = logging.getLogger("LLMChatIndexer")
+
+# What to do once a budget is exhausted
+STOP = "stop"
+FALLBACK = "fallback"
+DOWNGRADE = "downgrade"
+ACTIONS = (STOP, FALLBACK, DOWNGRADE)
+
+# Files whose analysis the current LLM call belongs to; copied into async tasks
+_current_files = contextvars.ContextVar("current_files", default=())
+
+
+def _new_usage():
+    return {"requests": 0, "input_tokens": 0, "output_tokens": 0, "cost": 0.0}
+
+
+def response_usage(response, model):
+    """
+    Read token usage and estimated cost from a litellm response.
+
+    Args:
+        response (ModelResponse): Provider response
+        model (str): Model the request was sent to
+
+    Returns:
+        tuple: (input_tokens, output_tokens, cost); zeros where the provider reported nothing
+    """
+    usage = getattr(response, "usage", None)
+    input_tokens = getattr(usage, "prompt_tokens", 0)
+    output_tokens = getattr(usage, "completion_tokens", 0)
+    input_tokens = input_tokens if isinstance(input_tokens, int) else 0
+    output_tokens = output_tokens if isinstance(output_tokens, int) else 0
+
+    try:
+        cost = float(completion_cost(completion_response=response, model=model))
+    except Exception:
+        # Unknown models have no price in litellm's cost map
+        cost = 0.0
+    return input_tokens, output_tokens, cost
+
+
+class RunBudget:
+    """Usage accounting and limits for one indexing run."""
+
+    def __init__(
+        self, max_input_tokens=0, max_output_tokens=0, max_cost=0.0, max_seconds=0.0, action=FALLBACK, downgrade_model=None
+    ):
+        """
+        Initialize the budget; a limit of 0 means unlimited.
+
+        Args:
+            max_input_tokens (int): Prompt tokens allowed for the run
+            max_output_tokens (int): Completion tokens allowed for the run
+            max_cost (float): Estimated cost in USD allowed for the run
+            max_seconds (float): Wall-clock seconds allowed for the run
+            action (str): "stop" to skip remaining files, "fallback" to use offline
+                          fallbacks, or "downgrade" to switch to ``downgrade_model``
+            downgrade_model (str, optional): Cheaper model used once a budget is hit
+        """
+        if action not in ACTIONS:
+            raise ValueError(f"Invalid budget action: {action}")
+        if action == DOWNGRADE and not downgrade_model:
+            raise ValueError("A downgrade model is required for the downgrade budget action")
+        self.max_input_tokens = max_input_tokens
+        self.max_output_tokens = max_output_tokens
+        self.max_cost = max_cost
+        self.max_seconds = max_seconds
+        self.action = action
+        self.downgrade_model = downgrade_model
+        self.started = time.monotonic()
+        self.total = _new_usage()
+        self.by_provider = {}
+        self.by_file = {}
+        self.exhausted_reason = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def file_scope(self, file_paths):
+        """
+        Attribute LLM usage inside the block to one file, or split it evenly across a batch.
+
+        Args:
+            file_paths (str | list): File path, or the paths of chats sharing batched requests
+        """
+        token = _current_files.set((file_paths,) if isinstance(file_paths, str) else tuple(file_paths))
+        try:
+            yield
+        finally:
+            _current_files.reset(token)
+
+    def record(self, model, response):
+        """
+        Account the usage of one provider response.
+
+        Args:
+            model (str): Model the request was sent to
+            response (ModelResponse): Provider response
+        """
+        input_tokens, output_tokens, cost = response_usage(response, model)
+        file_paths = _current_files.get()
+        with self._lock:
+            for usage in (self.total, self.by_provider.setdefault(model, _new_usage())):
+                usage["requests"] += 1
+                usage["input_tokens"] += input_tokens
+                usage["output_tokens"] += output_tokens
+                usage["cost"] += cost
+
+            count = len(file_paths)
+            for i, file_path in enumerate(file_paths):
+                usage = self.by_file.setdefault(file_path, _new_usage())
+                usage["requests"] += 1
+                # The first file of a batch takes the rounding remainder
+                usage["input_tokens"] += input_tokens // count + (input_tokens % count if i == 0 else 0)
+                usage["output_tokens"] += output_tokens // count + (output_tokens % count if i == 0 else 0)
+                usage["cost"] += cost / count
+
+    def exceeded(self):
+        """
+        Check the limits, logging the first time one is reached.
+
+        Returns:
+            str: Description of the exhausted budget, or None while within budget
+        """
+        if self.exhausted_reason:
+            return self.exhausted_reason
+
+        reason = None
+        if self.max_input_tokens and self.total["input_tokens"] >= self.max_input_tokens:
+            reason = f"input token budget of {self.max_input_tokens} reached"
+        elif self.max_output_tokens and self.total["output_tokens"] >= self.max_output_tokens:
+            reason = f"output token budget of {self.max_output_tokens} reached"
+        elif self.max_cost and self.total["cost"] >= self.max_cost:
+            reason = f"cost budget of ${self.max_cost:.2f} reached"
+        elif self.max_seconds and time.monotonic() - self.started >= self.max_seconds:
+            reason = f"time budget of {self.max_seconds:.0f}s reached"
+
+        if reason:
+            self.exhausted_reason = reason
+            logger.warning(f"Run budget exhausted: {reason}; action: {self.action}")
+        return reason
+
+    def file_usage(self, file_path, release=False):
+        """
+        Usage attributed to one file, or None if it made no LLM calls.
+
+        Args:
+            file_path (str): File path
+            release (bool): Forget the file's usage afterwards, so long runs do not keep every file's record
+        """
+        with self._lock:
+            usage = self.by_file.pop(file_path, None) if release else self.by_file.get(file_path)
+        return _rounded(usage) if usage else None
+
+    def snapshot(self):
+        """
+        Summarize the run's usage and limits for the index metadata.
+
+        Returns:
+            dict: Totals, per-provider usage and budget state
+        """
+        return {
+            "elapsed_seconds": round(time.monotonic() - self.started, 2),
+            "total": _rounded(self.total),
+            "by_provider": {model: _rounded(usage) for model, usage in self.by_provider.items()},
+            "limits": {
+                "input_tokens": self.max_input_tokens,
+                "output_tokens": self.max_output_tokens,
+                "cost": self.max_cost,
+                "seconds": self.max_seconds,
+            },
+            "exhausted": self.exhausted_reason,
+        }
+
+
+def _rounded(usage):
+    return dict(usage, cost=round(usage["cost"], 6))
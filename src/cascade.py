@@ -0,0 +1,154 @@
+"""
+Model cascade module for LLM Chat Indexer.
+
+Sends each request to the cheapest model tier that is likely to handle it and
+escalates to a stronger tier only when the answer fails validation, so most
+short chats are indexed by a small, fast model.
+"""
+
+import logging
+import threading
+
+from src.compressor import is_code_or_log
+
+logger = logging.getLogger("LLMChatIndexer")
+
+
+def parse_tiers(spec):
+    """
+    Parse a cascade model list.
+
+    Args:
+        spec (str): Comma-separated models from cheapest to strongest,
+                    e.g. "gemini/gemini-2.0-flash-lite,gemini/gemini-2.0-flash"
+
+    Returns:
+        list: Model identifiers
+    """
+    return [model.strip() for model in spec.split(",") if model.strip()]
+
+
+def complexity(text):
+    """
+    Rough complexity score of a chat, from 0 (plain conversation) to 1.
+
+    Pasted code, logs and stack traces are where small models most often
+    produce unusable topics and summaries.
+
+    Args:
+        text (str): Chat text
+
+    Returns:
+        float: Fraction of non-empty lines that look like code or log output
+    """
+    lines = [line for line in text.splitlines() if line.strip()]
+    if not lines:
+        return 0.0
+    return sum(1 for line in lines if is_code_or_log(line) or line.strip().startswith("```")) / len(lines)
+
+
+def topics_valid(content, max_keywords):
+    """Whether a topic extraction answer has the requested number of topics."""
+    topics = [topic.strip() for topic in (content or "").split(",") if topic.strip()]
+    return len(topics) >= max_keywords and all(len(topic) <= 80 for topic in topics)
+
+
+def summary_valid(content):
+    """Whether a summary answer is non-empty."""
+    return bool((content or "").strip())
+
+
+class TierStats:
+    """Usage statistics for one cascade tier."""
+
+    def __init__(self):
+        self.requests = 0
+        self.accepted = 0
+        self.escalated = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+
+class CascadePolicy:
+    """Cheap-first model selection with escalation on failed validation."""
+
+    def __init__(self, tiers, token_threshold=1500, complexity_threshold=0.3):
+        """
+        Initialize the policy.
+
+        Args:
+            tiers (list): Models from cheapest to strongest
+            token_threshold (int): Chats above this many estimated tokens skip the cheapest tier
+            complexity_threshold (float): Chats with a larger share of code/log lines skip a tier
+        """
+        if not tiers:
+            raise ValueError("At least one cascade tier is required")
+        self.tiers = list(tiers)
+        self.token_threshold = token_threshold
+        self.complexity_threshold = complexity_threshold
+        self.stats = {model: TierStats() for model in self.tiers}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_spec(cls, spec, **kwargs):
+        """Create a policy from a "cheap,strong,..." string."""
+        return cls(parse_tiers(spec), **kwargs)
+
+    def start_tier(self, text, tokens):
+        """
+        Pick the first tier to try for a chat.
+
+        Args:
+            text (str): Chat text
+            tokens (int): Estimated tokens of the chat
+
+        Returns:
+            int: Index into ``tiers``
+        """
+        tier = 0
+        if self.token_threshold and tokens > self.token_threshold:
+            tier += 1
+        if self.complexity_threshold and complexity(text) > self.complexity_threshold:
+            tier += 1
+        return min(tier, len(self.tiers) - 1)
+
+    def record(self, model, response, accepted):
+        """
+        Record the outcome of a request to one tier.
+
+        Args:
+            model (str): Tier model
+            response (ModelResponse): Provider response, or None if the request failed
+            accepted (bool): Whether the answer passed validation
+        """
+        stats = self.stats.get(model)
+        if stats is None:
+            return
+        usage = getattr(response, "usage", None)
+        with self._lock:
+            stats.requests += 1
+            if accepted:
+                stats.accepted += 1
+            elif model != self.tiers[-1]:
+                stats.escalated += 1
+            if usage is not None:
+                stats.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+                stats.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+
+    def snapshot(self):
+        """
+        Summarize usage per tier.
+
+        Returns:
+            dict: Stats keyed by model
+        """
+        return {
+            model: {
+                "requests": self.stats[model].requests,
+                "accepted": self.stats[model].accepted,
+                "escalated": self.stats[model].escalated,
+                "prompt_tokens": self.stats[model].prompt_tokens,
+                "completion_tokens": self.stats[model].completion_tokens,
+            }
+            for model in self.tiers
+        }
@@ -0,0 +1,197 @@
+"""
+Record/replay module for LLM Chat Indexer.
+
+Records the provider responses, errors and latencies seen by ``LLMClient``
+into a cassette file, and serves them back locally so pipeline throughput can
+be measured reproducibly without network access or spend.
+"""
+
+import json
+import random
+import hashlib
+import logging
+import threading
+from collections import defaultdict
+from litellm import ModelResponse, RateLimitError, ServiceUnavailableError, Timeout
+
+logger = logging.getLogger("LLMChatIndexer")
+
+# How replayed responses are delayed
+LATENCY_NONE = "none"
+LATENCY_RECORDED = "recorded"
+LATENCY_SAMPLED = "sampled"
+LATENCY_MODES = (LATENCY_NONE, LATENCY_RECORDED, LATENCY_SAMPLED)
+
+# Provider errors that are recorded and raised again on replay
+_REPLAYABLE_ERRORS = {cls.__name__: cls for cls in (RateLimitError, ServiceUnavailableError, Timeout)}
+
+
+class CassetteMiss(Exception):
+    """Raised on replay when the cassette has no recording of a request."""
+
+
+def request_key(model, messages):
+    """
+    Key identifying a request in a cassette.
+
+    Args:
+        model (str): Model identifier, or None to match any model
+        messages (list): List of message objects
+
+    Returns:
+        str: Hex digest of the model and messages
+    """
+    payload = json.dumps({"model": model, "messages": messages}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """Recorded LLM interactions, appended to or served from a JSON Lines file."""
+
+    def __init__(self, path, mode="replay", latency=LATENCY_NONE, latency_scale=1.0, seed=0):
+        """
+        Initialize the cassette.
+
+        Args:
+            path (str): Cassette file; recordings are appended to it
+            mode (str): "record" to capture provider calls, "replay" to serve them
+            latency (str): On replay, "none" answers immediately, "recorded" waits the
+                           latency recorded for each request and "sampled" draws from
+                           the recorded latency distribution
+            latency_scale (float): Multiplier applied to replayed latencies
+            seed (int): Seed for sampled latencies, so replays are repeatable
+        """
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Invalid cassette mode: {mode}")
+        if latency not in LATENCY_MODES:
+            raise ValueError(f"Invalid replay latency mode: {latency}")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        self._entries = defaultdict(list)
+        self._any_model = defaultdict(list)
+        self._positions = defaultdict(int)
+        self._latencies = []
+        self._random = random.Random(seed)
+        self._file = None
+        self._lock = threading.Lock()
+        if mode == "replay":
+            self._load()
+
+    @property
+    def replaying(self):
+        """Whether provider calls are served from the cassette."""
+        return self.mode == "replay"
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                self._entries[entry["key"]].append(entry)
+                self._any_model[entry["messages_key"]].append(entry)
+                self._latencies.append(entry["latency"])
+        logger.info(f"Loaded {len(self._latencies)} recorded LLM calls from {self.path}")
+
+    def record(self, model, messages, latency, response=None, error=None):
+        """
+        Append one provider call to the cassette.
+
+        Args:
+            model (str): Model the request was sent to
+            messages (list): List of message objects
+            latency (float): Seconds the call took
+            response (ModelResponse, optional): Provider response
+            error (Exception, optional): Temporary provider error raised instead of a response
+        """
+        entry = {
+            "key": request_key(model, messages),
+            "messages_key": request_key(None, messages),
+            "model": model,
+            "latency": round(latency, 4),
+        }
+        if error is not None:
+            entry["error"] = {"type": type(error).__name__, "message": str(error)}
+        else:
+            entry["response"] = response.model_dump()
+
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            # Flushed per call so an interrupted run still leaves a usable cassette
+            self._file.write(line)
+            self._file.flush()
+            self.recorded += 1
+
+    def replay(self, model, messages):
+        """
+        Look up the recorded outcome of a request.
+
+        Repeated identical requests are answered with their recordings in
+        order, wrapping around. A request recorded for another model (e.g.
+        routed differently) is matched on its messages alone.
+
+        Args:
+            model (str): Model the request is sent to
+            messages (list): List of message objects
+
+        Returns:
+            tuple: (ModelResponse or Exception to raise, seconds to wait first)
+
+        Raises:
+            CassetteMiss: If the request was never recorded
+        """
+        with self._lock:
+            key = request_key(model, messages)
+            entries = self._entries.get(key)
+            if not entries:
+                key = request_key(None, messages)
+                entries = self._any_model.get(key)
+            if not entries:
+                self.misses += 1
+                raise CassetteMiss(f"No recording of this {model} request in {self.path}")
+
+            entry = entries[self._positions[key] % len(entries)]
+            self._positions[key] += 1
+            self.replayed += 1
+            if self.latency == LATENCY_RECORDED:
+                delay = entry["latency"]
+            elif self.latency == LATENCY_SAMPLED:
+                delay = self._random.choice(self._latencies)
+            else:
+                delay = 0.0
+
+        if "error" in entry:
+            error_cls = _REPLAYABLE_ERRORS.get(entry["error"]["type"], ServiceUnavailableError)
+            outcome = error_cls(message=entry["error"]["message"], model=model, llm_provider=model.split("/")[0])
+        else:
+            outcome = ModelResponse(**entry["response"])
+        return outcome, delay * self.latency_scale
+
+    def close(self):
+        """Close the cassette file after recording."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def snapshot(self):
+        """
+        Summarize cassette usage.
+
+        Returns:
+            dict: Mode, path and call counts
+        """
+        return {
+            "mode": self.mode,
+            "path": self.path,
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "misses": self.misses,
+        }
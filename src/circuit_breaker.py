@@ -0,0 +1,124 @@
+"""
+Circuit breaker module for LLM Chat Indexer.
+
+Stops sending requests to the LLM provider while it is failing, so an outage
+costs one fast fallback per call instead of a full retry/backoff cycle, and
+probes periodically to detect recovery.
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger("LLMChatIndexer")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Error-rate based circuit breaker with half-open recovery probes."""
+
+    def __init__(self, failure_rate_threshold=0.5, window=20, min_calls=5, reset_timeout=30.0, half_open_max_calls=1):
+        """
+        Initialize a closed circuit.
+
+        Args:
+            failure_rate_threshold (float): Failure rate over the window that opens the circuit
+            window (int): Number of recent calls considered
+            min_calls (int): Calls needed in the window before the circuit can open
+            reset_timeout (float): Seconds the circuit stays open before probing
+            half_open_max_calls (int): Concurrent probe calls allowed while half-open
+        """
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.outcomes = deque(maxlen=window)
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+        self.times_opened = 0
+        self.rejected_calls = 0
+        self._lock = threading.Lock()
+
+    def _transition(self, state):
+        if state != self.state:
+            logger.warning(f"Circuit breaker {self.state} -> {state}")
+            self.state = state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+            self.times_opened += 1
+            self.probes_in_flight = 0
+        elif state == CLOSED:
+            self.outcomes.clear()
+            self.probes_in_flight = 0
+
+    def allow_request(self):
+        """
+        Check whether a call may go to the provider.
+
+        Returns:
+            bool: True if the call may proceed; half-open probes count against the probe limit
+        """
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self._transition(HALF_OPEN)
+
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and self.probes_in_flight < self.half_open_max_calls:
+                self.probes_in_flight += 1
+                return True
+
+            self.rejected_calls += 1
+            return False
+
+    def release_probe(self):
+        """Free a probe slot whose call ended without a recorded outcome, so later calls can probe."""
+        with self._lock:
+            if self.state == HALF_OPEN and self.probes_in_flight > 0:
+                self.probes_in_flight -= 1
+
+    def record_success(self):
+        """Record a successful provider call."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._transition(CLOSED)
+            else:
+                self.outcomes.append(True)
+
+    def record_failure(self):
+        """Record a failed provider call, opening the circuit if the error rate is too high."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._transition(OPEN)
+                return
+
+            self.outcomes.append(False)
+            if self.state == CLOSED and len(self.outcomes) >= self.min_calls:
+                failure_rate = self.outcomes.count(False) / len(self.outcomes)
+                if failure_rate >= self.failure_rate_threshold:
+                    self._transition(OPEN)
+
+    @property
+    def is_open(self):
+        """Whether calls are currently being refused."""
+        return self.state == OPEN and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def time_until_probe(self):
+        """Seconds until the open circuit lets a probe through (0 if not open)."""
+        if self.state != OPEN:
+            return 0.0
+        return max(self.reset_timeout - (time.monotonic() - self.opened_at), 0.0)
+
+    def snapshot(self):
+        """
+        Summarize the breaker state.
+
+        Returns:
+            dict: State and counters
+        """
+        return {"state": self.state, "times_opened": self.times_opened, "rejected_calls": self.rejected_calls}
@@ -0,0 +1,242 @@
+"""
+Extractive pre-compression module for LLM Chat Indexer.
+
+Shrinks a chat before it is sent to the LLM: pasted code and log blocks are
+collapsed, greetings and repeated boilerplate are dropped, and if the chat is
+still over the token budget the most informative sentences are kept using a
+TF-IDF weighted TextRank.
+"""
+
+import re
+import logging
+from collections import Counter
+import numpy as np
+
+logger = logging.getLogger("LLMChatIndexer")
+
+# Consecutive code/log lines beyond this are collapsed to their first and last lines
+MAX_BLOCK_LINES = 6
+BLOCK_CONTEXT_LINES = 2
+
+# Only this many characters per token of budget are read from very long chats
+INPUT_CHARS_PER_BUDGET_TOKEN = 100
+
+# Above this many sentences TextRank is skipped and plain TF-IDF scores are used
+MAX_TEXTRANK_SENTENCES = 2000
+
+BOILERPLATE_PATTERN = re.compile(
+    r"^(\w+\s*:\s*)?(hi|hello|hey|good (morning|afternoon|evening)|thanks?( you)?( so much| a lot)?|thank you|"
+    r"ty|thx|ok(ay)?|cool|great|nice|sure|got it|you'?re welcome|np|no problem|bye|cheers|lol)[\s!.,:;)]*$",
+    re.IGNORECASE,
+)
+LOG_LINE_PATTERN = re.compile(
+    r"^\s*("
+    r"\[?\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}.*\b(DEBUG|INFO|WARN|WARNING|ERROR|CRITICAL|FATAL|TRACE)\b"
+    r"|(DEBUG|INFO|WARN|WARNING|ERROR|CRITICAL|FATAL|TRACE)[\s:\]]"
+    r"|at [\w$.<>]+\(.*\)$"
+    r'|File ".*", line \d+'
+    r"|Traceback \(most recent call last\)"
+    r"|[\w.]+(Error|Exception)\b.*"
+    r"|[{}\[\]();]+,?$"
+    r"|(def|class|import|from|return|if|for|while|function|const|let|var|public|private)\b.*[:{;(]\s*$"
+    r"|[$#>] \S+"
+    r")"
+)
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(])")
+WORD_PATTERN = re.compile(r"[a-z][a-z0-9_']+")
+
+
+def is_code_or_log(line):
+    """Heuristic check for a line pasted from code, a terminal or a log file."""
+    stripped = line.strip()
+    if not stripped:
+        return False
+    if LOG_LINE_PATTERN.match(line):
+        return True
+    # Mostly symbols and digits, e.g. JSON dumps, hex, stack addresses
+    letters = sum(ch.isalpha() for ch in stripped)
+    return len(stripped) >= 20 and letters / len(stripped) < 0.4
+
+
+def _collapse_lines(lines):
+    """
+    Collapse runs of code/log lines (and fenced code blocks) to their ends.
+
+    Runs may span messages, since plain-text transcripts hold one line per message.
+
+    Args:
+        lines (list): (message index, line) tuples
+
+    Returns:
+        list: (message index, line) tuples with long pasted blocks replaced by a placeholder
+    """
+    result = []
+    block = []
+    in_fence = False
+
+    def flush_block():
+        if len(block) > MAX_BLOCK_LINES:
+            omitted = len(block) - 2 * BLOCK_CONTEXT_LINES
+            result.extend(block[:BLOCK_CONTEXT_LINES])
+            result.append((block[BLOCK_CONTEXT_LINES][0], f"[... {omitted} lines of pasted code/log omitted ...]"))
+            result.extend(block[-BLOCK_CONTEXT_LINES:])
+        else:
+            result.extend(block)
+        block.clear()
+
+    for owner, line in lines:
+        is_fence = line.strip().startswith("```")
+        if is_fence or in_fence or is_code_or_log(line):
+            block.append((owner, line))
+            if is_fence:
+                in_fence = not in_fence
+        else:
+            flush_block()
+            result.append((owner, line))
+    flush_block()
+    return result
+
+
+def _tfidf_matrix(sentences):
+    """
+    Build an L2-normalised TF-IDF matrix for a list of sentences.
+
+    Args:
+        sentences (list): Sentence strings
+
+    Returns:
+        numpy.ndarray: (len(sentences), vocabulary size) matrix
+    """
+    tokenized = [WORD_PATTERN.findall(sentence.lower()) for sentence in sentences]
+    vocabulary = {}
+    for tokens in tokenized:
+        for token in tokens:
+            vocabulary.setdefault(token, len(vocabulary))
+
+    matrix = np.zeros((len(sentences), max(len(vocabulary), 1)), dtype=np.float32)
+    for row, tokens in enumerate(tokenized):
+        for token, count in Counter(tokens).items():
+            matrix[row, vocabulary[token]] = count
+
+    document_frequency = np.count_nonzero(matrix, axis=0)
+    idf = np.log((1 + len(sentences)) / (1 + document_frequency)) + 1
+    matrix *= idf
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return matrix / norms
+
+
+def rank_sentences(sentences, damping=0.85, iterations=30):
+    """
+    Score sentences by TextRank over their TF-IDF cosine similarity graph.
+
+    Args:
+        sentences (list): Sentence strings
+        damping (float): PageRank damping factor
+        iterations (int): Power iterations
+
+    Returns:
+        numpy.ndarray: Score per sentence, higher is more informative
+    """
+    if not sentences:
+        return np.zeros(0)
+
+    matrix = _tfidf_matrix(sentences)
+    if len(sentences) > MAX_TEXTRANK_SENTENCES:
+        # Similarity graph would be too large; fall back to summed TF-IDF weight
+        return matrix.sum(axis=1)
+
+    similarity = matrix @ matrix.T
+    np.fill_diagonal(similarity, 0)
+    row_sums = similarity.sum(axis=1, keepdims=True)
+    row_sums[row_sums == 0] = 1
+    transition = similarity / row_sums
+
+    scores = np.full(len(sentences), 1.0 / len(sentences))
+    for _ in range(iterations):
+        scores = (1 - damping) / len(sentences) + damping * (transition.T @ scores)
+    return scores
+
+
+def compress_messages(messages, token_budget):
+    """
+    Shrink chat messages to the most informative content within a token budget.
+
+    Args:
+        messages (Sequence[str]): Chat messages
+        token_budget (int): Target size in estimated tokens (~4 characters each)
+
+    Returns:
+        list: Compressed messages in their original order
+    """
+    char_budget = token_budget * 4
+    max_input_chars = token_budget * INPUT_CHARS_PER_BUDGET_TOKEN
+
+    # Read lines up to the input cap, splitting multi-line messages so pasted
+    # blocks inside a single JSON/markdown message are handled too
+    lines = []
+    input_chars = 0
+    for index, message in enumerate(messages):
+        for line in str(message).splitlines() or [""]:
+            lines.append((index, line))
+        input_chars += len(message) + 1
+        if input_chars > max_input_chars:
+            logger.debug("Compression input capped at %d characters", max_input_chars)
+            break
+
+    # Collapse pasted blocks, then drop greetings and repeated lines
+    seen = set()
+    kept = []
+    for owner, line in _collapse_lines(lines):
+        key = " ".join(line.lower().split())
+        if not key or BOILERPLATE_PATTERN.match(key) or (len(key) > 3 and key in seen):
+            continue
+        seen.add(key)
+        kept.append((owner, line))
+
+    if sum(len(line) + 1 for _, line in kept) > char_budget:
+        kept = _select_sentences(kept, char_budget)
+
+    compressed = []
+    last_owner = None
+    for owner, text in kept:
+        if owner == last_owner:
+            compressed[-1] += "\n" + text
+        else:
+            compressed.append(text)
+            last_owner = owner
+
+    logger.debug(
+        "Compressed chat from %d to %d characters", input_chars, sum(len(m) + 1 for m in compressed)
+    )
+    return compressed
+
+
+def _select_sentences(lines, char_budget):
+    """
+    Keep the highest ranked sentences that fit the character budget.
+
+    Args:
+        lines (list): (message index, line) tuples
+        char_budget (int): Maximum characters to keep
+
+    Returns:
+        list: (message index, sentence) tuples in original order
+    """
+    sentences = []
+    for owner, line in lines:
+        for sentence in SENTENCE_PATTERN.split(line):
+            if sentence.strip():
+                sentences.append((owner, sentence.strip()))
+
+    scores = rank_sentences([sentence for _, sentence in sentences])
+    selected = []
+    used = 0
+    for index in np.argsort(-scores, kind="stable"):
+        length = len(sentences[index][1]) + 1
+        if used + length > char_budget:
+            continue
+        selected.append(index)
+        used += length
+
+    return [sentences[index] for index in sorted(selected)]
@@ -0,0 +1,165 @@
+"""
+Adaptive concurrency module for LLM Chat Indexer.
+
+Limits the number of in-flight async LLM requests with an AIMD controller:
+the limit grows by one for every window of healthy responses and is cut
+multiplicatively on rate-limit errors or latency spikes.
+"""
+
+import time
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from litellm import RateLimitError
+
+logger = logging.getLogger("LLMChatIndexer")
+
+# Smoothing factor for the baseline latency; slow so spikes stand out against it
+BASELINE_ALPHA = 0.05
+
+
+class AdaptiveLimiter:
+    """AIMD limit on concurrent async requests."""
+
+    def __init__(
+        self,
+        initial=4,
+        min_limit=1,
+        max_limit=16,
+        decrease_factor=0.5,
+        latency_spike_factor=2.0,
+        overload_errors=(RateLimitError,),
+    ):
+        """
+        Initialize the limiter.
+
+        Args:
+            initial (int): Starting number of concurrent requests
+            min_limit (int): Lowest limit the controller may shrink to
+            max_limit (int): Highest limit the controller may grow to
+            decrease_factor (float): Multiplier applied to the limit on overload
+            latency_spike_factor (float): Latency above this multiple of the baseline counts as overload
+            overload_errors (tuple): Exception types that signal provider overload
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = min(max(initial, min_limit), max_limit)
+        self.decrease_factor = decrease_factor
+        self.latency_spike_factor = latency_spike_factor
+        self.overload_errors = overload_errors
+        self.in_flight = 0
+        self.baseline_latency = None
+        self.increases = 0
+        self.decreases = 0
+        self.peak_in_flight = 0
+        self._healthy_streak = 0
+        # Requests started before the last decrease do not trigger another one
+        self._epoch = 0
+        self._waiters = deque()
+
+    async def acquire(self):
+        """
+        Wait for a free slot.
+
+        Returns:
+            int: Epoch the request started in, to pass to ``release``
+        """
+        while self.in_flight >= self.limit:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        return self._epoch
+
+    def release(self, epoch, latency=None, overloaded=False):
+        """
+        Free a slot and feed the outcome of the request to the controller.
+
+        Args:
+            epoch (int): Value returned by ``acquire``
+            latency (float, optional): Request latency in seconds; None if it failed for another reason
+            overloaded (bool): Whether the provider signalled overload (e.g. HTTP 429)
+        """
+        self.in_flight -= 1
+        spike = latency is not None and self._is_spike(latency)
+        if latency is not None:
+            # Spikes feed the baseline too, so a lasting slowdown is eventually accepted as normal
+            self._update_baseline(latency)
+
+        if overloaded or spike:
+            if epoch == self._epoch:
+                reason = "rate limited" if overloaded else f"latency spike {latency:.2f}s"
+                self._set_limit(max(self.min_limit, int(self.limit * self.decrease_factor)), reason)
+                self._epoch += 1
+            self._healthy_streak = 0
+        elif latency is not None:
+            self._healthy_streak += 1
+            # Additive increase: one more slot per limit's worth of healthy responses
+            if self._healthy_streak >= self.limit and self.limit < self.max_limit:
+                self._healthy_streak = 0
+                self._set_limit(self.limit + 1, f"healthy, baseline latency {self.baseline_latency:.2f}s")
+        self._wake()
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold a slot for the duration of one request, recording its outcome."""
+        epoch = await self.acquire()
+        start = time.monotonic()
+        try:
+            yield
+        except self.overload_errors:
+            self.release(epoch, overloaded=True)
+            raise
+        except BaseException:
+            self.release(epoch)
+            raise
+        self.release(epoch, latency=time.monotonic() - start)
+
+    def _is_spike(self, latency):
+        return self.baseline_latency is not None and latency > self.baseline_latency * self.latency_spike_factor
+
+    def _update_baseline(self, latency):
+        if self.baseline_latency is None:
+            self.baseline_latency = latency
+        else:
+            self.baseline_latency = BASELINE_ALPHA * latency + (1 - BASELINE_ALPHA) * self.baseline_latency
+
+    def _set_limit(self, limit, reason):
+        if limit == self.limit:
+            return
+        if limit > self.limit:
+            self.increases += 1
+        else:
+            self.decreases += 1
+        logger.info(f"Concurrency limit {self.limit} -> {limit} ({reason}, {self.in_flight} in flight)")
+        self.limit = limit
+
+    def _wake(self):
+        free = self.limit - self.in_flight
+        for waiter in list(self._waiters):
+            if free <= 0:
+                break
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    def snapshot(self):
+        """
+        Summarize the controller state.
+
+        Returns:
+            dict: Current limit, adjustments and peak concurrency
+        """
+        return {
+            "limit": self.limit,
+            "increases": self.increases,
+            "decreases": self.decreases,
+            "peak_in_flight": self.peak_in_flight,
+            "baseline_latency": round(self.baseline_latency or 0.0, 4),
+        }
@@ -35,21 +35,166 @@ class Config:
     # Filenames for generated output
     SUMMARY_FILENAME = os.getenv("SUMMARY_FILENAME", "chat_summaries.md")
     INDEX_FILENAME = os.getenv("INDEX_FILENAME", "chat_index.json")
+    # Per-stage timing report written next to the index; empty disables it
+    RUN_REPORT_FILENAME = os.getenv("RUN_REPORT_FILENAME", "run_report.json")
+
+    # Live metrics in Prometheus text format: local HTTP endpoint (0 disables) and/or
+    # a file rewritten every METRICS_INTERVAL seconds (empty disables)
+    METRICS_PORT = int(os.getenv("METRICS_PORT", 0))
+    METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+    METRICS_FILE = os.getenv("METRICS_FILE", "")
+    METRICS_INTERVAL = float(os.getenv("METRICS_INTERVAL", 15))
 
     # LLM service configuration
     LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini/gemini-2.0-flash")
     # API key can be from any supported provider (see .env.template examples)
     LLM_API_KEY = os.getenv("LLM_API_KEY")  # Supports GOOGLE_API_KEY/OPENAI_API_KEY etc via LiteLLM
 
+    # Optional weighted list of providers to route between ("model=weight,model=weight"),
+    # and the latency percentile after which a slow request is hedged (0 disables)
+    LLM_PROVIDERS = os.getenv("LLM_PROVIDERS", "")
+    HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", 0))
+
+    # Model cascade: comma-separated models from cheapest to strongest; empty disables it.
+    # Chats above CASCADE_TOKEN_THRESHOLD estimated tokens or with a larger share of
+    # code/log lines than CASCADE_COMPLEXITY_THRESHOLD start one tier higher each.
+    CASCADE_MODELS = os.getenv("CASCADE_MODELS", "")
+    CASCADE_TOKEN_THRESHOLD = int(os.getenv("CASCADE_TOKEN_THRESHOLD", 1500))
+    CASCADE_COMPLEXITY_THRESHOLD = float(os.getenv("CASCADE_COMPLEXITY_THRESHOLD", 0.3))
+
+    # Assumed seconds per LLM request when projecting runtime with --plan
+    PLAN_REQUEST_LATENCY = float(os.getenv("PLAN_REQUEST_LATENCY", 2.0))
+
+    # Run budgets (0 = unlimited) and what happens once one is exhausted:
+    # "stop" skips the remaining files, "fallback" uses offline fallbacks and
+    # "downgrade" switches to BUDGET_DOWNGRADE_MODEL (default: cheapest cascade tier)
+    BUDGET_MAX_INPUT_TOKENS = int(os.getenv("BUDGET_MAX_INPUT_TOKENS", 0))
+    BUDGET_MAX_OUTPUT_TOKENS = int(os.getenv("BUDGET_MAX_OUTPUT_TOKENS", 0))
+    BUDGET_MAX_COST = float(os.getenv("BUDGET_MAX_COST", 0))
+    BUDGET_MAX_SECONDS = float(os.getenv("BUDGET_MAX_SECONDS", 0))
+    BUDGET_ACTION = os.getenv("BUDGET_ACTION", "fallback")
+    BUDGET_DOWNGRADE_MODEL = os.getenv("BUDGET_DOWNGRADE_MODEL", "")
+
+    # Timeouts: per provider request, and for all requests of one file (files over
+    # their deadline fall back and are requeued at the end). With several providers,
+    # requests slower than STRAGGLER_FACTOR x p95 latency are re-issued to another
+    # one; 0 disables either setting.
+    REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", 120))
+    FILE_TIMEOUT = float(os.getenv("FILE_TIMEOUT", 600))
+    STRAGGLER_FACTOR = float(os.getenv("STRAGGLER_FACTOR", 3))
+
+    # Record provider calls to a cassette file, or replay one instead of calling the provider.
+    # Replayed calls answer immediately ("none"), after their "recorded" latency, or after a
+    # latency "sampled" from the recording, multiplied by CASSETTE_LATENCY_SCALE.
+    CASSETTE_RECORD = os.getenv("CASSETTE_RECORD", "")
+    CASSETTE_REPLAY = os.getenv("CASSETTE_REPLAY", "")
+    CASSETTE_REPLAY_LATENCY = os.getenv("CASSETTE_REPLAY_LATENCY", "none")
+    CASSETTE_LATENCY_SCALE = float(os.getenv("CASSETTE_LATENCY_SCALE", 1.0))
+
+    # Pooled HTTP connections shared by all provider calls (HTTP/2 needs the h2 package)
+    HTTP_POOL_ENABLED = os.getenv("HTTP_POOL_ENABLED", "true").lower() in ("1", "true", "yes")
+    HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+    HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", 20))
+    HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 30))
+    HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() in ("1", "true", "yes")
+
+    # Adaptive concurrency for async requests: AIMD between CONCURRENCY_MIN and
+    # CONCURRENCY_MAX, halving on rate limits or latency above LATENCY_SPIKE_FACTOR x baseline
+    ADAPTIVE_CONCURRENCY = os.getenv("ADAPTIVE_CONCURRENCY", "false").lower() in ("1", "true", "yes")
+    CONCURRENCY_MIN = int(os.getenv("CONCURRENCY_MIN", 1))
+    CONCURRENCY_MAX = int(os.getenv("CONCURRENCY_MAX", 16))
+    LATENCY_SPIKE_FACTOR = float(os.getenv("LATENCY_SPIKE_FACTOR", 2.0))
+
+    # Circuit breaker: opens when the failure rate over the last CIRCUIT_WINDOW calls
+    # reaches CIRCUIT_FAILURE_RATE, probes again after CIRCUIT_RESET_TIMEOUT seconds.
+    # Degraded files are requeued at the end of a run if the provider recovers within
+    # CIRCUIT_REQUEUE_WAIT seconds.
+    CIRCUIT_BREAKER_ENABLED = os.getenv("CIRCUIT_BREAKER_ENABLED", "true").lower() in ("1", "true", "yes")
+    CIRCUIT_FAILURE_RATE = float(os.getenv("CIRCUIT_FAILURE_RATE", 0.5))
+    CIRCUIT_WINDOW = int(os.getenv("CIRCUIT_WINDOW", 20))
+    CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", 5))
+    CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", 30))
+    CIRCUIT_REQUEUE_WAIT = float(os.getenv("CIRCUIT_REQUEUE_WAIT", 120))
+
     # File types that can be processed
     SUPPORTED_FILE_EXTENSIONS = os.getenv("SUPPORTED_FILE_EXTENSIONS", ".txt,.md,.json,.html,.csv").split(",")
 
     # Processing parameters
     MAX_TOPIC_KEYWORDS = int(os.getenv("MAX_TOPIC_KEYWORDS", 5))
 
+    # Plain-text files at or above this size (bytes) are memory-mapped and parsed in parallel
+    LARGE_FILE_THRESHOLD = int(os.getenv("LARGE_FILE_THRESHOLD", 64 * 1024 * 1024))
+    PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", os.cpu_count() or 1))
+
+    # Long chats are split into sessions at idle gaps (minutes) or size (characters);
+    # 0 disables the respective rule. Every session costs its own topic and summary
+    # requests plus one for the parent summary, so size splitting is opt-in and
+    # adjacent sessions are merged beyond SESSION_MAX_COUNT per file (0 for no limit).
+    # Sessions of one file are summarized concurrently.
+    SESSION_GAP_MINUTES = float(os.getenv("SESSION_GAP_MINUTES", 120))
+    SESSION_MAX_CHARS = int(os.getenv("SESSION_MAX_CHARS", 0))
+    SESSION_MAX_COUNT = int(os.getenv("SESSION_MAX_COUNT", 20))
+    SESSION_CONCURRENCY = int(os.getenv("SESSION_CONCURRENCY", 4))
+
+    # Chats with at most BATCH_MAX_MESSAGES messages are packed into multi-document
+    # requests of up to BATCH_TOKEN_BUDGET estimated tokens; 0 disables batching
+    BATCH_TOKEN_BUDGET = int(os.getenv("BATCH_TOKEN_BUDGET", 0))
+    BATCH_MAX_MESSAGES = int(os.getenv("BATCH_MAX_MESSAGES", 20))
+
+    # Duplicate chats reuse the analysis of the first copy; near duplicates are
+    # chats whose SimHash signatures differ in at most DEDUP_MAX_DISTANCE bits;
+    # larger distances split signatures into more lookup bands
+    DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "false").lower() in ("1", "true", "yes")
+    DEDUP_MAX_DISTANCE = int(os.getenv("DEDUP_MAX_DISTANCE", 3))
+
+    # Optional local extractive compression of chats before they reach the LLM
+    COMPRESS_ENABLED = os.getenv("COMPRESS_ENABLED", "false").lower() in ("1", "true", "yes")
+    COMPRESS_TOKEN_BUDGET = int(os.getenv("COMPRESS_TOKEN_BUDGET", 3000))
+
+    # Only process shard "i/N" of the corpus (files partitioned by path hash); empty processes everything
+    SHARD = os.getenv("SHARD", "")
+
+    # Shared job table for multi-worker runs (empty disables); lease length without a heartbeat,
+    # leases per file before it is marked failed, and seconds between checks for free jobs
+    QUEUE_PATH = os.getenv("QUEUE_PATH", "")
+    QUEUE_LEASE_SECONDS = float(os.getenv("QUEUE_LEASE_SECONDS", 300))
+    QUEUE_MAX_ATTEMPTS = int(os.getenv("QUEUE_MAX_ATTEMPTS", 3))
+    QUEUE_POLL_INTERVAL = float(os.getenv("QUEUE_POLL_INTERVAL", 5))
+
+    # Watch mode: seconds between polls of the input directory, and seconds a new or
+    # changed file must stay unchanged before it is indexed
+    WATCH_INTERVAL = float(os.getenv("WATCH_INTERVAL", 2.0))
+    WATCH_DEBOUNCE = float(os.getenv("WATCH_DEBOUNCE", 1.0))
+    # Files processed from the startup backlog between checks for fresh changes
+    WATCH_BACKLOG_CHUNK = int(os.getenv("WATCH_BACKLOG_CHUNK", 16))
+
+    # Order files are processed in: discovery, newest, smallest, largest or cached (first);
+    # comma-separated files, directories or glob patterns processed ahead of all others
+    SCHEDULE = os.getenv("SCHEDULE", "discovery")
+    PRIORITY_PATHS = [path.strip() for path in os.getenv("PRIORITY_PATHS", "").split(",") if path.strip()]
+
+    # Constant-memory stream mode: bounded queues between discovery, processing and the index
+    # writer, and the number of files processed concurrently
+    STREAM_ENABLED = os.getenv("STREAM_ENABLED", "false").lower() in ("1", "true", "yes")
+    STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", 64))
+    STREAM_WORKERS = int(os.getenv("STREAM_WORKERS", 4))
+
+    # Progress display: auto (status line on a terminal, else log lines), bar, log or off
+    PROGRESS = os.getenv("PROGRESS", "auto")
+
+    # Profilers for a run, comma-separated: cpu, memory, loop (empty disables); seconds of
+    # CPU time between stack samples; event-loop lag from which blocking stacks are captured
+    PROFILE = os.getenv("PROFILE", "")
+    PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", 0.005))
+    LOOP_LAG_THRESHOLD = float(os.getenv("LOOP_LAG_THRESHOLD", 0.1))
+
     # Logging configuration
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
     LOG_FILE = os.getenv("LOG_FILE", "logs/chat_indexer.log")
+    # Write log records as JSON lines with per-file correlation IDs and durations
+    LOG_JSON = os.getenv("LOG_JSON", "false").lower() in ("1", "true", "yes")
+    # Write log records from a background thread so processing never waits on log I/O
+    LOG_QUEUE = os.getenv("LOG_QUEUE", "false").lower() in ("1", "true", "yes")
 
     @classmethod
     def validate_config(cls):
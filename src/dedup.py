@@ -0,0 +1,249 @@
+"""
+Duplicate detection module for LLM Chat Indexer.
+
+Finds chats that were exported more than once, either verbatim or with small
+differences, so their analysis can be reused instead of calling the LLM again.
+"""
+
+import re
+import hashlib
+import logging
+from collections import deque
+import numpy as np
+
+from src.segmenter import TIMESTAMP_PATTERN
+
+logger = logging.getLogger("LLMChatIndexer")
+
+SIMHASH_BITS = 64
+# Minimum number of bands used to look up near-duplicate candidates; a
+# Deduplicator uses more when its allowed Hamming distance needs them, since
+# only with more bands than that distance must near duplicates share one exactly
+SIMHASH_BANDS = 4
+# Chats with fewer shingles than this are only matched exactly
+MIN_SHINGLES = 8
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def iter_normalized(messages):
+    """
+    Normalize messages one at a time, as ``normalize_messages`` does.
+
+    Args:
+        messages (Iterable[str]): Chat messages
+
+    Yields:
+        str: Normalized message strings
+    """
+    for message in messages:
+        text = TIMESTAMP_PATTERN.sub("", str(message)).lower()
+        text = " ".join(text.split())
+        if text:
+            yield text
+
+
+def normalize_messages(messages):
+    """
+    Normalize messages so that formatting differences between exports do not matter.
+
+    Leading timestamps, case and whitespace are dropped, as are empty messages.
+
+    Args:
+        messages (Sequence[str]): Chat messages
+
+    Returns:
+        list: Normalized message strings
+    """
+    return list(iter_normalized(messages))
+
+
+def content_hash(normalized):
+    """
+    Hash normalized messages for exact duplicate detection.
+
+    Args:
+        normalized (Iterable[str]): Output of normalize_messages or iter_normalized
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256()
+    for message in normalized:
+        digest.update(message.encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+class SimHasher:
+    """
+    Incremental 64-bit SimHash over word shingles.
+
+    Messages are fed one at a time and every shingle occurrence votes, so
+    memory stays constant however long the chat is: only the last few words,
+    the running bit votes and the shingle count are kept.
+    """
+
+    # Shingle hashes buffered before their votes are added in one numpy step
+    FLUSH_SIZE = 4096
+
+    def __init__(self, shingle_size=3):
+        """
+        Initialize an empty signature.
+
+        Args:
+            shingle_size (int): Words per shingle
+        """
+        self.shingle_size = shingle_size
+        self.window = deque(maxlen=shingle_size)
+        self.shingles = 0
+        self.votes = np.zeros(SIMHASH_BITS, dtype=np.int64)
+        self._pending = []
+
+    def update(self, text):
+        """Add the shingles of one normalized message; shingles run on across messages."""
+        for match in _WORD_PATTERN.finditer(text):
+            self.window.append(match.group())
+            if len(self.window) < self.shingle_size:
+                continue
+            shingle = " ".join(self.window).encode("utf-8")
+            self._pending.append(int.from_bytes(hashlib.blake2b(shingle, digest_size=8).digest(), "big"))
+            if len(self._pending) >= self.FLUSH_SIZE:
+                self._flush()
+        self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        # One row of 64 bits per shingle; each set bit votes +1
+        bits = np.unpackbits(np.array(self._pending, dtype=">u8").view(np.uint8).reshape(-1, 8), axis=1)
+        self.votes += bits.sum(axis=0, dtype=np.int64)
+        self.shingles += len(self._pending)
+        self._pending = []
+
+    def signature(self):
+        """
+        The signature of the messages fed so far.
+
+        Returns:
+            int: Signature, or None if the chat is too short to fingerprint reliably
+        """
+        if self.shingles < MIN_SHINGLES:
+            return None
+        signature = 0
+        # Each bit is set when more than half of the shingles voted for it
+        for bit in self.votes * 2 > self.shingles:
+            signature = (signature << 1) | int(bit)
+        return signature
+
+
+def simhash(normalized, shingle_size=3):
+    """
+    Compute a 64-bit SimHash signature over word shingles.
+
+    Args:
+        normalized (Iterable[str]): Output of normalize_messages or iter_normalized
+        shingle_size (int): Words per shingle
+
+    Returns:
+        int: Signature, or None if the chat is too short to fingerprint reliably
+    """
+    hasher = SimHasher(shingle_size)
+    for message in normalized:
+        hasher.update(message)
+    return hasher.signature()
+
+
+def fingerprint(messages):
+    """
+    Fingerprint a chat for duplicate detection.
+
+    Messages are normalized and hashed one at a time in a single pass, so a
+    lazily read transcript is never held in memory as a whole.
+
+    Args:
+        messages (Iterable[str]): Chat messages
+
+    Returns:
+        tuple: (content hash, SimHash signature or None), or None for an empty chat
+    """
+    digest = hashlib.sha256()
+    hasher = SimHasher()
+    empty = True
+    for message in iter_normalized(messages):
+        digest.update(message.encode("utf-8"))
+        digest.update(b"\n")
+        hasher.update(message)
+        empty = False
+    if empty:
+        return None
+    return digest.hexdigest(), hasher.signature()
+
+
+class Deduplicator:
+    """Registry of chat fingerprints that reports exact and near duplicates."""
+
+    def __init__(self, max_distance=3):
+        """
+        Initialize an empty registry.
+
+        Args:
+            max_distance (int): Maximum SimHash Hamming distance for a near duplicate
+        """
+        self.max_distance = max_distance
+        self.band_count = min(max(SIMHASH_BANDS, max_distance + 1), SIMHASH_BITS)
+        self.exact = {}
+        self.signatures = {}
+        self.bands = {}
+
+    def _band_keys(self, signature):
+        bounds = [band * SIMHASH_BITS // self.band_count for band in range(self.band_count + 1)]
+        return [
+            (band, (signature >> bounds[band]) & ((1 << (bounds[band + 1] - bounds[band])) - 1))
+            for band in range(self.band_count)
+        ]
+
+    def check(self, file_path, messages):
+        """
+        Look up a chat and register it as canonical if it is new.
+
+        Args:
+            file_path (str): Path of the chat file
+            messages (Sequence[str]): Chat messages
+
+        Returns:
+            tuple: (canonical_path, kind) where kind is "exact" or "near",
+                   or (None, None) if the chat is not a duplicate
+        """
+        chat_fingerprint = fingerprint(messages)
+        if chat_fingerprint is None:
+            return None, None
+        return self.check_fingerprint(file_path, *chat_fingerprint)
+
+    def check_fingerprint(self, file_path, digest, signature):
+        """
+        Like ``check``, for a chat already fingerprinted (e.g. in a worker process).
+
+        Args:
+            file_path (str): Path of the chat file
+            digest (str): Content hash from ``fingerprint``
+            signature (int): SimHash signature from ``fingerprint``, or None
+
+        Returns:
+            tuple: (canonical_path, kind) or (None, None), as for ``check``
+        """
+        if digest in self.exact:
+            return self.exact[digest], "exact"
+
+        if signature is not None:
+            candidates = {path for key in self._band_keys(signature) for path in self.bands.get(key, ())}
+            for path in sorted(candidates):
+                if bin(signature ^ self.signatures[path]).count("1") <= self.max_distance:
+                    return path, "near"
+
+        self.exact[digest] = file_path
+        if signature is not None:
+            self.signatures[file_path] = signature
+            for key in self._band_keys(signature):
+                self.bands.setdefault(key, []).append(file_path)
+        return None, None
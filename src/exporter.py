@@ -0,0 +1,254 @@
+"""
+Metrics exporter module for LLM Chat Indexer.
+
+Publishes the live state of a run in the Prometheus text exposition format,
+either from a local HTTP endpoint (``/metrics``) that Prometheus or a plain
+``curl`` can scrape, or as a file rewritten at a fixed interval (e.g. for the
+node_exporter textfile collector). Neither needs any external service.
+"""
+
+import os
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger("LLMChatIndexer")
+
+PREFIX = "chat_indexer"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+
+class _Writer:
+    """Accumulates metric families in exposition format."""
+
+    def __init__(self):
+        self.lines = []
+
+    def family(self, name, kind, help_text, samples):
+        """
+        Add one metric family.
+
+        Args:
+            name (str): Metric name without the common prefix
+            kind (str): "counter", "gauge" or "histogram"
+            help_text (str): Description
+            samples (list): (suffix, labels, value) tuples
+        """
+        name = f"{PREFIX}_{name}"
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+        for suffix, labels, value in samples:
+            self.lines.append(f"{name}{suffix}{_labels(labels)} {_number(value)}")
+
+    def text(self):
+        return "\n".join(self.lines) + "\n"
+
+
+def render(run_metrics, llm_client=None):
+    """
+    Render the run's metrics in the Prometheus text format.
+
+    Args:
+        run_metrics (RunMetrics): Recorder of the running indexing run
+        llm_client (LLMClient, optional): Client whose token, cache and fallback counters are included
+
+    Returns:
+        str: Exposition text
+    """
+    state = run_metrics.snapshot()
+    counters = state["counters"]
+    gauges = state["gauges"]
+    stages = state["stages"]
+    out = _Writer()
+
+    out.family("elapsed_seconds", "gauge", "Seconds since the run started", [("", {}, state["elapsed_seconds"])])
+
+    discovered = gauges.get("files_discovered", 0)
+    completed = counters.get("files_completed", 0)
+    out.family("files_discovered", "gauge", "Chat files found in the input directory", [("", {}, discovered)])
+    out.family("files_processed_total", "counter", "Chat files fully processed", [("", {}, completed)])
+    out.family(
+        "files_pending", "gauge", "Chat files not processed yet", [("", {}, max(0, discovered - completed))]
+    )
+    out.family(
+        "batch_queue_depth", "gauge", "Small chats queued for the next batched request",
+        [("", {}, gauges.get("batch_queue_depth", 0))],
+    )
+    out.family(
+        "llm_in_flight", "gauge", "Provider requests currently in flight", [("", {}, gauges.get("llm_in_flight", 0))]
+    )
+
+    llm_calls = stages.get("llm_call", {}).get("count", 0)
+    out.family("llm_requests_total", "counter", "Provider requests made", [("", {}, llm_calls)])
+    out.family("llm_errors_total", "counter", "Provider requests that failed", [("", {}, counters.get("llm_errors", 0))])
+    out.family(
+        "retries_total", "counter", "Provider requests retried, by error",
+        [("", {"error": name[len("retry:"):]}, value) for name, value in sorted(counters.items()) if name.startswith("retry:")]
+        or [("", {"error": "none"}, 0)],
+    )
+
+    hits = {"dedup": counters.get("dedup_hits", 0)}
+    if llm_client is not None:
+        hits["coalesced"] = getattr(llm_client, "coalesced_requests", 0)
+        cassette = getattr(llm_client, "cassette", None)
+        if cassette is not None:
+            hits["cassette"] = cassette.replayed
+    out.family(
+        "cache_hits_total", "counter", "Analyses served without a new provider request, by cache",
+        [("", {"cache": cache}, value) for cache, value in hits.items()],
+    )
+    lookups = sum(hits.values()) + llm_calls
+    out.family(
+        "cache_hit_ratio", "gauge", "Share of analyses served from a cache",
+        [("", {}, sum(hits.values()) / lookups if lookups else 0.0)],
+    )
+
+    if llm_client is not None:
+        out.family(
+            "fallbacks_total", "counter", "LLM calls answered with offline fallback output",
+            [("", {}, getattr(llm_client, "degraded_calls", 0))],
+        )
+        out.family(
+            "timed_out_requests_total", "counter", "Provider requests that hit their timeout",
+            [("", {}, getattr(llm_client, "timed_out_requests", 0))],
+        )
+        out.family(
+            "hedged_requests_total", "counter", "Slow requests hedged to a second provider",
+            [("", {}, getattr(llm_client, "hedged_requests", 0))],
+        )
+        budget = getattr(llm_client, "budget", None)
+        if budget is not None:
+            usage = budget.snapshot()["total"]
+            out.family(
+                "tokens_total", "counter", "Tokens consumed",
+                [
+                    ("", {"direction": "input"}, usage["input_tokens"]),
+                    ("", {"direction": "output"}, usage["output_tokens"]),
+                ],
+            )
+            out.family("cost_dollars_total", "counter", "Estimated spend", [("", {}, usage["cost"])])
+
+    samples = []
+    for stage, histogram in stages.items():
+        for bound, cumulative in histogram["buckets"].items():
+            samples.append(("_bucket", {"stage": stage, "le": bound}, cumulative))
+        samples.append(("_sum", {"stage": stage}, histogram["sum"]))
+        samples.append(("_count", {"stage": stage}, histogram["count"]))
+    out.family("stage_seconds", "histogram", "Duration of pipeline stages and LLM calls", samples)
+
+    return out.text()
+
+
+class MetricsExporter:
+    """Serves and/or periodically writes the metrics of a running run."""
+
+    def __init__(self, run_metrics, llm_client=None, port=None, host="127.0.0.1", path=None, interval=15.0):
+        """
+        Initialize the exporter.
+
+        Args:
+            run_metrics (RunMetrics): Recorder of the run
+            llm_client (LLMClient, optional): Client whose counters are included
+            port (int, optional): Port of the HTTP endpoint (0 picks a free port); None disables it
+            host (str): Address the HTTP endpoint binds to
+            path (str, optional): File rewritten every ``interval`` seconds; None disables it
+            interval (float): Seconds between file rewrites
+        """
+        self.run_metrics = run_metrics
+        self.llm_client = llm_client
+        self.port = port
+        self.host = host
+        self.path = path
+        self.interval = interval
+        self._server = None
+        self._threads = []
+        self._stop = threading.Event()
+
+    def render(self):
+        """Current metrics in exposition format."""
+        return render(self.run_metrics, self.llm_client)
+
+    @property
+    def url(self):
+        """URL of the HTTP endpoint, or None."""
+        if self._server is None:
+            return None
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self):
+        """Start the HTTP endpoint and the file writer that are configured."""
+        if self.port is not None:
+            exporter = self
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.split("?")[0] not in ("/", "/metrics"):
+                        self.send_error(404)
+                        return
+                    body = exporter.render().encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", CONTENT_TYPE)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    logger.debug("Metrics endpoint: " + format, *args)
+
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+            self._server.daemon_threads = True
+            self._start_thread(self._server.serve_forever, "metrics-http")
+        if self.path:
+            self._start_thread(self._write_periodically, "metrics-file")
+
+    def _start_thread(self, target, name):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def write(self):
+        """Atomically rewrite the metrics file."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(temp_path, self.path)
+
+    def _write_periodically(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except OSError as e:
+                logger.warning(f"Could not write metrics file {self.path}: {str(e)}")
+
+    def stop(self):
+        """Stop serving, leaving a final metrics file behind."""
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if self.path:
+            self.write()
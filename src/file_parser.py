@@ -5,13 +5,43 @@ Handles various file formats to extract chat messages.
 
 import os
 import json
+import mmap
 import logging
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
 from bs4 import BeautifulSoup
 from markdown import markdown
 
+from src.metrics import timed
+
 logger = logging.getLogger("LLMChatIndexer")
 
+# Keys holding per-message timestamps in JSON chat exports
+JSON_TIME_KEYS = ("timestamp", "time", "created_at", "date")
+
+
+class TimedMessages(list):
+    """List of messages carrying the raw per-message timestamps from the export."""
+
+    def __init__(self, messages, times):
+        super().__init__(messages)
+        self.times = times
+
+
+def _with_times(entries, text_key):
+    """Collect message text and timestamps from JSON entries."""
+    messages = []
+    times = []
+    for entry in entries:
+        if text_key in entry:
+            messages.append(entry.get(text_key, ""))
+            times.append(next((entry[key] for key in JSON_TIME_KEYS if key in entry), None))
+    if any(t is not None for t in times):
+        return TimedMessages(messages, times)
+    return messages
+
 
 def parse_file(file_path, content):
     """
@@ -60,9 +90,9 @@ def parse_file(file_path, content):
         try:
             data = json.loads(content)
             if isinstance(data, list):
-                return [entry.get("message", "") for entry in data if "message" in entry]
+                return _with_times(data, "message")
             elif isinstance(data, dict) and "messages" in data:
-                return [entry.get("content", "") for entry in data["messages"] if "content" in entry]
+                return _with_times(data["messages"], "content")
             logger.warning(f"Unsupported JSON structure in {file_path}")
         except json.JSONDecodeError as e:
             logger.error(f"Invalid JSON in {file_path}: {str(e)}")
@@ -108,3 +138,203 @@ def parse_file(file_path, content):
     except Exception as e:
         logger.error(f"Unexpected error processing file {file_path}: {str(e)}")
         return []
+
+
+# Bytes scanned per vectorised newline search inside a chunk; bounds the size of
+# the temporary boolean mask numpy allocates.
+SCAN_BLOCK_SIZE = 64 * 1024 * 1024
+
+
+class MappedLines(Sequence):
+    """
+    Read-only sequence of lines backed by a memory-mapped file.
+
+    Lines are stored as (start, end) byte offsets into the mapping and only
+    decoded when accessed, so a multi-GB transcript costs 16 bytes per line
+    rather than a Python string per line. Slices are views over the same
+    mapping and stay lazy too; only the sequence that mapped the file closes it.
+    """
+
+    def __init__(self, file_path, starts, ends):
+        self.file_path = file_path
+        self.starts = starts
+        self.ends = ends
+        self._file = None
+        self._mmap = None
+        self._owns_mapping = True
+        if len(starts):
+            self._file = open(file_path, "rb")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            view = MappedLines.__new__(MappedLines)
+            view.file_path = self.file_path
+            # numpy slices share the offset arrays instead of copying them
+            view.starts = self.starts[index]
+            view.ends = self.ends[index]
+            view._file = None
+            view._mmap = self._mmap
+            view._owns_mapping = False
+            return view
+        start, end = self.offsets(index)
+        return self._mmap[start:end].decode("utf-8", errors="replace")
+
+    def offsets(self, index):
+        """
+        Get the byte offsets of a line.
+
+        Args:
+            index (int): Line index
+
+        Returns:
+            tuple: (start, end) byte offsets, end exclusive
+        """
+        return int(self.starts[index]), int(self.ends[index])
+
+    def close(self):
+        """Release the memory mapping and file handle; views only drop their reference."""
+        if self._mmap is not None:
+            if self._owns_mapping:
+                self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def find_chunk_boundaries(file_path, num_chunks):
+    """
+    Split a file into byte ranges that start at the beginning of a line.
+
+    Args:
+        file_path (str): Path to the file
+        num_chunks (int): Desired number of chunks
+
+    Returns:
+        list: (start, end) byte ranges covering the whole file
+    """
+    size = os.path.getsize(file_path)
+    if size == 0:
+        return []
+
+    boundaries = [0]
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for i in range(1, max(num_chunks, 1)):
+            newline = mm.find(b"\n", max(size * i // num_chunks, boundaries[-1]))
+            if newline == -1 or newline + 1 >= size:
+                break
+            if newline + 1 > boundaries[-1]:
+                boundaries.append(newline + 1)
+    boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def _scan_line_offsets(file_path, start, end):
+    """
+    Find line offsets within a line-aligned byte range of a file.
+
+    Runs in a worker process, which maps the file itself so that only the
+    offset arrays travel back to the parent.
+
+    Args:
+        file_path (str): Path to the file
+        start (int): First byte of the range (start of a line)
+        end (int): Byte after the range
+
+    Returns:
+        tuple: numpy arrays of line start and end offsets
+    """
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        data = np.frombuffer(mm, dtype=np.uint8)
+        try:
+            newlines = [
+                np.flatnonzero(data[block:min(block + SCAN_BLOCK_SIZE, end)] == 10) + block
+                for block in range(start, end, SCAN_BLOCK_SIZE)
+            ]
+            newlines = np.concatenate(newlines) if newlines else np.empty(0, dtype=np.int64)
+            newlines = newlines.astype(np.int64)
+
+            starts = np.concatenate(([start], newlines + 1))
+            ends = np.concatenate((newlines, [end]))
+            # A trailing newline does not open another line (same as str.splitlines)
+            if starts[-1] >= end:
+                starts, ends = starts[:-1], ends[:-1]
+
+            # Treat CRLF as a single line break
+            has_text = ends > starts
+            carriage = np.zeros(len(ends), dtype=bool)
+            carriage[has_text] = data[ends[has_text] - 1] == 13
+            ends = ends - carriage
+        finally:
+            del data
+    return starts, ends
+
+
+def parse_large_txt(file_path, workers=None):
+    """
+    Parse a large plain-text transcript without loading it into memory.
+
+    The file is memory-mapped, split into line-aligned chunks and scanned for
+    line breaks in parallel worker processes.
+
+    Args:
+        file_path (str): Path to the file
+        workers (int, optional): Number of worker processes. Defaults to the CPU count.
+
+    Returns:
+        MappedLines: Lines of the file as lazily decoded offsets
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = find_chunk_boundaries(file_path, workers)
+    logger.debug("Scanning %s in %d chunks", file_path, len(chunks))
+
+    if not chunks:
+        return MappedLines(file_path, np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+
+    if workers == 1 or len(chunks) == 1:
+        results = [_scan_line_offsets(file_path, start, end) for start, end in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+            futures = [executor.submit(_scan_line_offsets, file_path, start, end) for start, end in chunks]
+            results = [future.result() for future in futures]
+
+    starts = np.concatenate([r[0] for r in results])
+    ends = np.concatenate([r[1] for r in results])
+    return MappedLines(file_path, starts, ends)
+
+
+def parse_path(file_path, large_file_threshold=None, workers=None):
+    """
+    Read a file from disk and extract its chat messages.
+
+    Plain-text files at or above ``large_file_threshold`` bytes take the
+    memory-mapped path; everything else is read and handed to ``parse_file``.
+
+    Args:
+        file_path (str): Path to the file
+        large_file_threshold (int, optional): Size in bytes from which .txt files are memory-mapped
+        workers (int, optional): Worker processes for large-file parsing
+
+    Returns:
+        Sequence: Extracted messages. Large files return a MappedLines that should be closed.
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == ".txt" and large_file_threshold and os.path.getsize(file_path) >= large_file_threshold:
+        logger.info(f"Memory-mapping large transcript {file_path}")
+        with timed("parse"):
+            return parse_large_txt(file_path, workers)
+
+    with timed("read"), open(file_path, "r", encoding="utf-8") as f:
+        content = f.read()
+    with timed("parse"):
+        return parse_file(file_path, content)
@@ -0,0 +1,245 @@
+"""
+HTTP connection pool module for LLM Chat Indexer.
+
+Provides long-lived, pooled httpx clients for provider calls so connections
+(and their TLS handshakes) are reused across requests, and counts new
+connections, handshakes and requests to show how well the pool is used.
+
+Async connections belong to the event loop that opened them, and segmented
+files run their sessions on a fresh loop per file (one per stream worker), so
+the pool keeps one async client per loop instead of a single shared one.
+"""
+
+import asyncio
+import logging
+import weakref
+import threading
+import importlib.util
+import httpx
+import litellm
+from litellm.llms.custom_httpx.http_handler import AsyncHTTPHandler, HTTPHandler
+
+logger = logging.getLogger("LLMChatIndexer")
+
+# Providers whose litellm handler accepts a pooled ``HTTPHandler``/``AsyncHTTPHandler``
+# per call; OpenAI SDK providers read litellm's client sessions instead
+HANDLER_PROVIDERS = ("gemini", "vertex_ai", "anthropic")
+
+
+class PoolStats:
+    """Counters fed by httpcore trace events."""
+
+    def __init__(self):
+        self.requests = 0
+        self.connections_opened = 0
+        self.tls_handshakes = 0
+        self._lock = threading.Lock()
+
+    def trace(self, event_name, info):
+        """Count connection setup and request events."""
+        with self._lock:
+            if event_name == "connection.connect_tcp.complete":
+                self.connections_opened += 1
+            elif event_name == "connection.start_tls.complete":
+                self.tls_handshakes += 1
+            elif event_name.endswith(".send_request_headers.started"):
+                self.requests += 1
+
+
+class _LoopClient(httpx.AsyncClient):
+    """
+    Async client installed once as ``litellm.aclient_session``.
+
+    litellm caches the OpenAI SDK clients built around this session across
+    event loops, so it holds no connections itself and sends every request
+    through the pool of the loop it runs on.
+    """
+
+    def __init__(self, pool):
+        super().__init__()
+        self._pool = pool
+
+    async def send(self, request, **kwargs):
+        return await self._pool.async_client().send(request, **kwargs)
+
+
+class HTTPPool:
+    """Pooled sync and async HTTP clients shared by all provider calls."""
+
+    def __init__(self, max_connections=100, max_keepalive_connections=20, keepalive_expiry=30.0, http2=True):
+        """
+        Initialize the pool; clients are created on first use.
+
+        Args:
+            max_connections (int): Maximum open connections per client
+            max_keepalive_connections (int): Idle connections kept alive for reuse
+            keepalive_expiry (float): Seconds an idle connection is kept
+            http2 (bool): Negotiate HTTP/2 where the server supports it (requires the ``h2`` package)
+        """
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+        if http2 and not self.http2:
+            logger.debug("h2 package not installed, using HTTP/1.1 connection pooling")
+        self.stats = PoolStats()
+        self._sync_client = None
+        self._sync_handler = None
+        # Async handlers are bound to the event loop their connections were opened on
+        self._async_handlers = weakref.WeakKeyDictionary()
+        self._async_lock = threading.Lock()
+        self._loop_client = None
+
+    def _trace_hook(self, request):
+        request.extensions["trace"] = self.stats.trace
+
+    async def _async_trace_hook(self, request):
+        async def trace(event_name, info):
+            self.stats.trace(event_name, info)
+
+        request.extensions["trace"] = trace
+
+    @property
+    def sync_client(self):
+        """The shared synchronous client."""
+        if self._sync_client is None:
+            self._sync_client = httpx.Client(
+                limits=self.limits, http2=self.http2, event_hooks={"request": [self._trace_hook]}
+            )
+        return self._sync_client
+
+    @property
+    def sync_handler(self):
+        """The litellm HTTP handler around the shared synchronous client."""
+        if self._sync_handler is None:
+            self._sync_handler = HTTPHandler(client=self.sync_client)
+        return self._sync_handler
+
+    def sync_request_kwargs(self, model):
+        """
+        Keyword arguments that route one synchronous litellm call through the pool.
+
+        Args:
+            model (str): Model identifier
+
+        Returns:
+            dict: Extra ``completion`` arguments
+        """
+        if model.split("/")[0] in HANDLER_PROVIDERS:
+            return {"client": self.sync_handler}
+        return {}
+
+    def async_handler(self):
+        """
+        The pooled litellm HTTP handler for the running event loop.
+
+        Each loop gets its own handler, since pooled connections cannot move
+        between loops; loops on different threads never share one.
+
+        Returns:
+            AsyncHTTPHandler: Handler whose client pools this loop's connections
+        """
+        loop = asyncio.get_running_loop()
+        with self._async_lock:
+            handler = self._async_handlers.get(loop)
+            if handler is None:
+                handler = AsyncHTTPHandler(
+                    transport=httpx.AsyncHTTPTransport(limits=self.limits, http2=self.http2),
+                    event_hooks={"request": [self._async_trace_hook]},
+                )
+                self._async_handlers[loop] = handler
+        return handler
+
+    def async_client(self):
+        """
+        The pooled asynchronous client for the running event loop.
+
+        Returns:
+            httpx.AsyncClient: Pooled client
+        """
+        return self.async_handler().client
+
+    def request_kwargs(self, model):
+        """
+        Keyword arguments that route one async litellm call through the running loop's pool.
+
+        Providers served by litellm's own HTTP handler take the handler per
+        call; OpenAI SDK providers go through the session set by ``install``.
+
+        Args:
+            model (str): Model identifier
+
+        Returns:
+            dict: Extra ``acompletion`` arguments
+        """
+        if model.split("/")[0] in HANDLER_PROVIDERS:
+            return {"client": self.async_handler()}
+        return {}
+
+    async def aclose(self):
+        """Close the running event loop's async client; await it before the loop finishes."""
+        loop = asyncio.get_running_loop()
+        with self._async_lock:
+            handler = self._async_handlers.pop(loop, None)
+        if handler is not None:
+            await handler.close()
+
+    def install(self):
+        """Route the provider calls of OpenAI SDK providers, which read litellm's client sessions, through the pool."""
+        litellm.client_session = self.sync_client
+        if self._loop_client is None:
+            self._loop_client = _LoopClient(self)
+        litellm.aclient_session = self._loop_client
+
+    def _open_connections(self):
+        """Connections currently held by the pools; relies on httpcore internals and may report 0."""
+        total = 0
+        with self._async_lock:
+            async_clients = [handler.client for handler in self._async_handlers.values()]
+        for client in [self._sync_client, *async_clients]:
+            pool = getattr(getattr(client, "_transport", None), "_pool", None)
+            total += len(getattr(pool, "connections", ()))
+        return total
+
+    def snapshot(self):
+        """
+        Summarize pool utilization.
+
+        Returns:
+            dict: Requests, new connections, TLS handshakes and connection reuse
+        """
+        stats = self.stats
+        return {
+            "requests": stats.requests,
+            "connections_opened": stats.connections_opened,
+            "tls_handshakes": stats.tls_handshakes,
+            "reused_connection_ratio": round(1 - stats.connections_opened / stats.requests, 4) if stats.requests else 0.0,
+            "open_connections": self._open_connections(),
+            "max_connections": self.limits.max_connections,
+            "http2": self.http2,
+        }
+
+    def close(self):
+        """Close the synchronous client, any async clients left on idle loops, and detach the pool from litellm."""
+        if litellm.client_session is self._sync_client:
+            litellm.client_session = None
+        if self._loop_client is not None:
+            if litellm.aclient_session is self._loop_client:
+                litellm.aclient_session = None
+            self._loop_client = None
+        if self._sync_client is not None:
+            self._sync_client.close()
+            self._sync_client = None
+        self._sync_handler = None
+        # Async clients can only be closed on their own loop; clients whose loop
+        # already finished without ``aclose`` are dropped
+        with self._async_lock:
+            handlers = list(self._async_handlers.items())
+            self._async_handlers.clear()
+        for loop, handler in handlers:
+            if loop.is_closed() or loop.is_running():
+                logger.debug("Dropping async HTTP client of an event loop that was not closed through the pool")
+            else:
+                loop.run_until_complete(handler.close())
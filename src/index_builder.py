@@ -1,9 +1,14 @@
 """
 Index builder module for creating searchable indexes and summaries.
+
+``build_index`` writes the index of a finished run in one go;
+``StreamingIndexWriter`` appends entries as they are produced, so a run over a
+huge corpus never holds the whole index in memory.
 """
 
 import os
 import json
+import shutil
 import logging
 import traceback
 from datetime import datetime
@@ -11,6 +16,82 @@ from datetime import datetime
 logger = logging.getLogger("LLMChatIndexer")
 
 
+def format_timestamp(file_entry):
+    """
+    Add a readable "formatted_date" to an index entry with an ISO timestamp.
+
+    Args:
+        file_entry (dict): Index entry, updated in place
+    """
+    timestamp = file_entry.get("timestamp", "")
+    if timestamp:
+        # Parse ISO format and format as more readable
+        try:
+            dt = datetime.fromisoformat(timestamp)
+            file_entry["formatted_date"] = dt.strftime("%Y-%m-%d %H:%M:%S")
+            logger.debug("Formatted timestamp for %s", file_entry.get("filename", "unknown file"))
+        except (ValueError, TypeError):
+            logger.warning(
+                f"Invalid timestamp format: {timestamp} for file {file_entry.get('filename', 'unknown file')}"
+            )
+            file_entry["formatted_date"] = timestamp
+    else:
+        logger.debug("No timestamp found for %s", file_entry.get("filename", "unknown file"))
+
+
+def _write_summary_header(f, file_count):
+    # Write header with generation timestamp
+    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    f.write(f"# Chat Summaries\n\n")
+    f.write(f"*Generated on: {current_time}*\n\n")
+    f.write(f"This document contains summaries of {file_count} chat files.\n\n")
+
+    # Add table of contents
+    f.write("## Table of Contents\n\n")
+
+
+def _toc_line(i, entry):
+    filename = entry.get("filename", f"File {i + 1}")
+    anchor = filename.lower().replace(".", "-").replace(" ", "-")
+    return f"- [{filename}](#{anchor})\n"
+
+
+def _write_summary_section(f, entry):
+    filename = entry.get("filename", "")
+    summary = entry.get("summary", "No summary available")
+    topics = entry.get("topics", [])
+    timestamp = entry.get("formatted_date", entry.get("timestamp", ""))
+    message_count = entry.get("message_count", 0)
+    participants = entry.get("participants", [])
+
+    f.write(f"## {filename}\n\n")
+
+    # File metadata section
+    f.write("### Metadata\n\n")
+    if timestamp:
+        f.write(f"**Date:** {timestamp}\n\n")
+    if message_count:
+        f.write(f"**Messages:** {message_count}\n\n")
+    if participants:
+        f.write(f"**Participants:** {', '.join(participants)}\n\n")
+    if topics:
+        f.write(f"**Topics:** {', '.join(topics)}\n\n")
+
+    # Summary section
+    f.write("### Summary\n\n")
+    f.write(f"{summary}\n\n")
+
+    # Key points section if available
+    key_points = entry.get("key_points", [])
+    if key_points:
+        f.write("### Key Points\n\n")
+        for point in key_points:
+            f.write(f"- {point}\n")
+        f.write("\n")
+
+    f.write("---\n\n")
+
+
 def build_index(index_data, output_dir, index_filename, summary_filename):
     """
     Build JSON index and markdown summary files.
@@ -44,20 +125,7 @@ def build_index(index_data, output_dir, index_filename, summary_filename):
         # Format timestamps for better readability in the index
         logger.info("Formatting timestamps for index entries")
         for file_entry in index_data["files"]:
-            timestamp = file_entry.get("timestamp", "")
-            if timestamp:
-                # Parse ISO format and format as more readable
-                try:
-                    dt = datetime.fromisoformat(timestamp)
-                    file_entry["formatted_date"] = dt.strftime("%Y-%m-%d %H:%M:%S")
-                    logger.debug(f"Formatted timestamp for {file_entry.get('filename', 'unknown file')}")
-                except (ValueError, TypeError):
-                    logger.warning(
-                        f"Invalid timestamp format: {timestamp} for file {file_entry.get('filename', 'unknown file')}"
-                    )
-                    file_entry["formatted_date"] = timestamp
-            else:
-                logger.debug(f"No timestamp found for {file_entry.get('filename', 'unknown file')}")
+            format_timestamp(file_entry)
 
         # Write JSON index
         index_path = os.path.join(output_dir, index_filename)
@@ -70,55 +138,14 @@ def build_index(index_data, output_dir, index_filename, summary_filename):
         summary_path = os.path.join(output_dir, summary_filename)
         logger.info(f"Generating markdown summary to {summary_path}")
         with open(summary_path, "w", encoding="utf-8") as f:
-            # Write header with generation timestamp
-            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            f.write(f"# Chat Summaries\n\n")
-            f.write(f"*Generated on: {current_time}*\n\n")
-            f.write(f"This document contains summaries of {len(index_data['files'])} chat files.\n\n")
-
-            # Add table of contents
-            f.write("## Table of Contents\n\n")
+            _write_summary_header(f, len(index_data["files"]))
             for i, entry in enumerate(index_data["files"]):
-                filename = entry.get("filename", f"File {i + 1}")
-                anchor = filename.lower().replace(".", "-").replace(" ", "-")
-                f.write(f"- [{filename}](#{anchor})\n")
+                f.write(_toc_line(i, entry))
             f.write("\n")
 
             # Add summaries
             for entry in index_data["files"]:
-                filename = entry.get("filename", "")
-                summary = entry.get("summary", "No summary available")
-                topics = entry.get("topics", [])
-                timestamp = entry.get("formatted_date", entry.get("timestamp", ""))
-                message_count = entry.get("message_count", 0)
-                participants = entry.get("participants", [])
-
-                f.write(f"## {filename}\n\n")
-
-                # File metadata section
-                f.write("### Metadata\n\n")
-                if timestamp:
-                    f.write(f"**Date:** {timestamp}\n\n")
-                if message_count:
-                    f.write(f"**Messages:** {message_count}\n\n")
-                if participants:
-                    f.write(f"**Participants:** {', '.join(participants)}\n\n")
-                if topics:
-                    f.write(f"**Topics:** {', '.join(topics)}\n\n")
-
-                # Summary section
-                f.write("### Summary\n\n")
-                f.write(f"{summary}\n\n")
-
-                # Key points section if available
-                key_points = entry.get("key_points", [])
-                if key_points:
-                    f.write("### Key Points\n\n")
-                    for point in key_points:
-                        f.write(f"- {point}\n")
-                    f.write("\n")
-
-                f.write("---\n\n")
+                _write_summary_section(f, entry)
 
         logger.info(f"Successfully wrote markdown summary with {len(index_data['files'])} file entries")
         return True
@@ -143,6 +170,87 @@ def build_index(index_data, output_dir, index_filename, summary_filename):
         return False
 
 
+class StreamingIndexWriter:
+    """
+    Writes the JSON index and the markdown summaries entry by entry.
+
+    Entries go to disk as they are added; only the table of contents and the
+    summary sections are kept apart in temporary files until ``close`` puts the
+    summary document together. The files have the same content as the ones
+    ``build_index`` writes and replace the previous index only once complete.
+    """
+
+    def __init__(self, output_dir, index_filename, summary_filename):
+        """
+        Open the output files.
+
+        Args:
+            output_dir (str): Directory to store output files
+            index_filename (str): Filename for JSON index
+            summary_filename (str): Filename for markdown summary
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        self.index_path = os.path.join(output_dir, index_filename)
+        self.summary_path = os.path.join(output_dir, summary_filename)
+        self.count = 0
+        self._index = open(self.index_path + ".tmp", "w", encoding="utf-8")
+        self._toc = open(self.summary_path + ".toc.tmp", "w+", encoding="utf-8")
+        self._sections = open(self.summary_path + ".sections.tmp", "w+", encoding="utf-8")
+        self._index.write('{\n  "files": [')
+
+    def add(self, entry):
+        """
+        Append one index entry.
+
+        Args:
+            entry (dict): Index entry; a "formatted_date" is added like in build_index
+        """
+        format_timestamp(entry)
+        # Indent the entry to its nesting in the index, matching json.dump(indent=2)
+        text = json.dumps(entry, indent=2).replace("\n", "\n    ")
+        self._index.write(f"{',' if self.count else ''}\n    {text}")
+        self._toc.write(_toc_line(self.count, entry))
+        _write_summary_section(self._sections, entry)
+        self.count += 1
+
+    def close(self, metadata=None):
+        """
+        Finish both files and move them into place.
+
+        Args:
+            metadata (dict, optional): Index metadata, e.g. the run's usage
+        """
+        self._index.write("\n  ]" if self.count else "]")
+        if metadata is not None:
+            self._index.write(',\n  "metadata": ' + json.dumps(metadata, indent=2).replace("\n", "\n  "))
+        self._index.write("\n}")
+        self._index.close()
+        os.replace(self.index_path + ".tmp", self.index_path)
+        logger.info(f"Successfully wrote JSON index with {self.count} file entries")
+
+        with open(self.summary_path + ".tmp", "w", encoding="utf-8") as f:
+            _write_summary_header(f, self.count)
+            self._toc.seek(0)
+            shutil.copyfileobj(self._toc, f)
+            f.write("\n")
+            self._sections.seek(0)
+            shutil.copyfileobj(self._sections, f)
+        self._remove_parts()
+        os.replace(self.summary_path + ".tmp", self.summary_path)
+        logger.info(f"Successfully wrote markdown summary with {self.count} file entries")
+
+    def abort(self):
+        """Drop the partial output, leaving any previous index in place."""
+        self._index.close()
+        os.remove(self.index_path + ".tmp")
+        self._remove_parts()
+
+    def _remove_parts(self):
+        for part in (self._toc, self._sections):
+            part.close()
+            os.remove(part.name)
+
+
 def get_timestamp(file_path):
     """
     Get ISO formatted timestamp from file's modification time.
@@ -158,17 +266,17 @@ def get_timestamp(file_path):
         return ""
 
     if not os.path.exists(file_path):
-        logger.warning(f"Cannot get timestamp for non-existent file: {file_path}")
+        logger.warning("Cannot get timestamp for non-existent file: %s", file_path)
         return ""
 
     try:
         timestamp = datetime.fromtimestamp(os.path.getmtime(file_path))
         iso_timestamp = timestamp.isoformat()
-        logger.debug(f"Retrieved timestamp {iso_timestamp} for {file_path}")
+        logger.debug("Retrieved timestamp %s for %s", iso_timestamp, file_path)
         return iso_timestamp
     except OSError as e:
-        logger.error(f"Error getting timestamp for {file_path}: {str(e)}")
+        logger.error("Error getting timestamp for %s: %s", file_path, e)
         return ""
     except Exception as e:
-        logger.error(f"Unexpected error getting timestamp for {file_path}: {str(e)}")
+        logger.error("Unexpected error getting timestamp for %s: %s", file_path, e)
         return ""
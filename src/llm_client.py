@@ -3,12 +3,19 @@ LLM client module for interacting with language models.
 Uses litellm to support various LLM providers.
 """
 
+import re
+import json
 import time
+import hashlib
 import logging
 import asyncio
+import threading
 import traceback
+import contextvars
+import concurrent.futures
+from contextlib import contextmanager
 from typing import List, Dict, Any, Optional, Union
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from tenacity import retry, wait_exponential, retry_if_exception_type
 from litellm import (
     completion,
     acompletion,
@@ -18,15 +25,118 @@ from litellm import (
     InvalidRequestError,
     AuthenticationError,
     ContextWindowExceededError,
+    Timeout,
 )
+from src.cascade import topics_valid, summary_valid
+from src.cassette import CassetteMiss
+from src.budget import DOWNGRADE
+from src import metrics
 
 logger = logging.getLogger("LLMChatIndexer")
 
+# Maximum characters of chat text sent in a single prompt (provider-dependent)
+MAX_MESSAGE_CHARS = 15000
+
+# Backoff between retries of temporary provider errors
+_BACKOFF = wait_exponential(multiplier=1, min=1, max=10)
+
+# Provider errors worth retrying
+_TEMPORARY_ERRORS = (RateLimitError, ServiceUnavailableError, Timeout)
+
+# Monotonic time by which the current file's LLM calls must finish; copied into async tasks
+_file_deadline = contextvars.ContextVar("file_deadline", default=None)
+
+
+@contextmanager
+def file_deadline(seconds):
+    """
+    Give the LLM calls made inside the block a shared deadline.
+
+    Requests are sent with at most the remaining time as their timeout, and
+    once the deadline has passed further requests are skipped in favour of
+    the offline fallbacks.
+
+    Args:
+        seconds (float): Time allowed for the block; 0 or None for no deadline
+
+    Yields:
+        float: The deadline in ``time.monotonic()`` time, or None
+    """
+    deadline = time.monotonic() + seconds if seconds else None
+    token = _file_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _file_deadline.reset(token)
+
+
+def _join_messages(messages, limit=MAX_MESSAGE_CHARS):
+    """
+    Join messages into prompt text, truncated to ``limit`` characters.
+
+    Stops reading messages once the limit is exceeded, so lazily decoded
+    sequences (e.g. memory-mapped transcripts) are never fully materialised.
+
+    Args:
+        messages (Sequence[str]): Chat messages
+        limit (int): Maximum number of characters to keep
+
+    Returns:
+        tuple: (message_text, truncated)
+    """
+    parts = []
+    length = -1
+    for message in messages:
+        parts.append(message)
+        length += len(message) + 1
+        if length > limit:
+            break
+
+    message_text = "\n".join(parts)
+    if len(message_text) > limit:
+        return message_text[:limit] + "...", True
+    return message_text, False
+
+
+def _request_key(messages):
+    """Stable key identifying a request by its prompt messages."""
+    return hashlib.sha256(json.dumps(messages, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def estimate_tokens(text):
+    """
+    Cheaply estimate the number of tokens in a piece of text.
+
+    Uses the common ~4 characters per token heuristic, which is close enough
+    for budgeting without running a provider-specific tokenizer.
+
+    Args:
+        text (str): Text to estimate
+
+    Returns:
+        int: Estimated token count
+    """
+    return max(1, len(text) // 4)
+
 
 class LLMClient:
     """Client for interacting with LLMs via litellm."""
 
-    def __init__(self, provider, max_retries=3, rate_limit_delay=1.0):
+    def __init__(
+        self,
+        provider,
+        max_retries=3,
+        rate_limit_delay=1.0,
+        batch_token_budget=4000,
+        router=None,
+        circuit_breaker=None,
+        cascade=None,
+        budget=None,
+        concurrency=None,
+        request_timeout=None,
+        http_pool=None,
+        cassette=None,
+    ):
         """
         Initialize LLM client with specified provider.
 
@@ -34,11 +144,44 @@ class LLMClient:
             provider (str): LLM provider identifier (e.g., 'gemini/gemini-2.0-flash')
             max_retries (int): Maximum number of retry attempts
             rate_limit_delay (float): Delay in seconds between API calls
+            batch_token_budget (int): Estimated prompt tokens per multi-document request
+            router (ProviderRouter, optional): Routes requests across several providers;
+                                               ``provider`` is used when omitted
+            circuit_breaker (CircuitBreaker, optional): Fails calls fast while the provider is down
+            cascade (CascadePolicy, optional): Tries cheaper models first and escalates on bad answers;
+                                               its models are called directly, bypassing the router
+            budget (RunBudget, optional): Accounts usage and enforces run-level limits
+            concurrency (AdaptiveLimiter, optional): Adapts the number of in-flight async requests
+            request_timeout (float, optional): Seconds before a single provider call is abandoned
+            http_pool (HTTPPool, optional): Pooled HTTP clients reused by all provider calls
+            cassette (Cassette, optional): Records provider calls, or replays them instead of calling the provider
         """
         self.provider = provider
+        self.router = router
+        self.circuit_breaker = circuit_breaker
+        self.cascade = cascade
+        self.budget = budget
+        self.concurrency = concurrency
+        self.request_timeout = request_timeout
+        self.http_pool = http_pool
+        if http_pool is not None:
+            http_pool.install()
+        self.cassette = cassette
+        self.timed_out_requests = 0
+        # Set on cancellation (e.g. Ctrl-C); no further requests are started
+        self.cancel_event = threading.Event()
+        # Calls answered by a local fallback instead of the LLM
+        self.degraded_calls = 0
+        self.hedged_requests = 0
+        self._hedge_executor = None
         self.max_retries = max_retries
         self.rate_limit_delay = rate_limit_delay
+        self.batch_token_budget = batch_token_budget
         self.last_request_time = 0
+        # Identical requests in flight are coalesced onto a single provider call
+        self.coalesced_requests = 0
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
 
     def _handle_rate_limit(self):
         """Implement basic rate limiting between requests."""
@@ -47,40 +190,477 @@ class LLMClient:
 
         if time_since_last_request < self.rate_limit_delay:
             sleep_time = self.rate_limit_delay - time_since_last_request
-            logger.debug(f"Rate limiting: sleeping for {sleep_time:.2f} seconds")
+            logger.debug("Rate limiting: sleeping for %.2f seconds", sleep_time)
             time.sleep(sleep_time)
+            metrics.observe("rate_limit_sleep", sleep_time)
 
         self.last_request_time = time.time()
 
+    async def _handle_rate_limit_async(self):
+        """Rate limiting for concurrent async requests without blocking the event loop."""
+        # Reserve the next free slot before sleeping so concurrent callers queue up behind it
+        current_time = time.time()
+        slot = max(current_time, self.last_request_time + self.rate_limit_delay)
+        self.last_request_time = slot
+
+        if slot > current_time:
+            logger.debug("Rate limiting: sleeping for %.2f seconds", slot - current_time)
+            await asyncio.sleep(slot - current_time)
+            metrics.observe("rate_limit_sleep", slot - current_time)
+
+    def _make_llm_request(self, messages, model=None):
+        """
+        Make a request to the LLM, joining an identical request already in flight.
+
+        Args:
+            messages (list): List of message objects
+            model (str, optional): Model to call instead of the routed provider
+
+        Returns:
+            ModelResponse: Response from the LLM or None if failed
+        """
+        key = (model, _request_key(messages))
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = concurrent.futures.Future()
+                self._inflight[key] = future
+
+        if not owner:
+            self.coalesced_requests += 1
+            logger.debug("Coalescing identical in-flight LLM request")
+            return future.result()
+
+        try:
+            response = self._request_with_retry(messages, model=model)
+            future.set_result(response)
+            return response
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    async def _make_llm_request_async(self, messages, model=None):
+        """
+        Make an asynchronous request to the LLM, joining an identical request already in flight.
+
+        Args:
+            messages (list): List of message objects
+            model (str, optional): Model to call instead of the routed provider
+
+        Returns:
+            ModelResponse: Response from the LLM or None if failed
+        """
+        loop = asyncio.get_running_loop()
+        key = (id(loop), model, _request_key(messages))
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced_requests += 1
+            logger.debug("Coalescing identical in-flight async LLM request")
+            return await asyncio.shield(future)
+
+        future = loop.create_future()
+        self._inflight[key] = future
+        try:
+            response = await self._request_with_retry_async(messages, model=model)
+            future.set_result(response)
+            return response
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved in case nobody else was waiting
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def _cascade_request(self, messages, chat_text, validate):
+        """
+        Send a request through the model cascade, escalating while answers fail validation.
+
+        Args:
+            messages (list): List of message objects
+            chat_text (str): Chat text the request is about, used to pick the first tier
+            validate (callable): Takes the answer content and returns whether it is usable
+
+        Returns:
+            ModelResponse: First accepted response, else the last one received, or None if all failed
+        """
+        if self.cascade is None:
+            return self._make_llm_request(messages)
+
+        best = None
+        for model in self.cascade.tiers[self.cascade.start_tier(chat_text, estimate_tokens(chat_text)) :]:
+            response = self._make_llm_request(messages, model=model)
+            accepted = response is not None and validate(response.choices[0].message.content)
+            self.cascade.record(model, response, accepted)
+            if accepted:
+                return response
+            best = response or best
+            if self.budget is not None and self.budget.exceeded():
+                break
+            logger.debug("Answer from cascade tier %s rejected, escalating", model)
+        return best
+
+    async def _cascade_request_async(self, messages, chat_text, validate):
+        """Async counterpart of ``_cascade_request``."""
+        if self.cascade is None:
+            return await self._make_llm_request_async(messages)
+
+        best = None
+        for model in self.cascade.tiers[self.cascade.start_tier(chat_text, estimate_tokens(chat_text)) :]:
+            response = await self._make_llm_request_async(messages, model=model)
+            accepted = response is not None and validate(response.choices[0].message.content)
+            self.cascade.record(model, response, accepted)
+            if accepted:
+                return response
+            best = response or best
+            if self.budget is not None and self.budget.exceeded():
+                break
+            logger.debug("Answer from cascade tier %s rejected, escalating", model)
+        return best
+
+    def _circuit_allows_retry(self):
+        """Whether retrying makes sense, i.e. the circuit has not opened meanwhile."""
+        return self.circuit_breaker is None or not self.circuit_breaker.is_open
+
+    def _retry_wait(self, retry_state):
+        """Backoff before a retry; skipped when the router can fail over to a healthy provider."""
+        if self.router is not None and self.router.has_healthy_provider():
+            return 0
+        return _BACKOFF(retry_state)
+
+    def _count_retry(self, error, wait):
+        """Record a retry of a temporary error and the backoff before it in the run metrics."""
+        metrics.count("retries")
+        metrics.count(f"retry:{type(error).__name__}")
+        metrics.observe("retry_sleep", wait)
+
+    def _record_outcome(self, model, latency, success):
+        """Feed the outcome of a provider call to the router, circuit breaker and run metrics."""
+        metrics.observe("llm_call", latency)
+        if not success:
+            metrics.count("llm_errors")
+        if self.router is not None:
+            self.router.record(model, latency, success)
+        if self.circuit_breaker is not None:
+            if success:
+                self.circuit_breaker.record_success()
+            else:
+                self.circuit_breaker.record_failure()
+
+    def close(self):
+        """Release pooled connections and helper threads."""
+        if self.http_pool is not None:
+            self.http_pool.close()
+        if self.cassette is not None:
+            self.cassette.close()
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
+            self._hedge_executor = None
+
+    async def aclose(self):
+        """Release the running event loop's pooled connections; await it before the loop finishes."""
+        if self.http_pool is not None:
+            await self.http_pool.aclose()
+
+    def cancel(self):
+        """Stop starting new requests; calls still waiting fall back to offline output."""
+        self.cancel_event.set()
+
+    def _timeout(self):
+        """
+        Timeout for the next provider call, from the request timeout and the file deadline.
+
+        Returns:
+            float: Seconds, or None for no timeout
+        """
+        deadline = _file_deadline.get()
+        remaining = deadline - time.monotonic() if deadline is not None else None
+        if remaining is None:
+            return self.request_timeout
+        if self.request_timeout is None:
+            return remaining
+        return min(self.request_timeout, remaining)
+
+    def _allow_request(self):
+        """Check cancellation, the file deadline, the run budget and the circuit breaker before calling the provider."""
+        if self.cancel_event.is_set():
+            logger.debug("Run cancelled, skipping LLM request")
+            return False
+        deadline = _file_deadline.get()
+        if deadline is not None and time.monotonic() >= deadline:
+            logger.debug("File deadline passed, skipping LLM request")
+            return False
+        if self.budget is not None and self.budget.exceeded() and self.budget.action != DOWNGRADE:
+            logger.debug("Run budget exhausted, skipping LLM request")
+            return False
+        if self.circuit_breaker is None or self.circuit_breaker.allow_request():
+            return True
+        logger.debug("Circuit open, skipping LLM request")
+        return False
+
+    def _release_probe(self, recorded):
+        """Give back a half-open probe slot when its call ended without an outcome, e.g. when cancelled."""
+        if not recorded and self.circuit_breaker is not None:
+            self.circuit_breaker.release_probe()
+
+    def _budget_model(self, model):
+        """Model to call, switched to the downgrade model once the run budget is exhausted."""
+        if self.budget is not None and self.budget.action == DOWNGRADE and self.budget.exceeded():
+            return self.budget.downgrade_model
+        return model
+
+    def _record_cassette(self, model, messages, latency, response=None, error=None):
+        """Append a provider call to the cassette when recording; only temporary errors are kept."""
+        if self.cassette is None or self.cassette.replaying:
+            return
+        if error is not None and not isinstance(error, _TEMPORARY_ERRORS):
+            return
+        self.cassette.record(model, messages, latency, response=response, error=error)
+
+    def _replay(self, outcome, delay, timeout, model):
+        """Serve a recorded outcome after its replayed latency, timing out like a live call would."""
+        if timeout is not None and delay > timeout:
+            time.sleep(max(timeout, 0))
+            raise Timeout(f"Request timed out after {timeout:.1f}s", model=model, llm_provider=model.split("/")[0])
+        time.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    async def _replay_async(self, outcome, delay):
+        """Async counterpart of ``_replay``; the caller enforces the timeout."""
+        await asyncio.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def _call_provider(self, model, messages):
+        """
+        Call one provider and record its latency and outcome.
+
+        Args:
+            model (str): Model identifier
+            messages (list): List of message objects
+
+        Returns:
+            ModelResponse: Response from the LLM
+        """
+        pooled = self.http_pool.sync_request_kwargs(model) if self.http_pool is not None else {}
+        replaying = self.cassette is not None and self.cassette.replaying
+        timeout = self._timeout()
+        start = time.monotonic()
+        recorded = False
+        metrics.adjust("llm_in_flight", 1)
+        try:
+            if replaying:
+                outcome, delay = self.cassette.replay(model, messages)
+                response = self._replay(outcome, delay, timeout, model)
+            elif timeout is None:
+                response = completion(model=model, messages=messages, **pooled)
+            else:
+                response = completion(model=model, messages=messages, timeout=timeout, **pooled)
+        except CassetteMiss:
+            # Nothing was sent, so there is no provider outcome to record
+            raise
+        except (ContextWindowExceededError, InvalidRequestError):
+            # The request is at fault, not the provider, which did answer
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.record_success()
+            recorded = True
+            raise
+        except Exception as e:
+            if isinstance(e, Timeout):
+                self.timed_out_requests += 1
+            self._record_outcome(model, time.monotonic() - start, False)
+            recorded = True
+            self._record_cassette(model, messages, time.monotonic() - start, error=e)
+            raise
+        else:
+            self._record_outcome(model, time.monotonic() - start, True)
+            recorded = True
+        finally:
+            metrics.adjust("llm_in_flight", -1)
+            self._release_probe(recorded)
+        self._record_cassette(model, messages, time.monotonic() - start, response=response)
+        if self.budget is not None:
+            self.budget.record(model, response)
+        return response
+
+    async def _acall_provider(self, model, messages):
+        """Async counterpart of ``_call_provider``."""
+        pooled = self.http_pool.request_kwargs(model) if self.http_pool is not None else {}
+        timeout = self._timeout()
+        replaying = self.cassette is not None and self.cassette.replaying
+        start = time.monotonic()
+        recorded = False
+        metrics.adjust("llm_in_flight", 1)
+        try:
+            if replaying:
+                outcome, delay = self.cassette.replay(model, messages)
+                request = self._replay_async(outcome, delay)
+            elif timeout is None:
+                request = acompletion(model=model, messages=messages, **pooled)
+            else:
+                request = acompletion(model=model, messages=messages, timeout=timeout, **pooled)
+            # Enforce the deadline even if the provider client ignores its timeout
+            response = await (request if timeout is None else asyncio.wait_for(request, timeout))
+        except (CassetteMiss, asyncio.CancelledError):
+            raise
+        except (ContextWindowExceededError, InvalidRequestError):
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.record_success()
+            recorded = True
+            raise
+        except asyncio.TimeoutError:
+            self.timed_out_requests += 1
+            self._record_outcome(model, time.monotonic() - start, False)
+            recorded = True
+            error = Timeout(f"Request timed out after {timeout:.1f}s", model=model, llm_provider=model.split("/")[0])
+            self._record_cassette(model, messages, time.monotonic() - start, error=error)
+            raise error
+        except Exception as e:
+            if isinstance(e, Timeout):
+                self.timed_out_requests += 1
+            self._record_outcome(model, time.monotonic() - start, False)
+            recorded = True
+            self._record_cassette(model, messages, time.monotonic() - start, error=e)
+            raise
+        else:
+            self._record_outcome(model, time.monotonic() - start, True)
+            recorded = True
+        finally:
+            metrics.adjust("llm_in_flight", -1)
+            self._release_probe(recorded)
+        self._record_cassette(model, messages, time.monotonic() - start, response=response)
+        if self.budget is not None:
+            self.budget.record(model, response)
+        return response
+
+    def _call_routed(self, messages, model=None):
+        """
+        Send a request to the routed provider, hedging it if it runs unusually long.
+
+        Args:
+            messages (list): List of message objects
+            model (str, optional): Model to call directly instead of routing
+
+        Returns:
+            ModelResponse: Response from whichever provider answered first
+        """
+        if model is not None or self.router is None:
+            return self._call_provider(model or self.provider, messages)
+
+        model = self.router.choose()
+        delay = self.router.hedge_delay(model)
+        # A duplicate sent to the same provider is billed twice; without another
+        # provider, slow requests are left to the request and file deadlines
+        if delay is None or not self.router.has_healthy_alternative(model):
+            return self._call_provider(model, messages)
+
+        if self._hedge_executor is None:
+            self._hedge_executor = concurrent.futures.ThreadPoolExecutor(thread_name_prefix="llm-hedge")
+        # Run in a copy of the caller's context so usage is attributed to the right file
+        primary = self._hedge_executor.submit(contextvars.copy_context().run, self._call_provider, model, messages)
+        try:
+            return primary.result(timeout=delay)
+        except concurrent.futures.TimeoutError:
+            pass
+
+        hedge_model = self.router.alternate(model)
+        self.hedged_requests += 1
+        logger.info(f"Request to {model} exceeded {delay:.2f}s, hedging with {hedge_model}")
+        hedge = self._hedge_executor.submit(contextvars.copy_context().run, self._call_provider, hedge_model, messages)
+
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    async def _acall_routed(self, messages, model=None):
+        """Async counterpart of ``_call_routed``; the slower request is cancelled."""
+        if model is not None or self.router is None:
+            return await self._acall_provider(model or self.provider, messages)
+
+        model = self.router.choose()
+        delay = self.router.hedge_delay(model)
+        if delay is None or not self.router.has_healthy_alternative(model):
+            return await self._acall_provider(model, messages)
+
+        primary = asyncio.ensure_future(self._acall_provider(model, messages))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+
+        hedge_model = self.router.alternate(model)
+        self.hedged_requests += 1
+        logger.info(f"Request to {model} exceeded {delay:.2f}s, hedging with {hedge_model}")
+        hedge = asyncio.ensure_future(self._acall_provider(hedge_model, messages))
+
+        pending = {primary, hedge}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
     @retry(
-        stop=stop_after_attempt(lambda self: self.max_retries),
-        wait=wait_exponential(multiplier=1, min=1, max=10),
-        retry=retry_if_exception_type((RateLimitError, ServiceUnavailableError)),
+        stop=lambda retry_state: (
+            retry_state.attempt_number >= retry_state.args[0].max_retries
+            or not retry_state.args[0]._circuit_allows_retry()
+        ),
+        wait=lambda retry_state: retry_state.args[0]._retry_wait(retry_state),
+        before_sleep=lambda retry_state: retry_state.args[0]._count_retry(
+            retry_state.outcome.exception(), retry_state.next_action.sleep
+        ),
+        retry=retry_if_exception_type(_TEMPORARY_ERRORS),
         reraise=True,
     )
-    def _make_llm_request(self, messages):
+    def _request_with_retry(self, messages, model=None):
         """
         Make a request to the LLM with retry logic.
 
         Args:
             messages (list): List of message objects
+            model (str, optional): Model to call instead of the routed provider
 
         Returns:
             ModelResponse: Response from the LLM or None if failed
         """
+        if not self._allow_request():
+            return None
         self._handle_rate_limit()
         try:
-            return completion(model=self.provider, messages=messages)
-        except (RateLimitError, ServiceUnavailableError) as e:
+            return self._call_routed(messages, self._budget_model(model))
+        except _TEMPORARY_ERRORS as e:
             logger.warning(f"LLM API temporary error ({type(e).__name__}): {str(e)}. Retrying...")
             raise  # Will be caught by retry decorator
         except ContextWindowExceededError as e:
             logger.error(f"Context length exceeded: {str(e)}")
-            logger.debug(f"Message length: {sum(len(m.get('content', '')) for m in messages)}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Message length: %d", sum(len(m.get("content", "")) for m in messages))
             return None
         except InvalidRequestError as e:
             logger.error(f"Bad request to LLM API: {str(e)}")
-            logger.debug(f"Request messages: {messages}")
+            logger.debug("Request messages: %s", messages)
             return None
         except AuthenticationError as e:
             logger.error(f"Authentication error with LLM provider: {str(e)}")
@@ -90,41 +670,50 @@ class LLMClient:
             logger.error(f"Error details: {traceback.format_exc()}")
             return None
 
-    async def _make_llm_request_async(self, messages):
+    async def _request_with_retry_async(self, messages, model=None):
         """
-        Make an asynchronous request to the LLM.
+        Make an asynchronous request to the LLM with retry logic.
 
         Args:
             messages (list): List of message objects
+            model (str, optional): Model to call instead of the routed provider
 
         Returns:
             ModelResponse: Response from the LLM or None if failed
         """
-        self._handle_rate_limit()
+        await self._handle_rate_limit_async()
 
         # Implement retry logic manually for async
         retries = 0
         while retries <= self.max_retries:
+            if not self._allow_request():
+                return None
             try:
-                return await acompletion(model=self.provider, messages=messages)
-            except (RateLimitError, ServiceUnavailableError) as e:
+                if self.concurrency is None:
+                    return await self._acall_routed(messages, self._budget_model(model))
+                async with self.concurrency.slot():
+                    return await self._acall_routed(messages, self._budget_model(model))
+            except _TEMPORARY_ERRORS as e:
                 retries += 1
                 if retries > self.max_retries:
                     logger.error(f"Max retries ({self.max_retries}) exceeded for LLM request")
                     return None
 
-                wait_time = min(2**retries, 10)  # Exponential backoff
+                # Exponential backoff, unless another provider can take the retry
+                wait_time = 0 if self.router and self.router.has_healthy_provider() else min(2**retries, 10)
                 logger.warning(
                     f"LLM API temporary error ({type(e).__name__}): {str(e)}. Retrying in {wait_time}s... (Attempt {retries}/{self.max_retries})"
                 )
+                self._count_retry(e, wait_time)
                 await asyncio.sleep(wait_time)
             except ContextWindowExceededError as e:
                 logger.error(f"Context length exceeded: {str(e)}")
-                logger.debug(f"Message length: {sum(len(m.get('content', '')) for m in messages)}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Message length: %d", sum(len(m.get("content", "")) for m in messages))
                 return None
             except InvalidRequestError as e:
                 logger.error(f"Bad request to LLM API: {str(e)}")
-                logger.debug(f"Request messages: {messages}")
+                logger.debug("Request messages: %s", messages)
                 return None
             except AuthenticationError as e:
                 logger.error(f"Authentication error with LLM provider: {str(e)}")
@@ -149,26 +738,28 @@ class LLMClient:
             logger.warning("No messages provided for topic extraction")
             return []
 
-        # Join messages with separator for context
-        message_text = "\n".join(messages)
-
-        # Truncate if too long (provider-dependent)
-        if len(message_text) > 15000:
-            message_text = message_text[:15000] + "..."
+        # Join messages with separator for context, truncating if too long
+        message_text, truncated = _join_messages(messages)
+        if truncated:
             logger.info("Message text truncated to 15,000 characters for topic extraction")
 
         prompt = f"Extract exactly {max_keywords} key topics from this chat conversation. Return them as a comma-separated list with no additional text:\n\n{message_text}"
 
         try:
-            response = self._make_llm_request([
-                {
-                    "role": "system",
-                    "content": "You are a topic extraction assistant. Extract exactly the requested number of key topics and return only those topics as a comma-separated list with no explanations or other text.",
-                },
-                {"role": "user", "content": prompt},
-            ])
+            response = self._cascade_request(
+                [
+                    {
+                        "role": "system",
+                        "content": "You are a topic extraction assistant. Extract exactly the requested number of key topics and return only those topics as a comma-separated list with no explanations or other text.",
+                    },
+                    {"role": "user", "content": prompt},
+                ],
+                message_text,
+                lambda content: topics_valid(content, max_keywords),
+            )
 
             if response is None:
+                self.degraded_calls += 1
                 logger.warning("Topic extraction failed, using fallback extraction method")
                 # Simple fallback: extract most frequent words as topics
                 words = message_text.lower().split()
@@ -223,6 +814,7 @@ class LLMClient:
             return topics[:max_keywords]
 
         except Exception as e:
+            self.degraded_calls += 1
             logger.error(f"Failed to extract topics: {str(e)}")
             logger.error(f"Error details: {traceback.format_exc()}")
             # Return generic topics as fallback
@@ -243,26 +835,28 @@ class LLMClient:
             logger.warning("No messages provided for topic extraction")
             return []
 
-        # Join messages with separator for context
-        message_text = "\n".join(messages)
-
-        # Truncate if too long (provider-dependent)
-        if len(message_text) > 15000:
-            message_text = f"{message_text[:15000]}..."
+        # Join messages with separator for context, truncating if too long
+        message_text, truncated = _join_messages(messages)
+        if truncated:
             logger.info("Message text truncated to 15,000 characters for topic extraction")
 
         prompt = f"Extract exactly {max_keywords} key topics from this chat conversation. Return them as a comma-separated list with no additional text:\n\n{message_text}"
 
         try:
-            response = await self._make_llm_request_async([
-                {
-                    "role": "system",
-                    "content": "You are a topic extraction assistant. Extract exactly the requested number of key topics and return only those topics as a comma-separated list with no explanations or other text.",
-                },
-                {"role": "user", "content": prompt},
-            ])
+            response = await self._cascade_request_async(
+                [
+                    {
+                        "role": "system",
+                        "content": "You are a topic extraction assistant. Extract exactly the requested number of key topics and return only those topics as a comma-separated list with no explanations or other text.",
+                    },
+                    {"role": "user", "content": prompt},
+                ],
+                message_text,
+                lambda content: topics_valid(content, max_keywords),
+            )
 
             if response is None:
+                self.degraded_calls += 1
                 logger.warning("Async topic extraction failed, using fallback extraction method")
                 # Simple fallback: extract most frequent words as topics
                 words = message_text.lower().split()
@@ -317,6 +911,7 @@ class LLMClient:
             return topics[:max_keywords]
 
         except Exception as e:
+            self.degraded_calls += 1
             logger.error(f"Failed to extract topics asynchronously: {str(e)}")
             logger.error(f"Error details: {traceback.format_exc()}")
             # Return generic topics as fallback
@@ -336,26 +931,28 @@ class LLMClient:
             logger.warning("No messages provided for summarization")
             return "No content to summarize."
 
-        # Join messages with separator for context
-        message_text = "\n".join(messages)
-
-        # Truncate if too long (provider-dependent)
-        if len(message_text) > 15000:
-            message_text = message_text[:15000] + "..."
+        # Join messages with separator for context, truncating if too long
+        message_text, truncated = _join_messages(messages)
+        if truncated:
             logger.info("Message text truncated to 15,000 characters for summarization")
 
         prompt = f"Summarize this chat conversation in a concise paragraph:\n\n{message_text}"
 
         try:
-            response = self._make_llm_request([
-                {
-                    "role": "system",
-                    "content": "You are a summarization assistant. Create a concise, accurate summary of the provided conversation.",
-                },
-                {"role": "user", "content": prompt},
-            ])
+            response = self._cascade_request(
+                [
+                    {
+                        "role": "system",
+                        "content": "You are a summarization assistant. Create a concise, accurate summary of the provided conversation.",
+                    },
+                    {"role": "user", "content": prompt},
+                ],
+                message_text,
+                summary_valid,
+            )
 
             if response is None:
+                self.degraded_calls += 1
                 logger.warning("Summarization failed, generating basic fallback summary")
                 # Generate a basic fallback summary
                 word_count = len(message_text.split())
@@ -369,6 +966,7 @@ class LLMClient:
             return summary
 
         except Exception as e:
+            self.degraded_calls += 1
             logger.error(f"Failed to generate summary: {str(e)}")
             logger.error(f"Error details: {traceback.format_exc()}")
 
@@ -394,26 +992,28 @@ class LLMClient:
             logger.warning("No messages provided for summarization")
             return "No content to summarize."
 
-        # Join messages with separator for context
-        message_text = "\n".join(messages)
-
-        # Truncate if too long (provider-dependent)
-        if len(message_text) > 15000:
-            message_text = message_text[:15000] + "..."
+        # Join messages with separator for context, truncating if too long
+        message_text, truncated = _join_messages(messages)
+        if truncated:
             logger.info("Message text truncated to 15,000 characters for summarization")
 
         prompt = f"Summarize this chat conversation in a concise paragraph:\n\n{message_text}"
 
         try:
-            response = await self._make_llm_request_async([
-                {
-                    "role": "system",
-                    "content": "You are a summarization assistant. Create a concise, accurate summary of the provided conversation.",
-                },
-                {"role": "user", "content": prompt},
-            ])
+            response = await self._cascade_request_async(
+                [
+                    {
+                        "role": "system",
+                        "content": "You are a summarization assistant. Create a concise, accurate summary of the provided conversation.",
+                    },
+                    {"role": "user", "content": prompt},
+                ],
+                message_text,
+                summary_valid,
+            )
 
             if response is None:
+                self.degraded_calls += 1
                 logger.warning("Async summarization failed, generating basic fallback summary")
                 # Generate a basic fallback summary
                 word_count = len(message_text.split())
@@ -427,6 +1027,7 @@ class LLMClient:
             return summary
 
         except Exception as e:
+            self.degraded_calls += 1
             logger.error(f"Failed to generate summary asynchronously: {str(e)}")
             logger.error(f"Error details: {traceback.format_exc()}")
 
@@ -437,3 +1038,152 @@ class LLMClient:
                 return f"Unable to generate detailed summary. Conversation contains {msg_count} messages with approximately {word_count} words."
             except:
                 return "Unable to generate summary due to an error."
+
+    def analyze_documents(self, documents, max_keywords):
+        """
+        Extract topics and summaries for several small chats with as few requests as possible.
+
+        Documents are packed into multi-document requests up to
+        ``batch_token_budget`` estimated tokens, and the model is asked for a
+        JSON result per document. Documents whose result is missing or
+        malformed fall back to individual ``extract_topics``/``summarize`` calls.
+
+        Args:
+            documents (list): Message lists, one per chat
+            max_keywords (int): Maximum number of topics per chat
+
+        Returns:
+            list: (topics, summary) tuples in the order of ``documents``
+        """
+        texts = [_join_messages(messages)[0] for messages in documents]
+        results = [None] * len(documents)
+
+        for batch in self._pack_documents(texts):
+            if len(batch) > 1:
+                batch_results = self._request_batch([texts[i] for i in batch], max_keywords)
+                for i, result in zip(batch, batch_results):
+                    results[i] = result
+
+        for i, result in enumerate(results):
+            if result is None and documents[i]:
+                results[i] = (self.extract_topics(documents[i], max_keywords), self.summarize(documents[i]))
+            elif result is None:
+                results[i] = ([], "No content to summarize.")
+
+        return results
+
+    def _pack_documents(self, texts):
+        """
+        Group document indices into batches that fit the token budget.
+
+        Args:
+            texts (list): Prompt text per document
+
+        Returns:
+            list: Lists of document indices
+        """
+        batches = []
+        current = []
+        current_tokens = 0
+        for i, text in enumerate(texts):
+            tokens = estimate_tokens(text)
+            if current and current_tokens + tokens > self.batch_token_budget:
+                batches.append(current)
+                current = []
+                current_tokens = 0
+            current.append(i)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def _request_batch(self, texts, max_keywords):
+        """
+        Send one multi-document request and demultiplex the results.
+
+        Args:
+            texts (list): Prompt text per document
+            max_keywords (int): Maximum number of topics per document
+
+        Returns:
+            list: (topics, summary) per document, or None where the response was unusable
+        """
+        conversations = "\n\n".join(f"=== Conversation {i} ===\n{text}" for i, text in enumerate(texts, 1))
+        prompt = (
+            f"For each of the {len(texts)} chat conversations below, extract exactly {max_keywords} key topics "
+            f"and write a concise one-paragraph summary.\n\n{conversations}"
+        )
+
+        try:
+            response = self._cascade_request(
+                [
+                    {
+                        "role": "system",
+                        "content": "You are a chat analysis assistant. Respond with only a JSON array containing one object per conversation, with keys \"id\" (the conversation number), \"topics\" (list of strings) and \"summary\" (string).",
+                    },
+                    {"role": "user", "content": prompt},
+                ],
+                conversations,
+                lambda content: None not in _parse_batch_response(content, len(texts), max_keywords),
+            )
+        except Exception as e:
+            # Temporary errors are re-raised once retries run out; the documents fall back like a failed response
+            logger.warning(f"Batch request for {len(texts)} documents raised {type(e).__name__}: {str(e)}")
+            response = None
+
+        if response is None:
+            logger.warning(f"Batch request for {len(texts)} documents failed, falling back to single requests")
+            return [None] * len(texts)
+
+        results = _parse_batch_response(response.choices[0].message.content, len(texts), max_keywords)
+        missing = sum(result is None for result in results)
+        if missing:
+            logger.warning(f"Batch response unusable for {missing} of {len(texts)} documents, falling back to single requests")
+        else:
+            logger.debug("Batched %d documents into one request", len(texts))
+        return results
+
+
+def _parse_batch_response(content, count, max_keywords):
+    """
+    Parse the JSON results of a multi-document request.
+
+    Args:
+        content (str): Raw model output
+        count (int): Number of documents in the request
+        max_keywords (int): Maximum number of topics per document
+
+    Returns:
+        list: (topics, summary) per document, None where missing or malformed
+    """
+    results = [None] * count
+    if not content:
+        return results
+
+    # Models often wrap JSON in a markdown code fence
+    text = re.sub(r"^```(?:json)?\s*|\s*```$", "", content.strip())
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return results
+
+    if isinstance(data, dict):
+        data = data.get("results", [])
+    if not isinstance(data, list):
+        return results
+
+    for item in data:
+        if not isinstance(item, dict):
+            continue
+        doc_id = item.get("id")
+        topics = item.get("topics")
+        summary = item.get("summary")
+        if not isinstance(doc_id, int) or not 1 <= doc_id <= count:
+            continue
+        if not isinstance(topics, list) or not isinstance(summary, str) or not summary.strip():
+            continue
+        topics = [str(topic).strip() for topic in topics if str(topic).strip()]
+        if topics:
+            results[doc_id - 1] = (topics[:max_keywords], summary.strip())
+
+    return results
@@ -1,12 +1,106 @@
 """
 Logging configuration for LLM Chat Indexer.
+
+Records can be handed to a background thread through a queue so that the
+processing threads never wait on console or file I/O, and can be written as
+JSON lines carrying the correlation ID of the file being processed.
 """
 
-import logging
 import os
+import copy
+import json
+import queue
+import uuid
+import atexit
+import logging
+import logging.handlers
+import contextvars
+from contextlib import contextmanager
+
+# (correlation ID, path) of the file being processed; copied into async tasks and hedge threads
+_current_file = contextvars.ContextVar("log_file", default=None)
+
+# Background thread writing queued records, when queued logging is on
+_listener = None
+
+# Record attributes copied into JSON log lines when present
+JSON_FIELDS = ("file_id", "file", "duration")
+
+
+class FileContextFilter(logging.Filter):
+    """Stamp records with the correlation ID and path of the file being processed."""
+
+    def filter(self, record):
+        context = _current_file.get()
+        if context is not None and not hasattr(record, "file_id"):
+            record.file_id, record.file = context
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """Format records as single-line JSON objects."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in JSON_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that keeps the traceback separate from the message for the final formatter."""
+
+    def prepare(self, record):
+        # Resolve the message and traceback in the calling thread: arguments and
+        # exception objects may change or be released once the caller moves on
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+@contextmanager
+def log_context(file_path):
+    """
+    Tag all records logged inside the block with a new correlation ID for ``file_path``.
 
+    Args:
+        file_path (str): Path of the file being processed
 
-def setup_logger(log_level, log_file, log_format=None):
+    Yields:
+        str: The correlation ID
+    """
+    file_id = uuid.uuid4().hex[:12]
+    token = _current_file.set((file_id, file_path))
+    try:
+        yield file_id
+    finally:
+        _current_file.reset(token)
+
+
+def stop_logging():
+    """Flush queued records and stop the background logging thread, if any."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def setup_logger(log_level, log_file, log_format=None, json_format=False, use_queue=False):
     """
     Set up and configure the application logger.
 
@@ -15,6 +109,8 @@ def setup_logger(log_level, log_file, log_format=None):
         log_file (str): Path to the log file
         log_format (str, optional): Custom log format. Defaults to
                                    "%(asctime)s %(levelname)s %(message)s"
+        json_format (bool): Write records as JSON lines with file correlation IDs and durations
+        use_queue (bool): Hand records to a background thread instead of writing them inline
 
     Returns:
         logging.Logger: Configured logger instance
@@ -49,8 +145,11 @@ def setup_logger(log_level, log_file, log_format=None):
     logger = logging.getLogger("LLMChatIndexer")
 
     # Clear any existing handlers to prevent duplicate logs
+    stop_logging()
     if logger.handlers:
         logger.handlers.clear()
+    if not any(isinstance(f, FileContextFilter) for f in logger.filters):
+        logger.addFilter(FileContextFilter())
 
     # Prevent propagation to root logger
     logger.propagate = False
@@ -59,16 +158,30 @@ def setup_logger(log_level, log_file, log_format=None):
     log_level_value = getattr(logging, log_level.upper())
     logger.setLevel(log_level_value)
 
+    formatter = JSONFormatter() if json_format else logging.Formatter(log_format)
+
     # Configure console handler
     console_handler = logging.StreamHandler()
     console_handler.setLevel(log_level_value)
-    console_handler.setFormatter(logging.Formatter(log_format))
-    logger.addHandler(console_handler)
+    console_handler.setFormatter(formatter)
 
     # Configure file handler
     file_handler = logging.FileHandler(log_file)
     file_handler.setLevel(log_level_value)
-    file_handler.setFormatter(logging.Formatter(log_format))
-    logger.addHandler(file_handler)
+    file_handler.setFormatter(formatter)
+
+    if use_queue:
+        global _listener
+        log_queue = queue.SimpleQueue()
+        logger.addHandler(_QueueHandler(log_queue))
+        _listener = logging.handlers.QueueListener(log_queue, console_handler, file_handler, respect_handler_level=True)
+        _listener.start()
+    else:
+        logger.addHandler(console_handler)
+        logger.addHandler(file_handler)
 
     return logger
+
+
+# Write out records still queued when the process exits
+atexit.register(stop_logging)
@@ -0,0 +1,341 @@
+"""
+Run metrics module for LLM Chat Indexer.
+
+Times the stages of a run (discovery, reading, parsing, LLM calls, retry and
+rate-limit sleeps, index writing) per file and in aggregate, and turns them
+into the ``run_report.json`` performance report.
+
+Instrumented code calls the module-level ``timed``, ``observe``, ``count``,
+``gauge`` and ``adjust`` helpers, which do nothing unless a ``RunMetrics``
+recorder was activated.
+"""
+
+import bisect
+import heapq
+import logging
+import threading
+import time
+import contextvars
+from collections import defaultdict
+from contextlib import contextmanager
+
+logger = logging.getLogger("LLMChatIndexer")
+
+# Histogram bucket upper bounds in seconds, roughly logarithmic from 1 ms to 10 min
+BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, float("inf"),
+)
+
+# Files whose work is being timed; copied into async tasks and hedge threads
+_current_files = contextvars.ContextVar("metrics_files", default=())
+
+# Recorder of the current run, or None when metrics are off
+_active = None
+
+
+class Histogram:
+    """Fixed-bucket histogram of durations."""
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        """Add one observation."""
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """
+        Estimate a quantile from the buckets.
+
+        Returns:
+            float: Upper bound of the bucket holding the quantile, capped at the observed maximum
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self):
+        """
+        Summarize the histogram.
+
+        Returns:
+            dict: Count, sum, mean, estimated p50/p95/p99, max and cumulative bucket counts
+        """
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(BUCKETS, self.counts):
+            cumulative += count
+            buckets["+Inf" if bound == float("inf") else str(bound)] = cumulative
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 4),
+            "mean": round(self.sum / self.count, 4) if self.count else 0.0,
+            "p50": round(self.quantile(0.5), 4),
+            "p95": round(self.quantile(0.95), 4),
+            "p99": round(self.quantile(0.99), 4),
+            "max": round(self.max, 4),
+            "buckets": buckets,
+        }
+
+
+def _new_file_record():
+    return {"seconds": defaultdict(float), "counts": defaultdict(int), "total": 0.0}
+
+
+def _file_summary(record):
+    return {
+        "total_seconds": round(record["total"], 4),
+        "seconds": {stage: round(seconds, 4) for stage, seconds in sorted(record["seconds"].items())},
+        "counts": dict(sorted(record["counts"].items())),
+    }
+
+
+class RunMetrics:
+    """Stage timings and counters for one indexing run."""
+
+    def __init__(self, slowest=10, keep_files=True):
+        """
+        Initialize the recorder.
+
+        Args:
+            slowest (int): Number of slowest files listed in the report
+            keep_files (bool): Keep every file's breakdown for the report; when False a file's
+                               record is folded into the per-file histograms and the slowest
+                               files as soon as its scope ends, so memory does not grow with the corpus
+        """
+        self.slowest = slowest
+        self.keep_files = keep_files
+        self.started = time.monotonic()
+        self.stages = defaultdict(Histogram)
+        self.counters = defaultdict(int)
+        self.gauges = defaultdict(float)
+        self.files = defaultdict(_new_file_record)
+        # Folded file records when not keeping files
+        self._per_file = defaultdict(Histogram)
+        self._slowest = []
+        self._folded = 0
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        """
+        Record the duration of one stage event, attributed to the files in scope.
+
+        Args:
+            stage (str): Stage name, e.g. "parse" or "llm_call"
+            seconds (float): Duration
+        """
+        file_paths = _current_files.get()
+        with self._lock:
+            self.stages[stage].observe(seconds)
+            for file_path in file_paths:
+                record = self.files[file_path]
+                # Batched work is split evenly across its files
+                record["seconds"][stage] += seconds / len(file_paths)
+                record["counts"][stage] += 1
+
+    def count(self, name, amount=1):
+        """Increment a run-level counter and the counters of the files in scope."""
+        file_paths = _current_files.get()
+        with self._lock:
+            self.counters[name] += amount
+            for file_path in file_paths:
+                self.files[file_path]["counts"][name] += amount
+
+    def set_gauge(self, name, value):
+        """Set a gauge, e.g. a queue depth."""
+        with self._lock:
+            self.gauges[name] = value
+
+    def adjust_gauge(self, name, delta):
+        """Move a gauge up or down, e.g. the number of requests in flight."""
+        with self._lock:
+            self.gauges[name] += delta
+
+    def snapshot(self):
+        """
+        Summarize the live state of a run that is still going.
+
+        Returns:
+            dict: Elapsed time, stage histograms, counters and gauges
+        """
+        with self._lock:
+            return {
+                "elapsed_seconds": round(time.monotonic() - self.started, 4),
+                "stages": {stage: histogram.snapshot() for stage, histogram in sorted(self.stages.items())},
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+            }
+
+    def add_file_time(self, file_paths, seconds):
+        """Add wall-clock time spent on files, split evenly across a batch."""
+        with self._lock:
+            for file_path in file_paths:
+                self.files[file_path]["total"] += seconds / len(file_paths)
+                if not self.keep_files:
+                    self._fold(file_path, self.files.pop(file_path))
+
+    def _fold(self, path, record):
+        # Called with the lock held
+        summary = _file_summary(record)
+        self._per_file["total"].observe(summary["total_seconds"])
+        for stage, seconds in summary["seconds"].items():
+            self._per_file[stage].observe(seconds)
+        self._folded += 1
+        # The fold counter breaks ties so records are never compared
+        item = (summary["total_seconds"], self._folded, path, summary)
+        if len(self._slowest) < self.slowest:
+            heapq.heappush(self._slowest, item)
+        elif self._slowest and item[0] > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, item)
+
+    def report(self, llm_client=None):
+        """
+        Build the run report.
+
+        Args:
+            llm_client (LLMClient, optional): Client whose cache and retry counters are included
+
+        Returns:
+            dict: Aggregate stage histograms, per-file histograms, slowest files,
+                  cache and retry statistics and per-file breakdowns (empty unless keeping files)
+        """
+        with self._lock:
+            if not self.keep_files:
+                # Work attributed to a file after its scope ended, e.g. by a late hedge
+                for path in list(self.files):
+                    self._fold(path, self.files.pop(path))
+            files = {path: _file_summary(record) for path, record in self.files.items()}
+            stages = {stage: histogram.snapshot() for stage, histogram in sorted(self.stages.items())}
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+            per_file = {stage: histogram.snapshot() for stage, histogram in sorted(self._per_file.items())}
+            slowest = [(path, summary) for _, _, path, summary in sorted(self._slowest, reverse=True)]
+            files_processed = len(files) + self._folded
+
+        if self.keep_files:
+            histograms = defaultdict(Histogram)
+            for record in files.values():
+                histograms["total"].observe(record["total_seconds"])
+                for stage, seconds in record["seconds"].items():
+                    histograms[stage].observe(seconds)
+            per_file = {stage: histogram.snapshot() for stage, histogram in sorted(histograms.items())}
+            slowest = heapq.nlargest(self.slowest, files.items(), key=lambda item: item[1]["total_seconds"])
+
+        cache = {"dedup_hits": counters.get("dedup_hits", 0)}
+        retries = {
+            "retries": counters.get("retries", 0),
+            "retry_sleep_seconds": stages.get("retry_sleep", {}).get("sum", 0.0),
+            "rate_limit_sleeps": stages.get("rate_limit_sleep", {}).get("count", 0),
+            "rate_limit_sleep_seconds": stages.get("rate_limit_sleep", {}).get("sum", 0.0),
+            "by_error": {name[len("retry:"):]: value for name, value in counters.items() if name.startswith("retry:")},
+        }
+        if llm_client is not None:
+            cache["coalesced_requests"] = getattr(llm_client, "coalesced_requests", 0)
+            cassette = getattr(llm_client, "cassette", None)
+            if cassette is not None:
+                cache["cassette_replays"] = cassette.replayed
+                cache["cassette_misses"] = cassette.misses
+            retries["timed_out_requests"] = getattr(llm_client, "timed_out_requests", 0)
+            retries["hedged_requests"] = getattr(llm_client, "hedged_requests", 0)
+            retries["degraded_calls"] = getattr(llm_client, "degraded_calls", 0)
+
+        return {
+            "elapsed_seconds": round(time.monotonic() - self.started, 4),
+            "files_processed": files_processed,
+            "stages": stages,
+            "per_file": per_file,
+            "slowest_files": [{"path": path, **record} for path, record in slowest],
+            "cache": cache,
+            "retries": retries,
+            "counters": counters,
+            "gauges": gauges,
+            "files": files,
+        }
+
+
+def activate(recorder):
+    """Send the module-level helpers' measurements to ``recorder`` (None turns metrics off)."""
+    global _active
+    _active = recorder
+
+
+def active():
+    """The active recorder, or None."""
+    return _active
+
+
+@contextmanager
+def timed(stage):
+    """Time the block as one ``stage`` event; a no-op without an active recorder."""
+    recorder = _active
+    if recorder is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.observe(stage, time.perf_counter() - start)
+
+
+def observe(stage, seconds):
+    """Record an already measured stage duration."""
+    if _active is not None:
+        _active.observe(stage, seconds)
+
+
+def count(name, amount=1):
+    """Increment a counter."""
+    if _active is not None:
+        _active.count(name, amount)
+
+
+def gauge(name, value):
+    """Set a gauge."""
+    if _active is not None:
+        _active.set_gauge(name, value)
+
+
+def adjust(name, delta):
+    """Move a gauge up or down."""
+    if _active is not None:
+        _active.adjust_gauge(name, delta)
+
+
+@contextmanager
+def file_scope(file_paths):
+    """
+    Attribute stage events inside the block to one file, or split them across a batch.
+
+    Nested scopes for the same files are transparent, so a file's wall-clock
+    total is only counted once.
+
+    Args:
+        file_paths (str | list): File path, or the paths of chats processed together
+    """
+    file_paths = (file_paths,) if isinstance(file_paths, str) else tuple(file_paths)
+    recorder = _active
+    if recorder is None or _current_files.get() == file_paths:
+        yield
+        return
+    token = _current_files.set(file_paths)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.add_file_time(file_paths, time.perf_counter() - start)
+        _current_files.reset(token)
@@ -0,0 +1,229 @@
+"""
+Dry-run planning module for LLM Chat Indexer.
+
+Parses a corpus without calling the LLM and projects the requests, tokens,
+cost and wall-clock time a real run would need under the current settings.
+"""
+
+import os
+import math
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from litellm import cost_per_token
+
+from src.config import Config
+from src.dedup import Deduplicator, fingerprint
+from src.file_parser import parse_path, MappedLines
+from src.llm_client import MAX_MESSAGE_CHARS
+from src.segmenter import segment_messages
+
+logger = logging.getLogger("LLMChatIndexer")
+
+# Estimated tokens of system prompt and instructions per request
+PROMPT_OVERHEAD_TOKENS = 60
+# Typical completion sizes, in tokens
+TOPIC_OUTPUT_TOKENS = 30
+SUMMARY_OUTPUT_TOKENS = 150
+# Files planned per worker task; small files parse in microseconds
+PLAN_CHUNKSIZE = 64
+
+
+def plan_settings():
+    """
+    Snapshot the settings that affect a run's requests.
+
+    Passed to worker processes explicitly, since command line overrides of
+    ``Config`` are not visible in freshly started workers.
+
+    Returns:
+        dict: Relevant Config values
+    """
+    return {
+        "large_file_threshold": Config.LARGE_FILE_THRESHOLD,
+        "session_gap_minutes": Config.SESSION_GAP_MINUTES,
+        "session_max_chars": Config.SESSION_MAX_CHARS,
+        "session_max_count": Config.SESSION_MAX_COUNT,
+        "compress_enabled": Config.COMPRESS_ENABLED,
+        "compress_token_budget": Config.COMPRESS_TOKEN_BUDGET,
+        "batch_max_messages": Config.BATCH_MAX_MESSAGES,
+        "dedup_enabled": Config.DEDUP_ENABLED,
+    }
+
+
+def _prompt_tokens(chars, settings):
+    """Estimated prompt tokens for chat text of ``chars`` characters, after truncation and compression."""
+    chars = min(chars, MAX_MESSAGE_CHARS)
+    if settings["compress_enabled"]:
+        chars = min(chars, settings["compress_token_budget"] * 4)
+    return PROMPT_OVERHEAD_TOKENS + max(1, chars // 4)
+
+
+def estimate_file(file_path, settings):
+    """
+    Estimate the LLM work for one file; runs in worker processes.
+
+    Args:
+        file_path (str): Path to the file
+        settings (dict): Output of plan_settings
+
+    Returns:
+        dict: Per-file estimate, including a duplicate fingerprint when deduplication is on
+    """
+    messages = []
+    try:
+        messages = parse_path(file_path, settings["large_file_threshold"], 1)
+        estimate = {
+            "path": file_path,
+            "message_count": len(messages),
+            "session_count": 0,
+            "requests": 0,
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "batchable_tokens": 0,
+            "fingerprint": None,
+        }
+        if not messages:
+            return estimate
+
+        # Segmented as process_file does: memory-mapped transcripts are never split by size
+        max_chars = 0 if isinstance(messages, MappedLines) else settings["session_max_chars"]
+        sessions = segment_messages(messages, settings["session_gap_minutes"], max_chars, settings["session_max_count"])
+        estimate["session_count"] = len(sessions)
+        if len(sessions) > 1:
+            # Topics and summary per session, then one summary of the session summaries
+            for session in sessions:
+                estimate["input_tokens"] += 2 * _prompt_tokens(session["char_count"], settings)
+            estimate["input_tokens"] += PROMPT_OVERHEAD_TOKENS + len(sessions) * SUMMARY_OUTPUT_TOKENS
+            estimate["output_tokens"] = len(sessions) * (TOPIC_OUTPUT_TOKENS + SUMMARY_OUTPUT_TOKENS) + SUMMARY_OUTPUT_TOKENS
+            estimate["requests"] = 2 * len(sessions) + 1
+        else:
+            prompt_tokens = _prompt_tokens(sessions[0]["char_count"], settings)
+            estimate["input_tokens"] = 2 * prompt_tokens
+            estimate["output_tokens"] = TOPIC_OUTPUT_TOKENS + SUMMARY_OUTPUT_TOKENS
+            estimate["requests"] = 2
+            if isinstance(messages, list) and len(messages) <= settings["batch_max_messages"]:
+                estimate["batchable_tokens"] = prompt_tokens - PROMPT_OVERHEAD_TOKENS
+
+        if settings["dedup_enabled"]:
+            estimate["fingerprint"] = fingerprint(messages)
+        return estimate
+    except Exception as e:
+        return {"path": file_path, "error": str(e)}
+    finally:
+        if hasattr(messages, "close"):
+            messages.close()
+
+
+def estimate_cost(model, input_tokens, output_tokens):
+    """
+    Price tokens with litellm's model cost map.
+
+    Returns:
+        float: Estimated USD cost, or None if the model has no known price
+    """
+    try:
+        prompt_cost, completion_cost = cost_per_token(
+            model=model, prompt_tokens=input_tokens, completion_tokens=output_tokens
+        )
+        return prompt_cost + completion_cost
+    except Exception:
+        return None
+
+
+def build_plan(
+    chat_files, model, batch_token_budget=0, rate_limit_delay=1.0, request_latency=2.0, concurrency=1, workers=None
+):
+    """
+    Project the requests, tokens, cost and runtime of indexing ``chat_files``.
+
+    Files are parsed in parallel worker processes; duplicate detection and
+    batch packing are then replayed in file order, as a real run would.
+
+    Args:
+        chat_files (List[str]): Files to plan
+        model (str): Model used for pricing
+        batch_token_budget (int): Estimated tokens per multi-document request (0 disables batching)
+        rate_limit_delay (float): Minimum seconds between requests
+        request_latency (float): Assumed seconds per request
+        concurrency (int): Concurrent session requests per file
+        workers (int, optional): Worker processes for parsing. Defaults to the CPU count.
+
+    Returns:
+        dict: Totals for the run and a per-file breakdown
+    """
+    settings = plan_settings()
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(chat_files) > PLAN_CHUNKSIZE:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            estimates = list(executor.map(estimate_file, chat_files, [settings] * len(chat_files), chunksize=PLAN_CHUNKSIZE))
+    else:
+        estimates = [estimate_file(file_path, settings) for file_path in chat_files]
+
+    deduplicator = Deduplicator(Config.DEDUP_MAX_DISTANCE) if settings["dedup_enabled"] else None
+    request_seconds = max(request_latency, rate_limit_delay)
+    totals = {"requests": 0, "input_tokens": 0, "output_tokens": 0}
+    duplicates = errors = batched_files = 0
+    pending_tokens = 0
+    seconds = 0.0
+
+    def flush_batch(tokens):
+        # analyze_documents packs pending chats into requests of up to the batch budget
+        requests = max(1, math.ceil(tokens / batch_token_budget))
+        totals["requests"] += requests
+        # Each batch request carries one shared instruction prompt
+        totals["input_tokens"] += requests * PROMPT_OVERHEAD_TOKENS
+        return requests * request_seconds
+
+    for estimate in estimates:
+        if "error" in estimate:
+            errors += 1
+            continue
+
+        if deduplicator is not None and estimate["fingerprint"] is not None:
+            canonical, _ = deduplicator.check_fingerprint(estimate["path"], *estimate["fingerprint"])
+            if canonical:
+                duplicates += 1
+                estimate["duplicate_of"] = canonical
+                continue
+
+        if batch_token_budget > 0 and estimate["batchable_tokens"]:
+            batched_files += 1
+            pending_tokens += estimate["batchable_tokens"]
+            totals["input_tokens"] += estimate["batchable_tokens"]
+            totals["output_tokens"] += TOPIC_OUTPUT_TOKENS + SUMMARY_OUTPUT_TOKENS
+            if pending_tokens >= batch_token_budget:
+                seconds += flush_batch(pending_tokens)
+                pending_tokens = 0
+            continue
+
+        for key in totals:
+            totals[key] += estimate[key]
+        if estimate["session_count"] > 1:
+            # Sessions run concurrently, but the rate limiter still spaces out request starts
+            session_requests = estimate["requests"] - 1
+            seconds += max(
+                session_requests * rate_limit_delay, math.ceil(session_requests / (2 * max(concurrency, 1))) * request_latency
+            )
+            seconds += request_seconds
+        else:
+            seconds += estimate["requests"] * request_seconds
+
+    if pending_tokens:
+        seconds += flush_batch(pending_tokens)
+
+    for estimate in estimates:
+        estimate.pop("fingerprint", None)
+
+    return {
+        "model": model,
+        "files": len(chat_files),
+        "parse_errors": errors,
+        "duplicates": duplicates,
+        "batched_files": batched_files,
+        "requests": totals["requests"],
+        "input_tokens": totals["input_tokens"],
+        "output_tokens": totals["output_tokens"],
+        "estimated_cost": estimate_cost(model, totals["input_tokens"], totals["output_tokens"]),
+        "estimated_seconds": round(seconds, 1),
+        "file_estimates": estimates,
+    }
@@ -0,0 +1,373 @@
+"""
+Profiling module for LLM Chat Indexer.
+
+Optional profilers for a whole run, selected with ``--profile``:
+
+* ``cpu``: statistical sampling of the Python stack on CPU time, written as
+  folded stacks (for flamegraph.pl or speedscope) and a top-functions summary
+* ``memory``: allocation tracing with the top allocating source lines per stage
+* ``loop``: asyncio event-loop lag, with the stacks that blocked the loop
+
+Results are written next to the index as ``profile_<mode>.*`` files.
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import asyncio
+import logging
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, asynccontextmanager
+
+from src.metrics import Histogram
+
+logger = logging.getLogger("LLMChatIndexer")
+
+MODES = ("cpu", "memory", "loop")
+
+# Deepest stack kept per CPU sample
+MAX_STACK_DEPTH = 64
+
+# Profiler of the current run, or None
+_active = None
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _stack(frame):
+    """Stack of ``frame`` from the outermost call to the innermost, as labels."""
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return tuple(reversed(labels))
+
+
+class CPUSampler:
+    """Sampling CPU profiler for the main thread."""
+
+    def __init__(self, interval=0.005):
+        """
+        Initialize the sampler.
+
+        Args:
+            interval (float): Seconds of CPU time between samples
+        """
+        self.interval = interval
+        self.stacks = Counter()
+        self.clock = None
+        self._previous_handler = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Start sampling; uses SIGPROF where available, else wall-clock sampling from a thread."""
+        if hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread():
+            self.clock = "cpu"
+            self._previous_handler = signal.signal(signal.SIGPROF, self._on_signal)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        else:
+            self.clock = "wall"
+            target = threading.main_thread().ident
+            self._thread = threading.Thread(target=self._poll, args=(target,), name="cpu-sampler", daemon=True)
+            self._thread.start()
+
+    def _on_signal(self, signum, frame):
+        self.stacks[_stack(frame)] += 1
+
+    def _poll(self, target):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(target)
+            if frame is not None:
+                self.stacks[_stack(frame)] += 1
+
+    def stop(self):
+        """Stop sampling."""
+        if self.clock == "cpu":
+            signal.setitimer(signal.ITIMER_PROF, 0, 0)
+            signal.signal(signal.SIGPROF, self._previous_handler or signal.SIG_DFL)
+        elif self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+
+    def summary(self, top=25):
+        """
+        Summarize the samples.
+
+        Args:
+            top (int): Number of functions listed
+
+        Returns:
+            dict: Sample count, clock and the functions with the most self and total samples
+        """
+        total = sum(self.stacks.values())
+        self_counts = Counter()
+        total_counts = Counter()
+        for stack, count in self.stacks.items():
+            if stack:
+                self_counts[stack[-1]] += count
+            for label in set(stack):
+                total_counts[label] += count
+
+        def ranked(counter):
+            return [
+                {"function": label, "samples": count, "percent": round(100 * count / total, 2)}
+                for label, count in counter.most_common(top)
+            ]
+
+        return {
+            "clock": self.clock,
+            "interval": self.interval,
+            "samples": total,
+            "top_self": ranked(self_counts),
+            "top_total": ranked(total_counts),
+        }
+
+    def write(self, output_dir):
+        """Write folded stacks and the summary; returns the written paths."""
+        folded_path = os.path.join(output_dir, "profile_cpu.folded")
+        with open(folded_path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+        summary_path = os.path.join(output_dir, "profile_cpu.json")
+        with open(summary_path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
+        return [folded_path, summary_path]
+
+
+class MemoryProfiler:
+    """Allocation tracing with the top allocators per stage."""
+
+    def __init__(self, top=15):
+        """
+        Initialize the profiler.
+
+        Args:
+            top (int): Number of allocating source lines listed per stage
+        """
+        self.top = top
+        self.stages = []
+
+    def start(self):
+        """Start tracing allocations."""
+        tracemalloc.start()
+
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            )
+        )
+
+    def _top(self, stats):
+        return [
+            {
+                "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "size_kb": round(stat.size / 1024, 1),
+                "size_diff_kb": round(getattr(stat, "size_diff", stat.size) / 1024, 1),
+                "count": stat.count,
+            }
+            for stat in stats[: self.top]
+        ]
+
+    @contextmanager
+    def stage(self, name):
+        """Record the peak memory and the top allocators of the block."""
+        tracemalloc.reset_peak()
+        before = self._snapshot()
+        start_current, _ = tracemalloc.get_traced_memory()
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            after = self._snapshot()
+            self.stages.append(
+                {
+                    "stage": name,
+                    "peak_mb": round(peak / 2**20, 2),
+                    "net_mb": round((current - start_current) / 2**20, 2),
+                    "top_allocators": self._top(after.compare_to(before, "lineno")),
+                }
+            )
+
+    def stop(self):
+        """Stop tracing, keeping the allocations still alive at the end of the run."""
+        self.final = self._top(self._snapshot().statistics("lineno"))
+        self.peak_mb = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+        tracemalloc.stop()
+
+    def write(self, output_dir):
+        """Write the per-stage report; returns the written paths."""
+        path = os.path.join(output_dir, "profile_memory.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"stages": self.stages, "live_at_end": self.final}, f, indent=2)
+        return [path]
+
+
+class LoopLagMonitor:
+    """Event-loop lag monitor for the async parts of a run."""
+
+    def __init__(self, interval=0.05, threshold=0.1):
+        """
+        Initialize the monitor.
+
+        Args:
+            interval (float): Seconds between heartbeats on the loop
+            threshold (float): Lag from which the blocking stack is captured
+        """
+        self.interval = interval
+        self.threshold = threshold
+        self.lag = Histogram()
+        self.stalls = 0
+        self.blocking_stacks = Counter()
+        self._beat = None
+        self._loop_thread = None
+        self._captured = False
+        self._stop = threading.Event()
+        self._watchdog = None
+
+    def start(self):
+        """Start the watchdog thread that captures what blocks a stalled loop."""
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def _watch(self):
+        while not self._stop.wait(self.interval / 2):
+            beat, thread = self._beat, self._loop_thread
+            if beat is None or self._captured or time.monotonic() - beat < self.threshold:
+                continue
+            frame = sys._current_frames().get(thread)
+            if frame is not None:
+                self._captured = True
+                self.blocking_stacks[_stack(frame)] += 1
+
+    async def _heartbeat(self):
+        loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        while True:
+            self._beat = time.monotonic()
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - start - self.interval)
+            self.lag.observe(lag)
+            if lag >= self.threshold:
+                self.stalls += 1
+            self._captured = False
+
+    @asynccontextmanager
+    async def watch(self):
+        """Measure the lag of the running loop while the block runs."""
+        task = asyncio.ensure_future(self._heartbeat())
+        try:
+            yield
+        finally:
+            task.cancel()
+            self._beat = None
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def stop(self):
+        """Stop the watchdog thread."""
+        self._stop.set()
+        if self._watchdog is not None:
+            self._watchdog.join()
+
+    def write(self, output_dir):
+        """Write the lag report; returns the written paths."""
+        path = os.path.join(output_dir, "profile_loop.json")
+        report = {
+            "interval": self.interval,
+            "threshold": self.threshold,
+            "lag": self.lag.snapshot(),
+            "stalls": self.stalls,
+            "blocking_stacks": [
+                {"stack": list(stack), "stalls": count} for stack, count in self.blocking_stacks.most_common(20)
+            ],
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        return [path]
+
+
+class Profiler:
+    """The profilers selected for one run."""
+
+    def __init__(self, modes, sample_interval=0.005, loop_lag_threshold=0.1):
+        """
+        Initialize the selected profilers.
+
+        Args:
+            modes (list): Any of "cpu", "memory" and "loop"
+            sample_interval (float): Seconds between CPU samples
+            loop_lag_threshold (float): Event-loop lag from which blocking stacks are captured
+        """
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise ValueError(f"Unknown profile mode(s): {', '.join(sorted(unknown))}")
+        self.cpu = CPUSampler(sample_interval) if "cpu" in modes else None
+        self.memory = MemoryProfiler() if "memory" in modes else None
+        self.loop = LoopLagMonitor(threshold=loop_lag_threshold) if "loop" in modes else None
+
+    def _profilers(self):
+        return [profiler for profiler in (self.memory, self.loop, self.cpu) if profiler is not None]
+
+    def start(self):
+        """Start the profilers and make this the run's active profiler."""
+        global _active
+        for profiler in self._profilers():
+            profiler.start()
+        _active = self
+
+    def stop(self):
+        """Stop the profilers."""
+        global _active
+        _active = None
+        for profiler in reversed(self._profilers()):
+            profiler.stop()
+
+    def write(self, output_dir):
+        """
+        Write the results of all profilers.
+
+        Args:
+            output_dir (str): Directory of the index
+
+        Returns:
+            list: Written file paths
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        paths = []
+        for profiler in self._profilers():
+            paths.extend(profiler.write(output_dir))
+        return paths
+
+
+@contextmanager
+def stage(name):
+    """Attribute allocations inside the block to a stage when memory profiling is on."""
+    if _active is None or _active.memory is None:
+        yield
+        return
+    with _active.memory.stage(name):
+        yield
+
+
+@asynccontextmanager
+async def watch_loop():
+    """Monitor the running event loop's lag when loop profiling is on."""
+    if _active is None or _active.loop is None:
+        yield
+        return
+    async with _active.loop.watch():
+        yield
@@ -0,0 +1,211 @@
+"""
+Progress module for LLM Chat Indexer.
+
+Shows how far a run has got: files done out of total, files and tokens per
+second, provider requests in flight and an ETA. The ETA divides the estimated
+tokens still to process by the recent token throughput, so a few huge
+transcripts left at the end do not make it look almost finished.
+
+The processing loop only bumps two counters per file; a background thread
+redraws a status line on a terminal, or logs it periodically otherwise.
+"""
+
+import os
+import sys
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+from src import metrics
+
+logger = logging.getLogger("LLMChatIndexer")
+
+MODES = ("auto", "bar", "log", "off")
+
+# Tracker of the current run, or None
+_active = None
+
+
+def _file_tokens(file_path):
+    """Estimate a file's tokens from its size, using the ~4 characters per token heuristic."""
+    try:
+        return max(1, os.path.getsize(file_path) // 4)
+    except OSError:
+        return 1
+
+
+def _format_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+def _format_count(value):
+    if value >= 1_000_000:
+        return f"{value / 1_000_000:.1f}M"
+    if value >= 1_000:
+        return f"{value / 1_000:.1f}k"
+    return f"{value:.0f}"
+
+
+class Progress:
+    """Progress, throughput and ETA of one run."""
+
+    def __init__(self, file_paths, mode="auto", interval=None, window=30.0, stream=None):
+        """
+        Initialize the tracker.
+
+        Args:
+            file_paths (List[str]): Files the run will process
+            mode (str): "bar" redraws a status line, "log" logs it periodically,
+                        "auto" picks "bar" when ``stream`` is a terminal
+            interval (float, optional): Seconds between updates; 0.5 for bars and 30 for log lines by default
+            window (float): Seconds of recent history the throughput is measured over
+            stream (file, optional): Terminal stream for the bar; defaults to stderr
+        """
+        self.stream = stream or sys.stderr
+        if mode == "auto":
+            mode = "bar" if hasattr(self.stream, "isatty") and self.stream.isatty() else "log"
+        self.mode = mode
+        self.interval = interval if interval is not None else (0.5 if mode == "bar" else 30.0)
+        self.window = window
+        self.tokens = {file_path: _file_tokens(file_path) for file_path in file_paths}
+        self.total_files = len(self.tokens)
+        self.total_tokens = sum(self.tokens.values())
+        self.files_done = 0
+        self.tokens_done = 0
+        self.started = time.monotonic()
+        self._samples = deque([(self.started, 0, 0)])
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def advance(self, file_paths):
+        """
+        Mark files as done; files the tracker was not created with are ignored.
+
+        Args:
+            file_paths (str | list): Path of a finished file, or the paths of a finished batch
+        """
+        if isinstance(file_paths, str):
+            file_paths = (file_paths,)
+        with self._lock:
+            for file_path in file_paths:
+                # Files outside the tracked set, e.g. fresh changes indexed ahead of a backlog
+                if file_path in self.tokens:
+                    self.files_done += 1
+                    self.tokens_done += self.tokens[file_path]
+
+    def _sample(self, now):
+        with self._lock:
+            self._samples.append((now, self.files_done, self.tokens_done))
+            # Keep one sample older than the window as the baseline
+            while len(self._samples) > 2 and self._samples[1][0] <= now - self.window:
+                self._samples.popleft()
+
+    def rates(self):
+        """
+        Measure recent throughput.
+
+        Returns:
+            tuple: Files per second and estimated tokens per second over the last ``window`` seconds
+        """
+        self._sample(time.monotonic())
+        with self._lock:
+            start, files_start, tokens_start = self._samples[0]
+            end, files_end, tokens_end = self._samples[-1]
+        elapsed = end - start
+        if elapsed <= 0:
+            return 0.0, 0.0
+        return (files_end - files_start) / elapsed, (tokens_end - tokens_start) / elapsed
+
+    def eta(self, token_rate):
+        """Seconds until the remaining estimated tokens are processed at ``token_rate``, or None."""
+        remaining = max(0, self.total_tokens - self.tokens_done)
+        if not remaining:
+            return 0.0
+        if token_rate <= 0:
+            return None
+        return remaining / token_rate
+
+    def line(self):
+        """Current status line."""
+        file_rate, token_rate = self.rates()
+        eta = self.eta(token_rate)
+        recorder = metrics.active()
+        in_flight = int(recorder.gauges.get("llm_in_flight", 0)) if recorder is not None else 0
+        percent = 100 * self.files_done / self.total_files if self.total_files else 100.0
+        width = len(str(self.total_files))
+        return (
+            f"[{self.files_done:>{width}}/{self.total_files} {percent:5.1f}%] "
+            f"{file_rate:.2f} files/s, {_format_count(token_rate)} tok/s, {in_flight} in flight, "
+            f"elapsed {_format_duration(time.monotonic() - self.started)}, "
+            f"ETA {'--' if eta is None else _format_duration(eta)}"
+        )
+
+    def _emit(self, final=False):
+        if self.mode == "bar":
+            self.stream.write(f"\r{self.line()}\x1b[K" + ("\n" if final else ""))
+            self.stream.flush()
+        else:
+            logger.info(f"Progress: {self.line()}")
+
+    def _run(self):
+        # Sample at least every second so the throughput window stays fine-grained
+        tick = min(self.interval, 1.0)
+        last_emit = time.monotonic()
+        while not self._stop.wait(tick):
+            now = time.monotonic()
+            self._sample(now)
+            if now - last_emit >= self.interval:
+                self._emit()
+                last_emit = now
+
+    def start(self):
+        """Start reporting and make this the run's active tracker."""
+        global _active
+        _active = self
+        self._thread = threading.Thread(target=self._run, name="progress", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop reporting, ending with a final status line."""
+        global _active
+        _active = None
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._emit(final=True)
+
+
+@contextmanager
+def track(file_paths, mode="auto", interval=None):
+    """
+    Report the progress of processing ``file_paths`` while the block runs.
+
+    Args:
+        file_paths (List[str]): Files to process
+        mode (str): One of ``MODES``; "off" disables reporting
+        interval (float, optional): Seconds between updates
+    """
+    if mode == "off" or not file_paths:
+        yield None
+        return
+    tracker = Progress(file_paths, mode, interval)
+    tracker.start()
+    try:
+        yield tracker
+    finally:
+        tracker.stop()
+
+
+def advance(file_paths):
+    """Mark files as done on the active tracker, if any."""
+    if _active is not None:
+        _active.advance(file_paths)
@@ -0,0 +1,212 @@
+"""
+Provider routing module for LLM Chat Indexer.
+
+Chooses between several weighted LLM providers/models using live latency and
+error-rate statistics, fails over away from providers that are erroring, and
+decides when a slow request is worth hedging.
+"""
+
+import time
+import random
+import logging
+from collections import deque
+
+logger = logging.getLogger("LLMChatIndexer")
+
+# Latency assumed for providers without any samples yet
+DEFAULT_LATENCY = 2.0
+# Smoothing factor for the latency moving average
+EWMA_ALPHA = 0.2
+# Longest time a failing provider is taken out of rotation
+MAX_COOLDOWN = 30.0
+
+
+def parse_provider_spec(spec):
+    """
+    Parse a weighted provider list.
+
+    Args:
+        spec (str): Comma-separated "model=weight" items, e.g.
+                    "gemini/gemini-2.0-flash=3,openai/gpt-4o-mini=1". Weight defaults to 1.
+
+    Returns:
+        list: (model, weight) tuples
+    """
+    providers = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        model, _, weight = item.rpartition("=") if "=" in item else (item, "", "1")
+        try:
+            providers.append((model.strip(), float(weight)))
+        except ValueError:
+            raise ValueError(f"Invalid weight in provider spec: {item}")
+    return providers
+
+
+class ProviderStats:
+    """Rolling latency and outcome statistics for one provider."""
+
+    def __init__(self, window=100):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.ewma_latency = None
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+
+    def record(self, latency, success):
+        """Record the outcome of one request."""
+        self.requests += 1
+        self.outcomes.append(success)
+        if success:
+            self.consecutive_failures = 0
+            self.latencies.append(latency)
+            if self.ewma_latency is None:
+                self.ewma_latency = latency
+            else:
+                self.ewma_latency = EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self.ewma_latency
+        else:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.cooldown_until = time.monotonic() + min(2 ** (self.consecutive_failures - 1), MAX_COOLDOWN)
+
+    @property
+    def error_rate(self):
+        if not self.outcomes:
+            return 0.0
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+    def percentile(self, percent):
+        """Latency at the given percentile over the recent window, or None without samples."""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(int(len(ordered) * percent / 100), len(ordered) - 1)
+        return ordered[index]
+
+    def in_cooldown(self):
+        return time.monotonic() < self.cooldown_until
+
+
+class ProviderRouter:
+    """Latency- and error-aware weighted routing across LLM providers."""
+
+    def __init__(self, providers, hedge_percentile=0, hedge_min_samples=20, hedge_multiplier=1.0, rng=None):
+        """
+        Initialize the router.
+
+        Args:
+            providers (list): (model, weight) tuples
+            hedge_percentile (float): Latency percentile after which a request is hedged; 0 disables hedging
+            hedge_min_samples (int): Samples needed before the percentile is trusted
+            hedge_multiplier (float): Hedge only after this multiple of the percentile latency,
+                                      e.g. 3 to re-issue just the stragglers far above p95
+            rng (random.Random, optional): Random source, for reproducible routing
+        """
+        if not providers:
+            raise ValueError("At least one provider is required")
+        self.providers = list(providers)
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_multiplier = hedge_multiplier
+        self.stats = {model: ProviderStats() for model, _ in self.providers}
+        self.rng = rng or random.Random()
+
+    @classmethod
+    def from_spec(cls, spec, **kwargs):
+        """Create a router from a "model=weight,..." string."""
+        return cls(parse_provider_spec(spec), **kwargs)
+
+    @property
+    def primary(self):
+        """The first configured provider."""
+        return self.providers[0][0]
+
+    def _score(self, model, weight):
+        stats = self.stats[model]
+        latency = stats.ewma_latency or DEFAULT_LATENCY
+        return weight / (latency * (1 + 4 * stats.error_rate))
+
+    def choose(self, exclude=()):
+        """
+        Pick a provider for the next request.
+
+        Providers cooling down after errors are skipped unless every provider is.
+
+        Args:
+            exclude (iterable): Models not to pick
+
+        Returns:
+            str: Model identifier
+        """
+        candidates = [(m, w) for m, w in self.providers if m not in exclude and not self.stats[m].in_cooldown()]
+        if not candidates:
+            candidates = [(m, w) for m, w in self.providers if m not in exclude] or self.providers
+        scores = [self._score(model, weight) for model, weight in candidates]
+        return self.rng.choices([model for model, _ in candidates], weights=scores)[0]
+
+    def has_healthy_provider(self):
+        """Whether any provider is currently out of cooldown."""
+        return any(not stats.in_cooldown() for stats in self.stats.values())
+
+    def has_healthy_alternative(self, model):
+        """Whether a provider other than ``model`` is currently out of cooldown."""
+        return any(m != model and not self.stats[m].in_cooldown() for m, _ in self.providers)
+
+    def alternate(self, model):
+        """
+        Pick a provider for a hedged duplicate of a request sent to ``model``.
+
+        Returns:
+            str: Another healthy provider, or ``model`` itself if it is the only one
+        """
+        if self.has_healthy_alternative(model):
+            return self.choose(exclude={model})
+        return model
+
+    def hedge_delay(self, model):
+        """
+        Time after which a request to ``model`` should be hedged.
+
+        Returns:
+            float: Seconds, or None if hedging is disabled or there are too few samples
+        """
+        stats = self.stats.get(model)
+        if not self.hedge_percentile or stats is None or len(stats.latencies) < self.hedge_min_samples:
+            return None
+        return stats.percentile(self.hedge_percentile) * self.hedge_multiplier
+
+    def record(self, model, latency, success):
+        """Record the outcome of a request to ``model``."""
+        stats = self.stats.get(model)
+        if stats is None:
+            return
+        was_cooling = stats.in_cooldown()
+        stats.record(latency, success)
+        if not success and not was_cooling:
+            logger.warning(
+                f"Provider {model} failed ({stats.consecutive_failures} in a row, error rate {stats.error_rate:.0%}); "
+                "routing around it"
+            )
+
+    def snapshot(self):
+        """
+        Summarize routing statistics per provider.
+
+        Returns:
+            dict: Stats keyed by model
+        """
+        return {
+            model: {
+                "weight": weight,
+                "requests": self.stats[model].requests,
+                "failures": self.stats[model].failures,
+                "error_rate": round(self.stats[model].error_rate, 4),
+                "ewma_latency": round(self.stats[model].ewma_latency or 0.0, 4),
+                "p95_latency": round(self.stats[model].percentile(95) or 0.0, 4),
+            }
+            for model, weight in self.providers
+        }
@@ -0,0 +1,110 @@
+"""
+Scheduling module for LLM Chat Indexer.
+
+Decides the order in which chat files are processed. The index lists files
+in discovery order either way; the schedule only changes which files are
+done first:
+
+- ``discovery``: the order the directory walk yields them
+- ``newest``: most recently modified first, so fresh exports show up early
+- ``smallest``: smallest first, for fast early coverage of the corpus
+- ``largest``: largest first, so long chats start early and concurrent
+  workers do not end the run waiting on one huge transcript
+- ``cached``: files whose current analysis is already in the index first
+
+Explicit priority paths (files, directories or glob patterns) go ahead of
+everything else, in the order they are given.
+"""
+
+import os
+import fnmatch
+import logging
+
+logger = logging.getLogger("LLMChatIndexer")
+
+POLICIES = ("discovery", "newest", "smallest", "largest", "cached")
+
+
+def _is_pattern(path):
+    return any(char in path for char in "*?[")
+
+
+def priority_rank(file_path, priority_paths):
+    """
+    Position of the first priority path matching a file.
+
+    Args:
+        file_path (str): Absolute file path
+        priority_paths (List[str]): Absolute files, directories or glob patterns
+
+    Returns:
+        int: Index of the first match, or len(priority_paths) if none matches
+    """
+    for rank, priority_path in enumerate(priority_paths):
+        if _is_pattern(priority_path):
+            if fnmatch.fnmatch(file_path, priority_path):
+                return rank
+        elif file_path == priority_path or file_path.startswith(priority_path.rstrip(os.sep) + os.sep):
+            return rank
+    return len(priority_paths)
+
+
+def sort_key(policy="discovery", priority_paths=(), cached=()):
+    """
+    Build the key that orders files for ``policy``; smaller keys are processed first.
+
+    Args:
+        policy (str): One of ``POLICIES``
+        priority_paths (List[str]): Files, directories or glob patterns processed before all others
+        cached (Set[str]): Files with a current analysis, for the "cached" policy
+
+    Returns:
+        Callable: file path -> sortable tuple
+
+    Raises:
+        ValueError: If the policy is unknown
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"Invalid scheduling policy '{policy}': expected one of {', '.join(POLICIES)}")
+    priority_paths = [os.path.abspath(path) for path in priority_paths]
+
+    def key(file_path):
+        rank = priority_rank(os.path.abspath(file_path), priority_paths) if priority_paths else 0
+        if policy == "discovery":
+            return (rank, 0)
+        if policy == "cached":
+            return (rank, 0 if file_path in cached else 1)
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            # Vanished files sort last; processing reports the error
+            return (rank, float("inf"))
+        if policy == "newest":
+            return (rank, -stat.st_mtime)
+        if policy == "smallest":
+            return (rank, stat.st_size)
+        return (rank, -stat.st_size)
+
+    return key
+
+
+def schedule(file_paths, policy="discovery", priority_paths=(), cached=()):
+    """
+    Order files for processing.
+
+    Ties keep their discovery order.
+
+    Args:
+        file_paths (List[str]): Files in discovery order
+        policy (str): One of ``POLICIES``
+        priority_paths (List[str]): Files, directories or glob patterns processed before all others
+        cached (Set[str]): Files with a current analysis, for the "cached" policy
+
+    Returns:
+        List[str]: The files in processing order
+    """
+    if policy == "discovery" and not priority_paths:
+        return list(file_paths)
+    ordered = sorted(file_paths, key=sort_key(policy, priority_paths, cached))
+    logger.debug("Scheduled %d files by %s", len(ordered), policy)
+    return ordered
@@ -0,0 +1,159 @@
+"""
+Session segmentation module for LLM Chat Indexer.
+
+Splits long message streams into sessions by time gap or size, so each
+session can be indexed and summarized on its own.
+"""
+
+import re
+import logging
+from datetime import datetime, timedelta
+
+logger = logging.getLogger("LLMChatIndexer")
+
+# Leading timestamps commonly found in exported transcripts and IRC logs,
+# e.g. "2024-01-05 10:32", "[2024-01-05T10:32:11]", "2024/01/05 10:32"
+TIMESTAMP_PATTERN = re.compile(
+    r"^\s*[\[(]?(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})[T ,]+(\d{1,2}):(\d{2})(?::(\d{2}))?[\])]?"
+)
+
+
+def parse_time_value(value):
+    """
+    Convert a timestamp value from a chat export into a datetime.
+
+    Args:
+        value (str | int | float): ISO string or epoch seconds/milliseconds
+
+    Returns:
+        datetime: Parsed timestamp, or None if it cannot be interpreted
+    """
+    if value is None or isinstance(value, bool):
+        return None
+
+    if isinstance(value, (int, float)):
+        # Millisecond epochs are common in chat exports
+        seconds = value / 1000 if value > 1e11 else value
+        try:
+            return datetime.fromtimestamp(seconds)
+        except (OverflowError, OSError, ValueError):
+            return None
+
+    if isinstance(value, str):
+        text = value.strip()
+        try:
+            parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+            return parsed.replace(tzinfo=None)
+        except ValueError:
+            return parse_message_time(text)
+
+    return None
+
+
+def parse_message_time(message):
+    """
+    Extract a leading timestamp from a message line.
+
+    Args:
+        message (str): Chat message
+
+    Returns:
+        datetime: Timestamp at the start of the message, or None
+    """
+    match = TIMESTAMP_PATTERN.match(message)
+    if not match:
+        return None
+
+    year, month, day, hour, minute, second = match.groups()
+    try:
+        return datetime(int(year), int(month), int(day), int(hour), int(minute), int(second or 0))
+    except ValueError:
+        return None
+
+
+def segment_messages(messages, gap_minutes, max_chars, max_sessions=0):
+    """
+    Split messages into sessions by time gap or size.
+
+    A new session starts when the time between two timestamped messages
+    exceeds ``gap_minutes`` or when adding a message would push the session
+    over ``max_chars``. Timestamps come from a ``times`` attribute on the
+    message sequence when the parser provides one (e.g. JSON exports), and
+    from leading timestamps in the message text otherwise. Each session costs
+    its own LLM requests, so with ``max_sessions`` adjacent sessions are
+    merged until at most that many remain.
+
+    Args:
+        messages (Sequence[str]): Chat messages
+        gap_minutes (float): Idle time that separates sessions; 0 disables time splitting
+        max_chars (int): Maximum characters per session; 0 disables size splitting
+        max_sessions (int): Maximum sessions per chat; 0 for no limit
+
+    Returns:
+        list: Session dicts with message index range and time span
+    """
+    if not messages:
+        return []
+
+    times = getattr(messages, "times", None)
+    gap = timedelta(minutes=gap_minutes) if gap_minutes else None
+
+    sessions = []
+    current = None
+    last_time = None
+
+    for i, message in enumerate(messages):
+        message_time = parse_time_value(times[i]) if times else parse_message_time(message)
+
+        if current is not None:
+            time_gap = gap and message_time and last_time and message_time - last_time > gap
+            too_large = max_chars and current["char_count"] + len(message) > max_chars
+            if time_gap or too_large:
+                current["end"] = i
+                sessions.append(current)
+                current = None
+
+        if current is None:
+            current = {
+                "index": len(sessions) + 1,
+                "start": i,
+                "end": None,
+                "start_time": None,
+                "end_time": None,
+                "char_count": 0,
+            }
+
+        current["char_count"] += len(message) + 1
+        if message_time:
+            last_time = message_time
+            current["start_time"] = current["start_time"] or message_time.isoformat()
+            current["end_time"] = message_time.isoformat()
+
+    current["end"] = len(messages)
+    sessions.append(current)
+
+    if max_sessions and len(sessions) > max_sessions:
+        logger.debug("Merging %d sessions into %d", len(sessions), max_sessions)
+        sessions = _merge_sessions(sessions, max_sessions)
+
+    if len(sessions) > 1:
+        logger.debug("Segmented %d messages into %d sessions", len(messages), len(sessions))
+    return sessions
+
+
+def _merge_sessions(sessions, count):
+    """Merge runs of adjacent sessions into ``count`` sessions with about as many parts each."""
+    merged = []
+    for group in range(count):
+        parts = sessions[group * len(sessions) // count : (group + 1) * len(sessions) // count]
+        start_times = [part["start_time"] for part in parts if part["start_time"]]
+        end_times = [part["end_time"] for part in parts if part["end_time"]]
+        merged.append({
+            "index": group + 1,
+            "start": parts[0]["start"],
+            "end": parts[-1]["end"],
+            "start_time": start_times[0] if start_times else None,
+            "end_time": end_times[-1] if end_times else None,
+            "char_count": sum(part["char_count"] for part in parts),
+        })
+    return merged
@@ -0,0 +1,160 @@
+"""
+Sharding module for LLM Chat Indexer.
+
+Splits a corpus deterministically across several runs (``--shard i/N``), e.g.
+on different hosts with different API keys, and merges the partial indexes
+the shards write into the final index.
+
+A file belongs to the shard given by the hash of its path relative to the
+input directory, so every host computes the same partition regardless of
+where the corpus is mounted and in which order files are discovered. Each
+shard writes ``<index>.shard-<i>-of-<N>.json`` with its summaries next to a
+``manifest.shard-<i>-of-<N>.json`` describing what it covered.
+"""
+
+import os
+import glob
+import json
+import hashlib
+import logging
+from datetime import datetime
+
+logger = logging.getLogger("LLMChatIndexer")
+
+MANIFEST_PATTERN = "manifest.shard-*-of-*.json"
+
+
+def parse_shard(spec):
+    """
+    Parse a shard specification.
+
+    Args:
+        spec (str): "i/N" with 0 <= i < N
+
+    Returns:
+        tuple: (index, count)
+
+    Raises:
+        ValueError: If the specification is malformed or out of range
+    """
+    try:
+        index, count = (int(part) for part in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"Invalid shard '{spec}': expected i/N, e.g. 0/4") from None
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard '{spec}': need 0 <= i < N")
+    return index, count
+
+
+def shard_of(file_path, root, count):
+    """
+    Shard a file belongs to.
+
+    Args:
+        file_path (str): Path of the file
+        root (str): Input directory the path is made relative to
+        count (int): Number of shards
+
+    Returns:
+        int: Shard index in [0, count)
+    """
+    relative = os.path.relpath(file_path, root).replace(os.sep, "/")
+    digest = hashlib.sha256(relative.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count
+
+
+def select_shard(file_paths, root, index, count):
+    """Files of ``file_paths`` that belong to shard ``index`` of ``count``."""
+    return [file_path for file_path in file_paths if shard_of(file_path, root, count) == index]
+
+
+def shard_filename(filename, index, count):
+    """Per-shard variant of an output filename, e.g. chat_index.shard-0-of-4.json."""
+    stem, extension = os.path.splitext(filename)
+    return f"{stem}.shard-{index}-of-{count}{extension}"
+
+
+def write_manifest(output_dir, index, count, input_dir, chat_files, processed_files, usage=None):
+    """
+    Describe what a shard covered, for the merge step.
+
+    Args:
+        output_dir (str): Directory the shard's index was written to
+        index (int): Shard index
+        count (int): Number of shards
+        input_dir (str): Input directory of the run
+        chat_files (List[str]): Files assigned to the shard
+        processed_files (List[dict]): Index entries the shard produced
+        usage (dict, optional): Token usage and cost of the shard's run
+
+    Returns:
+        str: Path of the manifest
+    """
+    covered = {entry["path"] for entry in processed_files if "path" in entry}
+    manifest = {
+        "shard": index,
+        "shards": count,
+        "input_dir": input_dir,
+        "created": datetime.now().isoformat(),
+        "files": len(chat_files),
+        "processed": len(covered),
+        "missing": sorted(os.path.relpath(path, input_dir) for path in chat_files if path not in covered),
+        "usage": usage,
+    }
+    path = os.path.join(output_dir, f"manifest.shard-{index}-of-{count}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return path
+
+
+def merge_shards(shard_dirs, index_filename):
+    """
+    Combine the partial indexes written by the shards of one run.
+
+    Args:
+        shard_dirs (List[str]): Directories holding shard indexes and manifests
+        index_filename (str): Base index filename the shards were run with
+
+    Returns:
+        dict: Index data with the entries of all shards, ordered by path, and merged usage metadata
+
+    Raises:
+        ValueError: If no shards are found, shards disagree on N, or a shard is missing or duplicated
+    """
+    manifests = {}
+    for shard_dir in shard_dirs:
+        for manifest_path in sorted(glob.glob(os.path.join(shard_dir, MANIFEST_PATTERN))):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            key = (manifest["shard"], manifest["shards"])
+            if key in manifests:
+                raise ValueError(f"Shard {key[0]}/{key[1]} found twice: {manifests[key][0]} and {manifest_path}")
+            manifests[key] = (manifest_path, manifest)
+
+    if not manifests:
+        raise ValueError(f"No shard manifests found in {', '.join(shard_dirs)}")
+    counts = {count for _, count in manifests}
+    if len(counts) > 1:
+        raise ValueError(f"Shards from runs with different shard counts: {sorted(counts)}")
+    count = counts.pop()
+    missing = [str(index) for index in range(count) if (index, count) not in manifests]
+    if missing:
+        raise ValueError(f"Missing shards {', '.join(missing)} of {count}")
+
+    files = []
+    usage = {"requests": 0, "input_tokens": 0, "output_tokens": 0, "cost": 0.0}
+    for (index, count), (manifest_path, manifest) in sorted(manifests.items()):
+        if manifest.get("missing"):
+            logger.warning(f"Shard {index}/{count} did not process {len(manifest['missing'])} of its files")
+        shard_index = os.path.join(os.path.dirname(manifest_path), shard_filename(index_filename, index, count))
+        with open(shard_index, "r", encoding="utf-8") as f:
+            files.extend(json.load(f)["files"])
+        for key, value in ((manifest.get("usage") or {}).get("total") or {}).items():
+            if key in usage:
+                usage[key] += value
+    usage["cost"] = round(usage["cost"], 6)
+
+    # Stable sort keeps session entries right after their parent
+    files.sort(key=lambda entry: entry.get("path", ""))
+    logger.info(f"Merged {count} shards into {len(files)} index entries")
+    return {"files": files, "metadata": {"shards": count, "usage": {"total": usage}}}
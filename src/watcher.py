@@ -0,0 +1,107 @@
+"""
+Directory watcher module for LLM Chat Indexer.
+
+Detects new, changed and deleted chat files by polling file signatures
+(modification time and size). A file is only reported once its signature has
+stayed the same for the debounce period, so exports that are still being
+written, and bursts of files dropped at once, are picked up together when
+they settle.
+"""
+
+import os
+import time
+import logging
+
+logger = logging.getLogger("LLMChatIndexer")
+
+
+class DirectoryWatcher:
+    """Polls a directory tree for changed chat files."""
+
+    def __init__(self, directory, supported_extensions, debounce=1.0):
+        """
+        Initialize the watcher.
+
+        Args:
+            directory (str): Directory to watch, recursively
+            supported_extensions (List[str]): File extensions to watch
+            debounce (float): Seconds a file must stay unchanged before it is reported
+        """
+        self.directory = directory
+        self.extensions = tuple(ext if ext.startswith(".") else f".{ext}" for ext in supported_extensions)
+        self.debounce = debounce
+        # Signatures of the files as last reported
+        self.known = {}
+        # path -> (signature, time it was first seen with that signature)
+        self._settling = {}
+
+    def scan(self):
+        """
+        Stat every chat file in the tree.
+
+        Returns:
+            dict: path -> (mtime_ns, size)
+        """
+        signatures = {}
+        stack = [self.directory]
+        while stack:
+            try:
+                entries = os.scandir(stack.pop())
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir():
+                            stack.append(entry.path)
+                        elif entry.name.endswith(self.extensions):
+                            stat = entry.stat()
+                            signatures[entry.path] = (stat.st_mtime_ns, stat.st_size)
+                    except OSError:
+                        # Deleted between listing and stat
+                        continue
+        return signatures
+
+    def prime(self):
+        """
+        Take the files present now as known, without debouncing.
+
+        Returns:
+            List[str]: Paths of the files present
+        """
+        self.known = self.scan()
+        self._settling.clear()
+        return list(self.known)
+
+    def poll(self, now=None):
+        """
+        Compare the tree with the last reported state.
+
+        Args:
+            now (float, optional): Current monotonic time
+
+        Returns:
+            tuple: (changed, deleted) path lists; changed covers new and modified files that have settled
+        """
+        now = time.monotonic() if now is None else now
+        current = self.scan()
+
+        deleted = [path for path in self.known if path not in current]
+        for path in deleted:
+            del self.known[path]
+        for path in [path for path in self._settling if path not in current]:
+            del self._settling[path]
+
+        changed = []
+        for path, signature in current.items():
+            if self.known.get(path) == signature:
+                self._settling.pop(path, None)
+                continue
+            settling = self._settling.get(path)
+            if settling is None or settling[0] != signature:
+                self._settling[path] = (signature, now)
+            elif now - settling[1] >= self.debounce:
+                del self._settling[path]
+                self.known[path] = signature
+                changed.append(path)
+        return changed, deleted
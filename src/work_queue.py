@@ -0,0 +1,248 @@
+"""
+Work queue module for LLM Chat Indexer.
+
+A job table in SQLite that several worker processes, on the same host or on
+hosts sharing a filesystem with working file locks, draw chat files from.
+A worker leases one file at a time, keeps the lease alive with heartbeats
+while it processes the file and writes the index entries back. Leases of
+crashed or stuck workers expire and the file is handed to another worker;
+a file whose lease expired ``max_attempts`` times is marked failed instead
+of taking down worker after worker.
+
+Files are leased largest first, so the huge transcripts start early and the
+small ones fill the gaps at the end of the run.
+"""
+
+import os
+import json
+import time
+import socket
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger("LLMChatIndexer")
+
+# Parts a process plays in a queued run
+ROLES = ("coordinator", "worker", "all")
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    updated REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, size);
+"""
+
+
+def default_worker_id():
+    """Identifier of this process across hosts."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobQueue:
+    """Lease-based file job table shared by workers."""
+
+    def __init__(self, path, lease_seconds=300.0, max_attempts=3, worker_id=None):
+        """
+        Open (and create if needed) the job table.
+
+        Args:
+            path (str): SQLite database file
+            lease_seconds (float): How long a lease lasts without a heartbeat
+            max_attempts (int): Leases per file before it is marked failed
+            worker_id (str, optional): Identifier of this worker; host:pid by default
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.worker_id = worker_id or default_worker_id()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(self.path, timeout=60)
+        try:
+            db.executescript(_SCHEMA)
+        finally:
+            db.close()
+
+    @contextmanager
+    def _transaction(self):
+        # A connection per operation keeps the queue usable from heartbeat threads;
+        # BEGIN IMMEDIATE takes the write lock up front so two workers cannot lease the same file
+        db = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+        finally:
+            db.close()
+
+    def enqueue(self, file_paths):
+        """
+        Add files as pending jobs; files already in the table are left alone.
+
+        Args:
+            file_paths (List[str]): Files to process
+
+        Returns:
+            int: Number of new jobs
+        """
+        now = time.time()
+        rows = []
+        for file_path in file_paths:
+            try:
+                size = os.path.getsize(file_path)
+            except OSError:
+                size = 0
+            rows.append((file_path, size, now))
+        with self._transaction() as db:
+            before = db.total_changes
+            db.executemany("INSERT OR IGNORE INTO jobs (path, size, updated) VALUES (?, ?, ?)", rows)
+            return db.total_changes - before
+
+    def lease(self):
+        """
+        Lease the largest pending file, or one whose lease expired.
+
+        Returns:
+            str: Path of the leased file, or None if nothing is available right now
+        """
+        now = time.time()
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE jobs SET state = ?, worker = NULL, error = ?, updated = ? "
+                "WHERE state = ? AND lease_expires < ? AND attempts >= ?",
+                (FAILED, "Lease expired on every attempt", now, LEASED, now, self.max_attempts),
+            )
+            row = db.execute(
+                "SELECT path FROM jobs WHERE state = ? OR (state = ? AND lease_expires < ?) "
+                "ORDER BY size DESC, path LIMIT 1",
+                (PENDING, LEASED, now),
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute(
+                "UPDATE jobs SET state = ?, worker = ?, lease_expires = ?, attempts = attempts + 1, updated = ? "
+                "WHERE path = ?",
+                (LEASED, self.worker_id, now + self.lease_seconds, now, row[0]),
+            )
+            return row[0]
+
+    def renew(self, file_path):
+        """
+        Extend this worker's lease on a file.
+
+        Returns:
+            bool: False if the lease was lost to another worker
+        """
+        now = time.time()
+        with self._transaction() as db:
+            cursor = db.execute(
+                "UPDATE jobs SET lease_expires = ?, updated = ? WHERE path = ? AND worker = ? AND state = ?",
+                (now + self.lease_seconds, now, file_path, self.worker_id, LEASED),
+            )
+            return cursor.rowcount == 1
+
+    @contextmanager
+    def heartbeat(self, file_path, interval=None):
+        """
+        Renew the lease on ``file_path`` in the background while the block runs.
+
+        Args:
+            file_path (str): Leased file
+            interval (float, optional): Seconds between renewals; a third of the lease by default
+        """
+        interval = interval or self.lease_seconds / 3
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(interval):
+                try:
+                    if not self.renew(file_path):
+                        logger.warning(f"Lost the lease on {file_path}; another worker may process it too")
+                        return
+                except sqlite3.Error as e:
+                    logger.warning(f"Could not renew the lease on {file_path}: {str(e)}")
+
+        thread = threading.Thread(target=beat, name="lease-heartbeat", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def complete(self, file_path, entries):
+        """
+        Store the index entries of a processed file.
+
+        Args:
+            file_path (str): Leased file
+            entries (List[dict]): Its index entries
+
+        Returns:
+            bool: False if the file was already completed by a worker that took over the lease
+        """
+        with self._transaction() as db:
+            cursor = db.execute(
+                "UPDATE jobs SET state = ?, result = ?, error = NULL, lease_expires = NULL, updated = ? "
+                "WHERE path = ? AND state != ?",
+                (DONE, json.dumps(entries), time.time(), file_path, DONE),
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, file_path, error):
+        """Give a file back after an error; it is retried until it ran out of attempts."""
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE jobs SET state = CASE WHEN attempts >= ? THEN ? ELSE ? END, worker = NULL, "
+                "lease_expires = NULL, error = ?, updated = ? WHERE path = ? AND worker = ? AND state = ?",
+                (self.max_attempts, FAILED, PENDING, str(error), time.time(), file_path, self.worker_id, LEASED),
+            )
+
+    def counts(self):
+        """
+        Count jobs by state.
+
+        Returns:
+            dict: Job counts for pending, leased, done and failed
+        """
+        with self._transaction() as db:
+            rows = db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        counts.update(rows)
+        return counts
+
+    def drained(self):
+        """Whether every job is done or failed."""
+        counts = self.counts()
+        return counts[PENDING] == 0 and counts[LEASED] == 0
+
+    def results(self):
+        """
+        Index entries of all completed files.
+
+        Returns:
+            List[dict]: Entries ordered by file path
+        """
+        with self._transaction() as db:
+            rows = db.execute("SELECT result FROM jobs WHERE state = ? ORDER BY path", (DONE,)).fetchall()
+        return [entry for (result,) in rows for entry in json.loads(result)]
@@ -3,7 +3,9 @@ Test configuration and fixtures for LLM Chat Indexer tests.
 """
 
 import os
+import sys
 import tempfile
+import importlib.util
 import pytest
 from unittest.mock import MagicMock
 
@@ -11,6 +13,15 @@ from src.config import Config
 from src.llm_client import LLMClient
 from src.logger import setup_logger
 
+# The main script's filename is not a valid module name; load it as ``chat_indexer``
+# so tests can import it and patch its functions by name
+if "chat_indexer" not in sys.modules:
+    _spec = importlib.util.spec_from_file_location(
+        "chat_indexer", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "chat-indexer.py")
+    )
+    sys.modules["chat_indexer"] = importlib.util.module_from_spec(_spec)
+    _spec.loader.exec_module(sys.modules["chat_indexer"])
+
 
 @pytest.fixture
 def sample_chat_content():
@@ -58,6 +69,21 @@ def temp_directory():
         Config.OUTPUT_DIR = old_output_dir
 
 
+@pytest.fixture
+def make_files(tmp_path):
+    """Factory that creates chat files of the given sizes and returns their paths."""
+
+    def make(sizes):
+        paths = []
+        for i, size in enumerate(sizes):
+            path = tmp_path / f"chat_{i}.txt"
+            path.write_text("x" * size, encoding="utf-8")
+            paths.append(str(path))
+        return paths
+
+    return make
+
+
 @pytest.fixture
 def mock_llm_client():
     """Create a mock LLM client for testing."""
@@ -0,0 +1,58 @@
+"""
+Tests for the benchmark suite.
+"""
+
+import os
+from benchmarks.corpus import FORMATS, generate_corpus
+from benchmarks.run import run_benchmark, compare
+from src.file_parser import parse_path
+
+
+def test_generate_corpus_all_formats(tmp_path):
+    """Test that the synthetic corpus covers every format and parses into messages."""
+    stats = generate_corpus(str(tmp_path), files=10, duplicate_ratio=0.3, seed=1)
+
+    # Assertions
+    assert stats["files"] == 10
+    assert all(stats["by_format"][ext] == 2 for ext in FORMATS)
+    for name in os.listdir(tmp_path):
+        assert len(parse_path(str(tmp_path / name))) > 0
+
+
+def test_generate_corpus_is_reproducible(tmp_path):
+    """Test that the same seed produces the same corpus."""
+    generate_corpus(str(tmp_path / "a"), files=5, seed=3)
+    generate_corpus(str(tmp_path / "b"), files=5, seed=3)
+
+    # Assertions
+    for name in os.listdir(tmp_path / "a"):
+        assert (tmp_path / "a" / name).read_bytes() == (tmp_path / "b" / name).read_bytes()
+
+
+def test_run_benchmark_reports_stages(tmp_path):
+    """Test a small end-to-end run against the mock provider."""
+    result = run_benchmark(files=5, max_messages=8, latency=0.0, work_dir=str(tmp_path))
+
+    pipeline = result["stages"]["pipeline"]
+
+    # Assertions
+    assert set(result["stages"]) == {"generate", "parse", "pipeline"}
+    assert pipeline["indexed_entries"] == 5
+    assert pipeline["requests"] == pipeline["served_requests"] == 10
+    assert pipeline["degraded_calls"] == 0
+    assert pipeline["tokens_per_sec"] > 0
+    assert pipeline["latency_p95"] >= pipeline["latency_p50"] > 0
+    assert os.path.exists(tmp_path / "output" / "chat_index.json")
+
+
+def test_compare_flags_regressions():
+    """Test that only changes beyond the tolerance in the worse direction are regressions."""
+    baseline = {"stages": {"pipeline": {"files_per_sec": 10.0, "latency_p95": 0.2, "peak_rss_mb": 100.0}}}
+    result = {"stages": {"pipeline": {"files_per_sec": 8.0, "latency_p95": 0.1, "peak_rss_mb": 105.0}}}
+
+    changes = compare(result, baseline, tolerance=0.1)["pipeline"]
+
+    # Assertions
+    assert changes["files_per_sec"]["regressed"]
+    assert not changes["latency_p95"]["regressed"]
+    assert not changes["peak_rss_mb"]["regressed"]
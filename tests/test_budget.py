@@ -0,0 +1,61 @@
+"""
+Tests for the budget module.
+"""
+
+import time
+import pytest
+from unittest.mock import MagicMock
+from src.budget import RunBudget, STOP
+
+
+def make_response(prompt_tokens, completion_tokens):
+    response = MagicMock()
+    response.usage.prompt_tokens = prompt_tokens
+    response.usage.completion_tokens = completion_tokens
+    return response
+
+
+def test_record_per_file_and_provider():
+    """Test usage accounting per file, per provider and for batches."""
+    budget = RunBudget()
+
+    with budget.file_scope("a.txt"):
+        budget.record("model-a", make_response(100, 10))
+    with budget.file_scope(["b.txt", "c.txt"]):
+        budget.record("model-b", make_response(51, 5))
+    budget.record("model-b", make_response(1, 1))
+
+    snapshot = budget.snapshot()
+
+    # Assertions
+    assert snapshot["total"]["input_tokens"] == 152
+    assert snapshot["total"]["requests"] == 3
+    assert snapshot["by_provider"]["model-b"]["output_tokens"] == 6
+    assert budget.file_usage("a.txt")["input_tokens"] == 100
+    assert budget.file_usage("b.txt")["input_tokens"] == 26
+    assert budget.file_usage("c.txt")["input_tokens"] == 25
+    assert budget.file_usage("missing.txt") is None
+
+
+def test_exceeded_limits():
+    """Test token and time limits."""
+    budget = RunBudget(max_input_tokens=100, action=STOP)
+    assert budget.exceeded() is None
+
+    budget.record("model", make_response(100, 1))
+
+    # Assertions
+    assert "input token budget" in budget.exceeded()
+    assert budget.snapshot()["exhausted"] == budget.exhausted_reason
+
+    timed = RunBudget(max_seconds=0.01)
+    time.sleep(0.02)
+    assert "time budget" in timed.exceeded()
+
+
+def test_invalid_action():
+    """Test validation of the budget action."""
+    with pytest.raises(ValueError):
+        RunBudget(action="panic")
+    with pytest.raises(ValueError):
+        RunBudget(action="downgrade")
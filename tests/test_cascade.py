@@ -0,0 +1,52 @@
+"""
+Tests for the cascade module.
+"""
+
+import pytest
+from unittest.mock import MagicMock
+from src.cascade import CascadePolicy, complexity, parse_tiers, topics_valid, summary_valid
+
+
+def test_parse_tiers():
+    """Test parsing a cascade model list."""
+    assert parse_tiers("small, large,") == ["small", "large"]
+
+
+def test_start_tier():
+    """Test that long or code-heavy chats skip the cheapest tier."""
+    policy = CascadePolicy(["small", "medium", "large"], token_threshold=100, complexity_threshold=0.3)
+    chat = "User: How do I bake bread?\nAssistant: Mix flour, water and yeast."
+    code = "\n".join(['File "app.py", line 12, in main', "ValueError: bad value", "Traceback (most recent call last)"])
+
+    # Assertions
+    assert policy.start_tier(chat, 20) == 0
+    assert policy.start_tier(chat, 500) == 1
+    assert policy.start_tier(code, 500) == 2
+    assert complexity(code) == 1.0
+    assert complexity("") == 0.0
+
+
+def test_validators():
+    """Test answer validation used to decide escalation."""
+    assert topics_valid("a, b, c", 3)
+    assert not topics_valid("a, b", 3)
+    assert not topics_valid("", 1)
+    assert summary_valid("A short summary.")
+    assert not summary_valid("  ")
+
+
+def test_record_stats():
+    """Test per-tier usage accounting."""
+    policy = CascadePolicy(["small", "large"])
+    response = MagicMock()
+    response.usage.prompt_tokens = 100
+    response.usage.completion_tokens = 20
+
+    policy.record("small", response, False)
+    policy.record("large", response, True)
+    stats = policy.snapshot()
+
+    # Assertions
+    assert stats["small"] == {"requests": 1, "accepted": 0, "escalated": 1, "prompt_tokens": 100, "completion_tokens": 20}
+    assert stats["large"]["accepted"] == 1
+    assert stats["large"]["escalated"] == 0
@@ -0,0 +1,185 @@
+"""
+Tests for the cassette module.
+"""
+
+import json
+import time
+import asyncio
+import pytest
+import litellm
+from unittest.mock import patch
+from litellm import ModelResponse
+from src.cassette import Cassette, CassetteMiss
+from src.llm_client import LLMClient
+
+MESSAGES = [{"role": "user", "content": "Summarize: Let's talk about AI"}]
+
+
+def make_response(content):
+    """Build a provider response with usage."""
+    return ModelResponse(
+        model="test-provider",
+        choices=[{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+        usage={"prompt_tokens": 12, "completion_tokens": 4, "total_tokens": 16},
+    )
+
+
+@pytest.fixture
+def recorded_run(tmp_path):
+    """Cassette file recorded from a summary and a topic extraction."""
+    path = str(tmp_path / "run.jsonl")
+    cassette = Cassette(path, mode="record")
+    client = LLMClient("test-provider", rate_limit_delay=0, cassette=cassette)
+    with patch("src.llm_client.completion") as mock_completion:
+        mock_completion.side_effect = [make_response("A chat about AI."), make_response("ai, chat")]
+        assert client.summarize(["Let's talk about AI"]) == "A chat about AI."
+        assert client.extract_topics(["Let's talk about AI"], 2) == ["ai", "chat"]
+    client.close()
+    assert cassette.recorded == 2
+    return path
+
+
+def test_replay_serves_recorded_responses(recorded_run):
+    """Test that a replayed run gets the recorded answers without calling the provider."""
+    cassette = Cassette(recorded_run, mode="replay")
+    client = LLMClient("test-provider", rate_limit_delay=0, cassette=cassette)
+
+    with patch("src.llm_client.completion") as mock_completion:
+        summary = client.summarize(["Let's talk about AI"])
+        topics = client.extract_topics(["Let's talk about AI"], 2)
+
+    # Assertions
+    assert not mock_completion.called
+    assert summary == "A chat about AI."
+    assert topics == ["ai", "chat"]
+    assert cassette.snapshot()["replayed"] == 2
+
+
+def test_replay_async(recorded_run):
+    """Test that async calls replay from the same cassette."""
+    cassette = Cassette(recorded_run, mode="replay")
+    client = LLMClient("test-provider", rate_limit_delay=0, cassette=cassette)
+
+    with patch("src.llm_client.acompletion") as mock_acompletion:
+        summary = asyncio.run(client.summarize_async(["Let's talk about AI"]))
+
+    # Assertions
+    assert not mock_acompletion.called
+    assert summary == "A chat about AI."
+
+
+def test_replay_matches_other_model(recorded_run):
+    """Test that a request sent to another model still finds its recording."""
+    cassette = Cassette(recorded_run, mode="replay")
+    client = LLMClient("other-provider", rate_limit_delay=0, cassette=cassette)
+
+    summary = client.summarize(["Let's talk about AI"])
+
+    # Assertions
+    assert summary == "A chat about AI."
+    assert cassette.misses == 0
+
+
+def test_replay_miss_falls_back(recorded_run):
+    """Test that an unrecorded request is reported and answered by the offline fallback."""
+    cassette = Cassette(recorded_run, mode="replay")
+    client = LLMClient("test-provider", rate_limit_delay=0, cassette=cassette)
+
+    with pytest.raises(CassetteMiss):
+        cassette.replay("test-provider", [{"role": "user", "content": "never sent"}])
+    summary = client.summarize(["A chat that was never recorded"])
+
+    # Assertions
+    assert cassette.misses == 2
+    assert "approximately" in summary
+
+
+def test_recorded_errors_are_replayed_in_order(tmp_path):
+    """Test that temporary provider errors are recorded and raised again on replay."""
+    path = str(tmp_path / "errors.jsonl")
+    cassette = Cassette(path, mode="record")
+    client = LLMClient("test-provider", max_retries=2, rate_limit_delay=0, cassette=cassette)
+    error = litellm.ServiceUnavailableError("overloaded", model="test-provider", llm_provider="test")
+    with patch("src.llm_client.completion", side_effect=[error, make_response("A chat about AI.")]), patch(
+        "src.llm_client.LLMClient._retry_wait", return_value=0
+    ):
+        assert client.summarize(["Let's talk about AI"]) == "A chat about AI."
+    client.close()
+
+    replayed = LLMClient(
+        "test-provider", max_retries=2, rate_limit_delay=0, cassette=Cassette(path, mode="replay")
+    )
+    with patch("src.llm_client.LLMClient._retry_wait", return_value=0):
+        summary = replayed.summarize(["Let's talk about AI"])
+
+    # Assertions
+    assert cassette.recorded == 2
+    assert replayed.cassette.replayed == 2
+    assert summary == "A chat about AI."
+
+
+def test_replay_latency_modes(tmp_path):
+    """Test recorded, sampled and scaled replay latencies."""
+    path = str(tmp_path / "latency.jsonl")
+    cassette = Cassette(path, mode="record")
+    for latency in (0.1, 0.2, 0.3, 0.4):
+        cassette.record("test-provider", MESSAGES, latency, response=make_response("A chat about AI."))
+    cassette.close()
+
+    instant = Cassette(path, mode="replay")
+    recorded = Cassette(path, mode="replay", latency="recorded", latency_scale=2.0)
+    sampled_a = Cassette(path, mode="replay", latency="sampled", seed=7)
+    sampled_b = Cassette(path, mode="replay", latency="sampled", seed=7)
+
+    # Assertions
+    assert instant.replay("test-provider", MESSAGES)[1] == 0.0
+    assert [recorded.replay("test-provider", MESSAGES)[1] for _ in range(5)] == pytest.approx(
+        [0.2, 0.4, 0.6, 0.8, 0.2]
+    )
+    sampled = [sampled_a.replay("test-provider", MESSAGES)[1] for _ in range(20)]
+    assert sampled == [sampled_b.replay("test-provider", MESSAGES)[1] for _ in range(20)]
+    assert set(sampled) <= {0.1, 0.2, 0.3, 0.4}
+
+
+def test_replay_latency_is_waited_and_times_out(tmp_path):
+    """Test that replayed latency delays the answer and respects the request timeout."""
+    path = str(tmp_path / "slow.jsonl")
+    recorder = Cassette(path, mode="record")
+    client = LLMClient("test-provider", rate_limit_delay=0, cassette=recorder)
+    with patch("src.llm_client.completion", return_value=make_response("A chat about AI.")):
+        client.summarize(["Let's talk about AI"])
+    recorder.close()
+    # Pretend the provider took 0.3s
+    with open(path, encoding="utf-8") as f:
+        entry = json.loads(f.read())
+    entry["latency"] = 0.3
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+
+    patient = LLMClient("test-provider", rate_limit_delay=0, cassette=Cassette(path, mode="replay", latency="recorded"))
+    start = time.monotonic()
+    assert patient.summarize(["Let's talk about AI"]) == "A chat about AI."
+    assert time.monotonic() - start >= 0.3
+
+    hasty = LLMClient(
+        "test-provider",
+        max_retries=0,
+        rate_limit_delay=0,
+        request_timeout=0.05,
+        cassette=Cassette(path, mode="replay", latency="recorded"),
+    )
+    start = time.monotonic()
+    summary = hasty.summarize(["Let's talk about AI"])
+
+    # Assertions
+    assert time.monotonic() - start < 0.3
+    assert hasty.timed_out_requests == 1
+    assert "approximately" in summary
+
+
+def test_invalid_modes(tmp_path):
+    """Test that unknown modes are rejected."""
+    with pytest.raises(ValueError):
+        Cassette(str(tmp_path / "a.jsonl"), mode="rewind")
+    with pytest.raises(ValueError):
+        Cassette(str(tmp_path / "a.jsonl"), mode="record", latency="jittery")
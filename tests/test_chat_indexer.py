@@ -3,13 +3,13 @@ Tests for the main chat-indexer script.
 """
 
 import os
+import json
 import sys
 import tempfile
 import pytest
 from unittest.mock import patch, MagicMock
 
-# Add project root to path to import main script
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+# Loaded from chat-indexer.py by conftest.py
 import chat_indexer
 
 
@@ -106,6 +106,330 @@ def test_process_file(mock_llm_client):
         os.unlink(filename)
 
 
+def test_process_file_with_sessions(mock_llm_client):
+    """Test that long chats are split into session entries linked to the file."""
+    mock_llm_client.extract_topics_async.return_value = ["topic1", "topic2"]
+    mock_llm_client.summarize_async.return_value = "Session summary"
+    mock_llm_client.summarize.return_value = "Overall summary"
+
+    content = "[2024-01-05 10:00] User: Hello\n[2024-01-05 10:01] Assistant: Hi\n[2024-02-01 09:00] User: Back again\n"
+    with tempfile.NamedTemporaryFile(suffix=".txt", delete=False) as f:
+        f.write(content.encode("utf-8"))
+        filename = f.name
+
+    try:
+        result = chat_indexer.process_file(filename, mock_llm_client, 3)
+        entries = chat_indexer.flatten_sessions(result)
+
+        # Assertions
+        assert result["session_count"] == 2
+        assert result["summary"] == "Overall summary"
+        assert result["topics"] == ["topic1", "topic2"]
+        assert len(entries) == 3
+        assert entries[1]["parent"] == filename
+        assert entries[1]["message_count"] == 2
+        assert entries[2]["start_time"] == "2024-02-01T09:00:00"
+        assert mock_llm_client.summarize_async.call_count == 2
+    finally:
+        # Clean up
+        os.unlink(filename)
+
+
+def test_process_file_size_split_skips_mapped_transcripts(mock_llm_client, tmp_path):
+    """Test that size splitting applies to regular chats but not to memory-mapped transcripts."""
+    mock_llm_client.extract_topics_async.return_value = ["topic1"]
+    mock_llm_client.summarize_async.return_value = "Session summary"
+    path = tmp_path / "chat.txt"
+    path.write_text("".join(f"User: Question {i}\nAssistant: Answer {i}\n" for i in range(20)), encoding="utf-8")
+
+    with patch.multiple(chat_indexer.Config, SESSION_GAP_MINUTES=0, SESSION_MAX_CHARS=100, SESSION_MAX_COUNT=3):
+        with patch.object(chat_indexer.Config, "LARGE_FILE_THRESHOLD", 1 << 30):
+            split = chat_indexer.process_file(str(path), mock_llm_client, 3)
+        with patch.object(chat_indexer.Config, "LARGE_FILE_THRESHOLD", 1):
+            mapped = chat_indexer.process_file(str(path), mock_llm_client, 3)
+
+    # Assertions
+    assert split["session_count"] == 3
+    assert "sessions" not in mapped
+    assert mapped["message_count"] == 40
+
+
+def test_sessions_of_mapped_transcript_stay_lazy(tmp_path):
+    """Test that analyzing the sessions of a large memory-mapped transcript decodes only the prompt text."""
+    import tracemalloc
+    from src.llm_client import _join_messages
+
+    class StubClient:
+        # Reads the session the way the real client builds its prompt
+        async def extract_topics_async(self, messages, max_keywords):
+            _join_messages(messages)
+            return ["topic"]
+
+        async def summarize_async(self, messages):
+            _join_messages(messages)
+            return "Session summary"
+
+        def summarize(self, messages):
+            return "Overall summary"
+
+    # Four days of chat, one session per day, about 24 MB in total
+    path = tmp_path / "transcript.txt"
+    with open(path, "w", encoding="utf-8") as f:
+        for day in range(4):
+            for i in range(25000):
+                f.write(f"[2024-01-0{day + 1} 10:{i % 60:02d}] User: message {i} " + "lorem ipsum " * 20 + "\n")
+    file_size = os.path.getsize(path)
+
+    # Parsing is measured by the file parser tests; only the session analysis is measured here
+    messages = chat_indexer.parse_path(str(path), large_file_threshold=1, workers=1)
+    with patch.multiple(chat_indexer.Config, SESSION_GAP_MINUTES=120, SESSION_CONCURRENCY=4):
+        tracemalloc.start()
+        try:
+            result = chat_indexer.process_file(str(path), StubClient(), 3, messages=messages)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            messages.close()
+
+    # Assertions
+    assert result["session_count"] == 4
+    assert result["message_count"] == 100000
+    # Line offsets and prompt prefixes only, not the decoded sessions
+    assert peak < file_size / 20
+
+
+@patch.object(chat_indexer.Config, "BATCH_TOKEN_BUDGET", 1000)
+def test_process_files_staged_batches(mock_llm_client, sample_files):
+    """Test that small chats are analyzed together in one batch."""
+    tmpdir, files = sample_files
+    mock_llm_client.batch_token_budget = 1000
+    mock_llm_client.analyze_documents.side_effect = lambda docs, max_keywords: [(["topic"], "Batched summary")] * len(docs)
+
+    results = chat_indexer.process_files_staged(files, mock_llm_client, 3, MagicMock())
+
+    # Assertions
+    assert mock_llm_client.analyze_documents.call_count == 1
+    assert len(results) == len(files)
+    assert all(entry["summary"] == "Batched summary" for entry in results)
+    assert not mock_llm_client.extract_topics.called
+
+
+def test_process_files_staged_failed_batch_is_not_resent(mock_llm_client, tmp_path):
+    """Test that a batch whose request fails is dropped from the queue instead of growing with later chats."""
+    files = []
+    for i in range(4):
+        path = tmp_path / f"chat{i}.txt"
+        path.write_text(f"User: Hello {i}\nAssistant: Hi", encoding="utf-8")
+        files.append(str(path))
+    # Two chats fill a batch
+    mock_llm_client.batch_token_budget = 2 * chat_indexer.estimate_tokens("User: Hello 0\nAssistant: Hi")
+    batch_sizes = []
+
+    def analyze(documents, max_keywords):
+        batch_sizes.append(len(documents))
+        raise RuntimeError("provider unavailable")
+
+    mock_llm_client.analyze_documents.side_effect = analyze
+
+    with patch.object(chat_indexer.Config, "BATCH_TOKEN_BUDGET", 1000):
+        results = chat_indexer.process_files_staged(files, mock_llm_client, 3, MagicMock())
+
+    # Assertions
+    assert batch_sizes == [2, 2]
+    assert results == []
+
+
+def test_process_files_staged_dedup(mock_llm_client):
+    """Test that duplicate chats reuse the canonical chat's analysis."""
+    from src.dedup import Deduplicator
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        files = []
+        for name, content in [("a.txt", "User: Hello\nAssistant: Hi there"), ("b.txt", "user:  hello\nassistant: hi there\n")]:
+            path = os.path.join(tmpdir, name)
+            with open(path, "w") as f:
+                f.write(content)
+            files.append(path)
+
+        results = chat_indexer.process_files_staged(files, mock_llm_client, 3, MagicMock(), deduplicator=Deduplicator())
+
+    # Assertions
+    assert mock_llm_client.summarize.call_count == 1
+    assert len(results) == 2
+    assert results[1]["duplicate_of"] == files[0]
+    assert results[1]["duplicate_type"] == "exact"
+    assert results[1]["summary"] == results[0]["summary"]
+
+
+def test_requeue_degraded(mock_llm_client, sample_files):
+    """Test that degraded entries are reprocessed once the provider recovers."""
+    from src.circuit_breaker import CircuitBreaker
+
+    tmpdir, files = sample_files
+    mock_llm_client.circuit_breaker = CircuitBreaker()
+    entries = [
+        {"filename": "a", "path": files[0], "topics": [], "summary": "fallback", "message_count": 2, "degraded": True},
+        {"filename": "b", "path": files[1], "topics": ["x"], "summary": "fine", "message_count": 2},
+        {"filename": "c", "path": files[2], "topics": [], "summary": "fallback", "message_count": 2, "duplicate_of": files[0]},
+    ]
+
+    result = chat_indexer.requeue_degraded(entries, mock_llm_client, 3, MagicMock())
+
+    # Assertions
+    assert len(result) == 3
+    assert result[0]["summary"] == "A conversation about machine learning and artificial intelligence."
+    assert "degraded" not in result[0]
+    assert result[1]["summary"] == "fine"
+    assert result[2]["summary"] == result[0]["summary"]
+
+
+def test_budget_stop_skips_remaining_files(mock_llm_client, sample_files):
+    """Test that the stop action ends the run once the budget is exhausted."""
+    from src.budget import RunBudget
+
+    tmpdir, files = sample_files
+    budget = RunBudget(max_input_tokens=1, action="stop")
+    budget.record("test-provider", MagicMock(**{"usage.prompt_tokens": 5, "usage.completion_tokens": 1}))
+    mock_llm_client.budget = budget
+
+    results = chat_indexer.process_files_staged(files, mock_llm_client, 3, MagicMock())
+
+    # Assertions
+    assert results == []
+    assert not mock_llm_client.summarize.called
+
+
+def test_stop_requested_reports_remaining_files(mock_llm_client):
+    """Test the stop message with a known and an unknown number of remaining files."""
+    import threading
+
+    mock_llm_client.cancel_event = threading.Event()
+    mock_llm_client.cancel_event.set()
+    logger = MagicMock()
+
+    # Assertions
+    assert chat_indexer.stop_requested(mock_llm_client, logger, 4)
+    assert chat_indexer.stop_requested(mock_llm_client, logger, None)
+    messages = [call.args[0] for call in logger.warning.call_args_list]
+    assert messages == [
+        "Run cancelled; 4 files were not processed",
+        "Run cancelled; the remaining files were not processed",
+    ]
+
+
+def test_cancelled_run_stops_processing(mock_llm_client, sample_files):
+    """Test that no further files are processed once the run is cancelled."""
+    import threading
+
+    tmpdir, files = sample_files
+    mock_llm_client.cancel_event = threading.Event()
+    mock_llm_client.cancel_event.set()
+
+    with patch.object(chat_indexer.Config, "BATCH_TOKEN_BUDGET", 1000):
+        results = chat_indexer.process_files_staged(files, mock_llm_client, 3, MagicMock())
+
+    # Assertions
+    assert results == []
+    assert not mock_llm_client.analyze_documents.called
+
+
+def test_watch_and_index(mock_llm_client, sample_files, tmp_path):
+    """Test that watch mode reuses unchanged entries and follows added and deleted files."""
+    import threading
+    import time
+
+    tmpdir, files = sample_files
+    index_path = tmp_path / "chat_index.json"
+    index_path.write_text(json.dumps({"files": [
+        {"filename": "sample1.txt", "path": files[0], "timestamp": chat_indexer.get_timestamp(files[0]),
+         "topics": [], "summary": "Earlier summary", "message_count": 2},
+        {"filename": "gone.txt", "path": os.path.join(tmpdir, "gone.txt"), "timestamp": "",
+         "topics": [], "summary": "Deleted since", "message_count": 2},
+    ]}))
+    stop_event = threading.Event()
+    results = []
+
+    def summaries():
+        with open(index_path, encoding="utf-8") as f:
+            return {entry["filename"]: entry["summary"] for entry in json.load(f)["files"]}
+
+    def wait_for(condition):
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            if index_path.exists() and condition(summaries()):
+                return True
+            time.sleep(0.02)
+        return False
+
+    with patch.multiple(
+        chat_indexer.Config,
+        OUTPUT_DIR=str(tmp_path), INDEX_FILENAME="chat_index.json", WATCH_INTERVAL=0.02, WATCH_DEBOUNCE=0.05,
+        PROGRESS="off", BATCH_TOKEN_BUDGET=0, DEDUP_ENABLED=False,
+    ):
+        thread = threading.Thread(
+            target=lambda: results.extend(
+                chat_indexer.watch_and_index(tmpdir, ["txt", "json", "md"], mock_llm_client, MagicMock(), stop_event)
+            )
+        )
+        thread.start()
+        try:
+            started = wait_for(lambda index: len(index) == 3)
+            new_file = os.path.join(tmpdir, "new.txt")
+            with open(new_file, "w") as f:
+                f.write("User: Another chat\nAssistant: Sure")
+            os.remove(files[1])
+            updated = wait_for(lambda index: "new.txt" in index and "sample2.json" not in index)
+        finally:
+            stop_event.set()
+            thread.join()
+
+    # Assertions
+    assert started and updated
+    index = summaries()
+    assert index["sample1.txt"] == "Earlier summary"
+    assert "gone.txt" not in index
+    assert sorted(index) == ["new.txt", "sample1.txt", "sample3.md"]
+    # sample2.json and sample3.md at startup, then new.txt; the unchanged sample1.txt is not sent again
+    assert mock_llm_client.summarize.call_count == 3
+    assert sorted(entry["filename"] for entry in results) == sorted(index)
+
+
+def test_run_queue_coordinator_and_worker(mock_llm_client, sample_files, tmp_path):
+    """Test a coordinator writing the index from the results of a separate worker."""
+    import threading
+
+    tmpdir, files = sample_files
+    queue_path = str(tmp_path / "jobs.db")
+    extensions = ["txt", "json", "md"]
+    results = {}
+
+    with patch.multiple(
+        chat_indexer.Config,
+        OUTPUT_DIR=str(tmp_path / "output"), INDEX_FILENAME="chat_index.json", QUEUE_POLL_INTERVAL=0.02,
+    ):
+        coordinator = threading.Thread(
+            target=lambda: results.update(coordinator=chat_indexer.run_queue(
+                queue_path, "coordinator", tmpdir, extensions, mock_llm_client, MagicMock()
+            ))
+        )
+        coordinator.start()
+        # The worker can start before the coordinator has queued anything
+        results["worker"] = []
+        while not results["worker"]:
+            results["worker"] = chat_indexer.run_queue(queue_path, "worker", tmpdir, extensions, mock_llm_client, MagicMock())
+        coordinator.join(timeout=10)
+
+    with open(tmp_path / "output" / "chat_index.json", encoding="utf-8") as f:
+        index = json.load(f)
+
+    # Assertions
+    assert not coordinator.is_alive()
+    assert sorted(entry["path"] for entry in results["worker"]) == sorted(files)
+    assert sorted(entry["path"] for entry in index["files"]) == sorted(files)
+    assert mock_llm_client.summarize.call_count == len(files)
+
+
+@patch("chat_indexer.Config.LLM_API_KEY", "test-key")
 @patch("chat_indexer.build_index")
 @patch("chat_indexer.process_file")
 @patch("chat_indexer.get_chat_files")
@@ -158,3 +482,205 @@ def test_main(mock_setup_logger, mock_get_files, mock_process, mock_build_index,
         assert isinstance(build_index_args[0], dict)
         assert "files" in build_index_args[0]
         assert len(build_index_args[0]["files"]) == len(files)
+        assert build_index_args[1] == os.path.join(tmpdir, "output")
+
+        # The run report is written next to the index
+        with open(os.path.join(tmpdir, "output", "run_report.json"), encoding="utf-8") as f:
+            report = json.load(f)
+        assert report["files_processed"] == len(files)
+        assert "discovery" in report["stages"]
+
+
+@patch("chat_indexer.Config.LLM_API_KEY", "test-key")
+@patch("chat_indexer.process_file")
+@patch("chat_indexer.setup_logger")
+def test_main_sharded_run_and_merge(mock_setup_logger, mock_process, sample_files, tmp_path):
+    """Test running two shards into separate directories and merging them."""
+    tmpdir, files = sample_files
+    mock_process.side_effect = lambda file, client, max_keywords: {
+        "filename": os.path.basename(file),
+        "path": file,
+        "timestamp": "2023-01-01T00:00:00",
+        "topics": ["topic1"],
+        "summary": "Test summary",
+        "message_count": 2,
+    }
+
+    def run(*args):
+        # Each run is a separate process in practice; main renames the output files of a shard
+        with patch.multiple(
+            chat_indexer.Config,
+            SHARD="",
+            INDEX_FILENAME="chat_index.json",
+            SUMMARY_FILENAME="chat_summaries.md",
+            RUN_REPORT_FILENAME="run_report.json",
+        ), patch("sys.argv", ["chat-indexer.py", "--input-dir", tmpdir, "--llm-provider", "test-provider", *args]):
+            chat_indexer.main()
+            return chat_indexer.Config.INDEX_FILENAME
+
+    first_shard = run("--shard", "0/2", "--output-dir", str(tmp_path / "shard0"))
+    run("--shard", "1/2", "--output-dir", str(tmp_path / "shard1"))
+    run("--merge", str(tmp_path / "shard0"), str(tmp_path / "shard1"), "--output-dir", str(tmp_path / "merged"))
+
+    with open(tmp_path / "merged" / "chat_index.json", encoding="utf-8") as f:
+        merged = json.load(f)
+
+    # Assertions
+    assert first_shard == "chat_index.shard-0-of-2.json"
+    assert os.path.exists(tmp_path / "shard0" / "manifest.shard-0-of-2.json")
+    assert os.path.exists(tmp_path / "shard1" / "run_report.shard-1-of-2.json")
+    assert mock_process.call_count == len(files)
+    assert sorted(entry["path"] for entry in merged["files"]) == sorted(files)
+    assert os.path.exists(tmp_path / "merged" / "chat_summaries.md")
+
+
+def test_stream_and_index_memory_ceiling(tmp_path, caplog):
+    """Test that a stream run writes every entry while peak memory stays under a fixed ceiling."""
+    import logging
+    import tracemalloc
+    from src import metrics
+    from src.metrics import RunMetrics
+
+    class StubClient:
+        # A MagicMock would record every call and grow with the corpus
+        def extract_topics(self, messages, max_keywords):
+            return ["topic"]
+
+        def summarize(self, messages):
+            return "A short summary of the chat."
+
+    # Large enough that holding every entry (as the regular run does) would exceed the ceiling
+    file_count = 3000
+    corpus = tmp_path / "corpus"
+    for i in range(file_count):
+        folder = corpus / f"folder{i % 10}"
+        folder.mkdir(parents=True, exist_ok=True)
+        (folder / f"chat{i}.txt").write_text(f"User: Question {i}\nAssistant: Answer {i}\n", encoding="utf-8")
+    # The per-file log lines would otherwise be kept by the log capture
+    caplog.set_level(logging.WARNING, logger="LLMChatIndexer")
+
+    with patch.multiple(
+        chat_indexer.Config,
+        OUTPUT_DIR=str(tmp_path / "output"), INDEX_FILENAME="chat_index.json", SUMMARY_FILENAME="chat_summaries.md",
+        STREAM_ENABLED=True, STREAM_QUEUE_SIZE=16, STREAM_WORKERS=4, BATCH_TOKEN_BUDGET=0, DEDUP_ENABLED=False,
+    ):
+        metrics.activate(RunMetrics(keep_files=False))
+        tracemalloc.start()
+        try:
+            entry_count = chat_indexer.stream_and_index(str(corpus), ["txt"], StubClient(), MagicMock())
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            metrics.activate(None)
+
+    with open(tmp_path / "output" / "chat_index.json", encoding="utf-8") as f:
+        index = json.load(f)
+
+    # Assertions
+    assert entry_count == file_count
+    assert len({entry["path"] for entry in index["files"]}) == file_count
+    assert peak < 1.5 * 1024 * 1024
+
+
+def test_stream_workers_use_one_pooled_client_per_loop(tmp_path):
+    """Test that segmented files on concurrent stream workers each send through their own loop's pool."""
+    import asyncio
+    import litellm
+    import threading
+    from src.http_pool import HTTPPool
+    from src.llm_client import LLMClient
+
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    for i in range(6):
+        (corpus / f"chat{i}.txt").write_text(
+            "".join(f"User: Question {i}.{j} about the project\nAssistant: Answer {i}.{j}\n" for j in range(8)),
+            encoding="utf-8",
+        )
+    calls = []
+    pooled = set()
+    lock = threading.Lock()
+
+    async def fake_acompletion(model, messages, client=None, **kwargs):
+        with lock:
+            calls.append((asyncio.get_running_loop(), client, litellm.aclient_session))
+            pooled.add(client.client)
+        await asyncio.sleep(0.01)
+        response = MagicMock()
+        response.choices[0].message.content = "topic1, topic2"
+        return response
+
+    pool = HTTPPool()
+    llm_client = LLMClient("gemini/stand-in", rate_limit_delay=0, http_pool=pool)
+    installed = litellm.aclient_session
+    completion_response = MagicMock()
+    completion_response.choices[0].message.content = "A summary of the sessions."
+
+    with patch.multiple(
+        chat_indexer.Config,
+        OUTPUT_DIR=str(tmp_path / "output"), INDEX_FILENAME="chat_index.json", SUMMARY_FILENAME="chat_summaries.md",
+        STREAM_ENABLED=True, STREAM_QUEUE_SIZE=4, STREAM_WORKERS=3, BATCH_TOKEN_BUDGET=0, DEDUP_ENABLED=False,
+        SESSION_MAX_CHARS=200,
+    ), patch("src.llm_client.acompletion", side_effect=fake_acompletion), patch(
+        "src.llm_client.completion", return_value=completion_response
+    ):
+        try:
+            entry_count = chat_indexer.stream_and_index(str(corpus), ["txt"], llm_client, MagicMock())
+        finally:
+            llm_client.close()
+
+    with open(tmp_path / "output" / "chat_index.json", encoding="utf-8") as f:
+        index = json.load(f)
+    loops = {loop for loop, _, _ in calls}
+    clients_by_loop = {loop: {id(client) for l, client, _ in calls if l is loop} for loop in loops}
+
+    # Assertions
+    assert entry_count == len(index["files"])
+    assert sum(1 for entry in index["files"] if entry.get("session_count", 0) > 1) == 6
+    # One event loop per segmented file
+    assert len(loops) == 6
+    assert all(len(clients) == 1 for clients in clients_by_loop.values())
+    assert len({next(iter(clients)) for clients in clients_by_loop.values()}) == 6
+    # The shared litellm session is installed once and never swapped while calls run
+    assert all(session is installed for _, _, session in calls)
+    # Each loop's pooled client was closed on that loop before it finished
+    assert len(pooled) == 6
+    assert all(client.is_closed for client in pooled)
+
+
+@patch("chat_indexer.process_file")
+def test_watch_indexes_fresh_files_ahead_of_backlog(mock_process, mock_llm_client, tmp_path):
+    """Test that a file added while the startup backlog is processed does not wait for all of it."""
+    import threading
+
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    for i in range(8):
+        (corpus / f"backlog{i}.txt").write_text("User: Hi\nAssistant: Hello", encoding="utf-8")
+    fresh = corpus / "fresh.txt"
+    order = []
+
+    def process(file_path, client, max_keywords):
+        order.append(os.path.basename(file_path))
+        if len(order) == 1:
+            fresh.write_text("User: Urgent\nAssistant: On it", encoding="utf-8")
+        if "fresh.txt" in order:
+            stop_event.set()
+        return {"filename": os.path.basename(file_path), "path": file_path, "summary": "Summary"}
+
+    mock_process.side_effect = process
+    stop_event = threading.Event()
+
+    with patch.multiple(
+        chat_indexer.Config,
+        OUTPUT_DIR=str(tmp_path / "output"), INDEX_FILENAME="chat_index.json", WATCH_INTERVAL=0, WATCH_DEBOUNCE=0,
+        WATCH_BACKLOG_CHUNK=1, SCHEDULE="discovery", PRIORITY_PATHS=[], PROGRESS="off",
+        BATCH_TOKEN_BUDGET=0, DEDUP_ENABLED=False,
+    ):
+        chat_indexer.watch_and_index(str(corpus), ["txt"], mock_llm_client, MagicMock(), stop_event)
+
+    # Assertions
+    assert "fresh.txt" in order
+    # Seen on the next poll and reported once settled on the one after
+    assert order.index("fresh.txt") <= 3
+    assert len(order) < 9
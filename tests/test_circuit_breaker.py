@@ -0,0 +1,76 @@
+"""
+Tests for the circuit_breaker module.
+"""
+
+import time
+import pytest
+from src.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+
+
+def test_opens_on_failure_rate():
+    """Test that the circuit opens once the failure rate crosses the threshold."""
+    breaker = CircuitBreaker(failure_rate_threshold=0.5, window=10, min_calls=4, reset_timeout=60)
+
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+    breaker.record_failure()
+
+    # Assertions
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+    assert breaker.snapshot()["rejected_calls"] == 1
+
+
+def test_half_open_probe_closes_on_success():
+    """Test that a successful probe closes the circuit."""
+    breaker = CircuitBreaker(min_calls=1, reset_timeout=0.01)
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    time.sleep(0.02)
+
+    # Only one probe is let through while half-open
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow_request()
+
+
+def test_half_open_probe_reopens_on_failure():
+    """Test that a failed probe opens the circuit again."""
+    breaker = CircuitBreaker(min_calls=1, reset_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+
+    assert breaker.allow_request()
+    breaker.record_failure()
+
+    # Assertions
+    assert breaker.state == OPEN
+    assert breaker.times_opened == 2
+    assert breaker.time_until_probe() > 0
+
+
+def test_released_probe_lets_next_call_probe():
+    """Test that a probe ending without an outcome frees its slot instead of keeping the circuit half-open."""
+    breaker = CircuitBreaker(min_calls=1, reset_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.release_probe()
+
+    # Assertions
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+    # Outside half-open there is no probe to release
+    breaker.record_success()
+    breaker.release_probe()
+    assert breaker.probes_in_flight == 0
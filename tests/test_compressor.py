@@ -0,0 +1,82 @@
+"""
+Tests for the compressor module.
+"""
+
+import pytest
+from src.compressor import compress_messages, rank_sentences
+
+
+def test_drops_greetings_and_repeats():
+    """Test that greetings and repeated lines are removed."""
+    messages = [
+        "User: Hi!",
+        "Assistant: Hello",
+        "User: How do I rotate the API key for the staging cluster?",
+        "Assistant: Run the rotate command from the admin console.",
+        "User: thanks!",
+        "Assistant: Run the rotate command from the admin console.",
+    ]
+
+    compressed = compress_messages(messages, token_budget=1000)
+
+    # Assertions
+    assert compressed == [
+        "User: How do I rotate the API key for the staging cluster?",
+        "Assistant: Run the rotate command from the admin console.",
+    ]
+
+
+def test_collapses_pasted_log_block():
+    """Test that long pasted log blocks keep only their first and last lines."""
+    log_lines = [f"2024-01-05 10:00:{i:02d} ERROR worker-{i} connection refused" for i in range(40)]
+    messages = ["User: The deploy failed with this log:"] + log_lines + ["User: What does it mean?"]
+
+    compressed = compress_messages(messages, token_budget=1000)
+
+    # Assertions
+    assert len(compressed) == 7
+    assert compressed[1] == log_lines[0]
+    assert "36 lines of pasted code/log omitted" in compressed[3]
+    assert compressed[-2] == log_lines[-1]
+
+
+def test_collapses_fenced_code_inside_message():
+    """Test that a fenced code block inside one message is collapsed."""
+    code = "\n".join(["```python"] + [f"value_{i} = compute({i})" for i in range(30)] + ["```"])
+    messages = [f"Here is my script:\n{code}\nWhy is it slow?"]
+
+    compressed = compress_messages(messages, token_budget=1000)
+
+    # Assertions
+    assert len(compressed) == 1
+    assert "lines of pasted code/log omitted" in compressed[0]
+    assert compressed[0].endswith("Why is it slow?")
+
+
+def test_keeps_informative_sentences_within_budget():
+    """Test that ranking keeps content within the token budget."""
+    messages = [
+        f"Message {i} talks about database replication lag and failover timing in region {i % 3}."
+        for i in range(200)
+    ]
+
+    compressed = compress_messages(messages, token_budget=200)
+
+    # Assertions
+    assert 0 < sum(len(m) + 1 for m in compressed) <= 800
+    assert all(m in messages for m in compressed)
+
+
+def test_rank_sentences_prefers_central_sentences():
+    """Test that sentences sharing vocabulary with the rest rank higher."""
+    sentences = [
+        "The cache eviction policy causes latency spikes.",
+        "Latency spikes appear when the cache evicts hot keys.",
+        "Switching the eviction policy removed the latency spikes.",
+        "My cat likes sunny windows.",
+    ]
+
+    scores = rank_sentences(sentences)
+
+    # Assertions
+    assert scores.argmin() == 3
@@ -0,0 +1,90 @@
+"""
+Tests for the concurrency module.
+"""
+
+import asyncio
+import pytest
+from src.concurrency import AdaptiveLimiter
+
+
+class Overloaded(Exception):
+    pass
+
+
+def test_additive_increase():
+    """Test that the limit grows by one per window of healthy responses."""
+    limiter = AdaptiveLimiter(initial=2, max_limit=3)
+
+    for _ in range(2):
+        limiter.in_flight += 1
+        limiter.release(0, latency=1.0)
+    assert limiter.limit == 3
+
+    for _ in range(10):
+        limiter.in_flight += 1
+        limiter.release(0, latency=1.0)
+
+    # Assertions
+    assert limiter.limit == 3
+    assert limiter.increases == 1
+
+
+def test_multiplicative_decrease_once_per_epoch():
+    """Test that concurrent overload signals shrink the limit only once."""
+    limiter = AdaptiveLimiter(initial=8, min_limit=1)
+    limiter.in_flight = 3
+
+    limiter.release(0, overloaded=True)
+    limiter.release(0, overloaded=True)
+    assert limiter.limit == 4
+
+    limiter.release(1, overloaded=True)
+
+    # Assertions
+    assert limiter.limit == 2
+    assert limiter.decreases == 2
+
+
+def test_latency_spike_shrinks_limit():
+    """Test that a response much slower than the baseline counts as overload."""
+    limiter = AdaptiveLimiter(initial=4, latency_spike_factor=2.0)
+    limiter.in_flight = 2
+    limiter.release(0, latency=1.0)
+    limiter.release(0, latency=5.0)
+
+    # Assertions
+    assert limiter.limit == 2
+
+
+def test_slot_limits_concurrency():
+    """Test that no more requests than the limit run at once."""
+    limiter = AdaptiveLimiter(initial=2, max_limit=2, overload_errors=(Overloaded,))
+
+    async def request():
+        async with limiter.slot():
+            await asyncio.sleep(0.01)
+
+    async def run():
+        await asyncio.gather(*(request() for _ in range(6)))
+
+    asyncio.run(run())
+
+    # Assertions
+    assert limiter.peak_in_flight == 2
+    assert limiter.in_flight == 0
+
+
+def test_slot_records_overload():
+    """Test that overload errors raised inside a slot shrink the limit."""
+    limiter = AdaptiveLimiter(initial=4, overload_errors=(Overloaded,))
+
+    async def run():
+        with pytest.raises(Overloaded):
+            async with limiter.slot():
+                raise Overloaded()
+
+    asyncio.run(run())
+
+    # Assertions
+    assert limiter.limit == 2
+    assert limiter.in_flight == 0
@@ -0,0 +1,109 @@
+"""
+Tests for the dedup module.
+"""
+
+import pytest
+from src.dedup import Deduplicator, SimHasher, normalize_messages, content_hash, simhash, fingerprint
+
+
+@pytest.fixture
+def long_chat():
+    """A chat long enough to get a SimHash signature."""
+    return [
+        "User: I keep getting a segmentation fault when I call the parser on large inputs.",
+        "Assistant: That usually means a buffer is read past its end. Which version are you using?",
+        "User: Version 2.3 on Linux, compiled with the default optimisation flags.",
+        "Assistant: Try rebuilding with address sanitizer enabled and share the first report.",
+        "User: The report points at the tokenizer loop that handles escaped quotes.",
+        "Assistant: Good catch, the escape branch skips the bounds check. A patch is on the way.",
+    ]
+
+
+def test_normalize_messages():
+    """Test that formatting differences are normalized away."""
+    assert normalize_messages(["[2024-01-05 10:00]  Hello   World", "", "  "]) == ["hello world"]
+
+
+def test_exact_duplicate(long_chat):
+    """Test detecting an exact duplicate after normalization."""
+    dedup = Deduplicator()
+
+    assert dedup.check("a.txt", long_chat) == (None, None)
+    assert dedup.check("b.json", [m.upper() for m in long_chat]) == ("a.txt", "exact")
+
+
+def test_near_duplicate(long_chat):
+    """Test detecting a near duplicate with a small edit."""
+    dedup = Deduplicator(max_distance=8)
+    edited = long_chat[:-1] + [long_chat[-1].replace("A patch is on the way.", "A patch is coming.")]
+
+    assert dedup.check("a.txt", long_chat) == (None, None)
+    assert dedup.check("b.txt", edited) == ("a.txt", "near")
+
+
+def test_near_duplicate_beyond_default_bands():
+    """Test that distances above the default band count still find candidates."""
+    dedup = Deduplicator(max_distance=6)
+    signature = 0x0123456789ABCDEF
+    # One flipped bit in each 16-bit quarter plus two more: no quarter matches
+    edited = signature ^ (1 | 1 << 16 | 1 << 32 | 1 << 48 | 1 << 8 | 1 << 40)
+
+    assert dedup.check_fingerprint("a.txt", "digest-a", signature) == (None, None)
+    assert dedup.check_fingerprint("b.txt", "digest-b", edited) == ("a.txt", "near")
+
+
+def test_distinct_chats_not_matched(long_chat):
+    """Test that unrelated chats are not reported as duplicates."""
+    dedup = Deduplicator()
+    other = [
+        "User: Can you recommend a good recipe for sourdough bread with a crispy crust?",
+        "Assistant: Use a hot dutch oven, bake covered for twenty minutes and uncovered for twenty more.",
+        "User: How long should the dough proof in the fridge before baking it?",
+        "Assistant: Twelve to sixteen hours gives a nice sour flavour and an open crumb.",
+    ]
+
+    assert dedup.check("a.txt", long_chat) == (None, None)
+    assert dedup.check("b.txt", other) == (None, None)
+
+
+def test_short_chats_have_no_simhash():
+    """Test that very short chats are only matched exactly."""
+    assert simhash(normalize_messages(["hi", "hello"])) is None
+    assert content_hash(["hi"]) != content_hash(["hello"])
+
+
+def test_fingerprint_streams_messages(long_chat):
+    """Test that a chat is fingerprinted in one pass over its messages, matching the list-based hashes."""
+    read = []
+
+    def lazy_messages():
+        # Like a lazily read transcript: each message is produced once, on demand
+        for message in long_chat:
+            read.append(message)
+            yield message
+
+    normalized = normalize_messages(long_chat)
+
+    # Assertions
+    assert fingerprint(lazy_messages()) == (content_hash(normalized), simhash(normalized))
+    assert read == long_chat
+    assert fingerprint(iter(["", "  "])) is None
+
+
+def test_simhash_memory_does_not_grow_with_chat():
+    """Test that fingerprinting a long transcript of distinct words keeps constant memory."""
+    import tracemalloc
+
+    def peak_for(message_count):
+        hasher = SimHasher()
+        tracemalloc.start()
+        try:
+            for i in range(message_count):
+                hasher.update(f"message {i} mentions word{i}a word{i}b and word{i}c")
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return peak
+
+    # Assertions
+    assert peak_for(10000) < 2 * peak_for(1000)
@@ -0,0 +1,86 @@
+"""
+Tests for the metrics exporter module.
+"""
+
+import os
+import urllib.error
+import urllib.request
+import pytest
+from unittest.mock import MagicMock
+from src import metrics
+from src.metrics import RunMetrics
+from src.exporter import MetricsExporter, render
+
+
+@pytest.fixture
+def recorder():
+    """Activate a fresh recorder with some recorded activity."""
+    run_metrics = RunMetrics()
+    metrics.activate(run_metrics)
+    metrics.gauge("files_discovered", 10)
+    metrics.count("files_completed", 4)
+    metrics.count("dedup_hits")
+    metrics.count("retry:RateLimitError", 2)
+    metrics.gauge("batch_queue_depth", 3)
+    metrics.adjust("llm_in_flight", 1)
+    metrics.observe("llm_call", 0.3)
+    metrics.observe("llm_call", 2.0)
+    yield run_metrics
+    metrics.activate(None)
+
+
+@pytest.fixture
+def llm_client():
+    """Client double with cache, fallback and token counters."""
+    client = MagicMock()
+    client.coalesced_requests = 1
+    client.cassette = None
+    client.degraded_calls = 2
+    client.timed_out_requests = 0
+    client.hedged_requests = 0
+    client.budget.snapshot.return_value = {"total": {"input_tokens": 1200, "output_tokens": 300, "cost": 0.0125}}
+    return client
+
+
+def test_render(recorder, llm_client):
+    """Test the exposition text for progress, caches, retries, tokens and latency."""
+    lines = render(recorder, llm_client).splitlines()
+
+    # Assertions
+    assert "# TYPE chat_indexer_files_processed_total counter" in lines
+    assert "chat_indexer_files_processed_total 4" in lines
+    assert "chat_indexer_files_pending 6" in lines
+    assert "chat_indexer_batch_queue_depth 3" in lines
+    assert "chat_indexer_llm_in_flight 1.0" in lines
+    assert 'chat_indexer_retries_total{error="RateLimitError"} 2' in lines
+    assert 'chat_indexer_cache_hits_total{cache="dedup"} 1' in lines
+    assert "chat_indexer_cache_hit_ratio 0.5" in lines
+    assert "chat_indexer_fallbacks_total 2" in lines
+    assert 'chat_indexer_tokens_total{direction="input"} 1200' in lines
+    assert "# TYPE chat_indexer_stage_seconds histogram" in lines
+    assert 'chat_indexer_stage_seconds_bucket{stage="llm_call",le="0.5"} 1' in lines
+    assert 'chat_indexer_stage_seconds_bucket{stage="llm_call",le="+Inf"} 2' in lines
+    assert 'chat_indexer_stage_seconds_count{stage="llm_call"} 2' in lines
+
+
+def test_http_endpoint_and_file(recorder, llm_client, tmp_path):
+    """Test scraping the local endpoint and the metrics file left after stopping."""
+    path = str(tmp_path / "metrics" / "chat_indexer.prom")
+    exporter = MetricsExporter(recorder, llm_client, port=0, path=path, interval=60)
+    exporter.start()
+    try:
+        with urllib.request.urlopen(exporter.url, timeout=5) as response:
+            body = response.read().decode("utf-8")
+            content_type = response.headers["Content-Type"]
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(exporter.url.replace("/metrics", "/other"), timeout=5)
+        metrics.count("files_completed")
+    finally:
+        exporter.stop()
+
+    # Assertions
+    assert content_type.startswith("text/plain")
+    assert "chat_indexer_files_processed_total 4" in body
+    assert os.path.exists(path)
+    with open(path, encoding="utf-8") as f:
+        assert "chat_indexer_files_processed_total 5" in f.read()
@@ -5,7 +5,7 @@ Tests for the file_parser module.
 import os
 import tempfile
 import pytest
-from src.file_parser import parse_file
+from src.file_parser import parse_file, parse_path, parse_large_txt, find_chunk_boundaries
 
 
 def test_parse_txt_file(sample_chat_content):
@@ -153,3 +153,92 @@ def test_parse_empty_file():
     finally:
         # Clean up
         os.unlink(filename)
+
+
+def test_parse_large_txt_matches_splitlines():
+    """Test that the memory-mapped parser yields the same lines as str.splitlines."""
+    content = "".join(f"[{i:04d}] User{i % 3}: message number {i}\r\n" for i in range(500)) + "\nlast line"
+
+    with tempfile.NamedTemporaryFile(suffix=".txt", delete=False) as f:
+        f.write(content.encode("utf-8"))
+        filename = f.name
+
+    try:
+        # Test the parser with several worker processes
+        with parse_large_txt(filename, workers=4) as messages:
+            # Assertions
+            assert len(messages) == len(content.splitlines())
+            assert list(messages) == content.splitlines()
+            assert messages[-1] == "last line"
+            assert messages.offsets(0) == (0, len("[0000] User0: message number 0"))
+            # Slices are lazy views over the same mapping
+            session = messages[10:20]
+            assert list(session) == content.splitlines()[10:20]
+            session.close()
+            assert messages[10] == content.splitlines()[10]
+    finally:
+        # Clean up
+        os.unlink(filename)
+
+
+def test_find_chunk_boundaries_line_aligned():
+    """Test that chunk boundaries fall at the start of a line."""
+    content = b"".join(b"line %d\n" % i for i in range(1000))
+
+    with tempfile.NamedTemporaryFile(suffix=".txt", delete=False) as f:
+        f.write(content)
+        filename = f.name
+
+    try:
+        chunks = find_chunk_boundaries(filename, 8)
+
+        # Assertions
+        assert chunks[0][0] == 0
+        assert chunks[-1][1] == len(content)
+        for (_, end), (start, _) in zip(chunks, chunks[1:]):
+            assert end == start
+            assert content[start - 1 : start] == b"\n"
+    finally:
+        # Clean up
+        os.unlink(filename)
+
+
+def test_parse_path_uses_large_file_path():
+    """Test that parse_path memory-maps text files above the threshold."""
+    content = "User: Hello\nAssistant: Hi there\n"
+
+    with tempfile.NamedTemporaryFile(suffix=".txt", delete=False) as f:
+        f.write(content.encode("utf-8"))
+        filename = f.name
+
+    try:
+        small = parse_path(filename, large_file_threshold=1024)
+        large = parse_path(filename, large_file_threshold=1, workers=1)
+
+        # Assertions
+        assert isinstance(small, list)
+        assert hasattr(large, "offsets")
+        assert list(large) == small
+        large.close()
+    finally:
+        # Clean up
+        os.unlink(filename)
+
+
+def test_parse_json_keeps_timestamps():
+    """Test that JSON message timestamps are kept alongside the messages."""
+    content = '{"messages": [{"content": "Hi", "timestamp": "2024-01-05T10:00:00"}, {"content": "Hello", "timestamp": 1704450060}]}'
+
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        f.write(content.encode("utf-8"))
+        filename = f.name
+
+    try:
+        messages = parse_file(filename, content)
+
+        # Assertions
+        assert messages == ["Hi", "Hello"]
+        assert messages.times == ["2024-01-05T10:00:00", 1704450060]
+    finally:
+        # Clean up
+        os.unlink(filename)
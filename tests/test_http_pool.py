@@ -0,0 +1,175 @@
+"""
+Tests for the http_pool module.
+"""
+
+import json
+import asyncio
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.http_pool import HTTPPool
+from src.llm_client import LLMClient
+
+
+class CompletionHandler(BaseHTTPRequestHandler):
+    """Minimal OpenAI-compatible and Gemini completion endpoint with keep-alive."""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        # One handler instance per TCP connection
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.server.lock:
+            self.server.requests += 1
+        if ":generateContent" in self.path:
+            body = json.dumps({
+                "candidates": [{"content": {"role": "model", "parts": [{"text": "A test summary."}]}, "finishReason": "STOP", "index": 0}],
+                "usageMetadata": {"promptTokenCount": 10, "candidatesTokenCount": 4, "totalTokenCount": 14},
+            }).encode("utf-8")
+        else:
+            body = json.dumps({
+                "id": "chatcmpl-test",
+                "object": "chat.completion",
+                "created": 0,
+                "model": "stand-in",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "A test summary."}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 10, "completion_tokens": 4, "total_tokens": 14},
+            }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stand_in_server(monkeypatch):
+    """Run a local stand-in provider endpoint."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CompletionHandler)
+    server.connections = 0
+    server.requests = 0
+    server.lock = threading.Lock()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}/v1")
+    monkeypatch.setenv("OPENAI_API_BASE", f"http://127.0.0.1:{server.server_address[1]}/v1")
+    monkeypatch.setenv("GEMINI_API_KEY", "test")
+    monkeypatch.setenv("GEMINI_API_BASE", f"http://127.0.0.1:{server.server_address[1]}")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_connections_stay_flat_as_requests_grow(stand_in_server):
+    """Test that pooled sync requests reuse one connection."""
+    pool = HTTPPool()
+    client = LLMClient("openai/stand-in", rate_limit_delay=0, http_pool=pool)
+    try:
+        for i in range(3):
+            assert client.summarize([f"Chat {i}"]) == "A test summary."
+        connections_after_3 = stand_in_server.connections
+        for i in range(12):
+            client.summarize([f"Chat {i + 3}"])
+    finally:
+        client.close()
+
+    stats = pool.snapshot()
+
+    # Assertions
+    assert stand_in_server.requests == 15
+    assert stand_in_server.connections == connections_after_3 == 1
+    assert stats["requests"] == 15
+    assert stats["connections_opened"] == 1
+    assert stats["reused_connection_ratio"] > 0.9
+
+
+def test_handler_providers_use_pool(stand_in_server):
+    """Test that sync and async calls to a provider served by litellm's own handler go through the pool."""
+    pool = HTTPPool()
+    client = LLMClient("gemini/stand-in", rate_limit_delay=0, http_pool=pool)
+
+    async def run(count):
+        return await asyncio.gather(*(client.summarize_async([f"Async chat {i}"]) for i in range(count)))
+
+    try:
+        summaries = [client.summarize([f"Chat {i}"]) for i in range(5)]
+        connections_after_sync = stand_in_server.connections
+        summaries += asyncio.run(run(3))
+    finally:
+        client.close()
+
+    stats = pool.snapshot()
+
+    # Assertions
+    assert summaries == ["A test summary."] * 8
+    assert stand_in_server.requests == 8
+    assert stats["requests"] == 8
+    assert stats["connections_opened"] == stand_in_server.connections
+    # The sync calls share one connection
+    assert connections_after_sync == 1
+
+
+def test_async_requests_share_pool(stand_in_server):
+    """Test that concurrent async requests reuse pooled connections instead of opening one each."""
+    pool = HTTPPool(max_connections=2)
+    client = LLMClient("openai/stand-in", rate_limit_delay=0, http_pool=pool)
+
+    async def run(count):
+        return await asyncio.gather(*(client.summarize_async([f"Chat {count} {i}"]) for i in range(count)))
+
+    try:
+        summaries = asyncio.run(run(10))
+        connections_after_10 = stand_in_server.connections
+        asyncio.run(run(30))
+    finally:
+        client.close()
+
+    # Assertions
+    assert summaries == ["A test summary."] * 10
+    assert stand_in_server.requests == 40
+    assert connections_after_10 <= 2
+    # One pool per event loop, each capped at max_connections
+    assert stand_in_server.connections <= 4
+    assert pool.snapshot()["connections_opened"] == stand_in_server.connections
+
+
+def test_async_clients_are_closed_on_their_loop(stand_in_server):
+    """Test that each event loop's pooled client is closed on that loop instead of being dropped."""
+    pool = HTTPPool()
+    client = LLMClient("openai/stand-in", rate_limit_delay=0, http_pool=pool)
+
+    async def run():
+        await client.summarize_async(["Chat"])
+        pooled = pool.async_client()
+        await client.aclose()
+        return pooled
+
+    async def run_idle():
+        await client.summarize_async(["Chat"])
+        return pool.async_client()
+
+    loop = asyncio.new_event_loop()
+    try:
+        closed = [asyncio.run(run()) for _ in range(2)]
+        # A loop that is still open but idle is closed by close()
+        idle = loop.run_until_complete(run_idle())
+        assert not idle.is_closed
+    finally:
+        client.close()
+        loop.close()
+
+    # Assertions
+    assert stand_in_server.requests == 3
+    assert closed[0] is not closed[1]
+    assert all(pooled.is_closed for pooled in closed)
+    assert idle.is_closed
+    assert pool.snapshot()["open_connections"] == 0
@@ -7,7 +7,7 @@ import json
 import tempfile
 import pytest
 from datetime import datetime
-from src.index_builder import build_index, get_timestamp
+from src.index_builder import build_index, get_timestamp, StreamingIndexWriter
 
 
 def test_build_index(temp_directory):
@@ -77,6 +77,52 @@ def test_build_index_invalid_data():
     assert result is False
 
 
+
+def test_streaming_index_writer_matches_build_index(temp_directory):
+    """Test that entries written one by one give the same files as build_index."""
+    entries = [
+        {"filename": "a.txt", "path": "/chats/a.txt", "timestamp": "2023-06-15T12:00:00", "topics": ["x"],
+         "summary": "First.", "message_count": 3, "participants": ["User", "Assistant"], "key_points": ["one"]},
+        {"filename": "b.json", "path": "/chats/b.json", "timestamp": "", "topics": [], "summary": "Second.",
+         "message_count": 2},
+    ]
+    metadata = {"usage": {"total": {"requests": 4}}}
+    batch_dir = os.path.join(temp_directory, "batch")
+    stream_dir = os.path.join(temp_directory, "stream")
+
+    build_index({"files": [dict(entry) for entry in entries], "metadata": metadata}, batch_dir, "index.json", "summary.md")
+    writer = StreamingIndexWriter(stream_dir, "index.json", "summary.md")
+    for entry in entries:
+        writer.add(dict(entry))
+    writer.close(metadata)
+
+    def read(directory, filename):
+        with open(os.path.join(directory, filename), encoding="utf-8") as f:
+            # The generation time may differ by a second
+            return [line for line in f.read().splitlines() if not line.startswith("*Generated on")]
+
+    # Assertions
+    assert writer.count == 2
+    assert read(stream_dir, "index.json") == read(batch_dir, "index.json")
+    assert read(stream_dir, "summary.md") == read(batch_dir, "summary.md")
+    assert sorted(os.listdir(stream_dir)) == ["index.json", "summary.md"]
+
+
+def test_streaming_index_writer_abort_keeps_previous_index(temp_directory):
+    """Test that an aborted stream leaves the previous index untouched."""
+    build_index({"files": [{"filename": "old.txt", "summary": "Old."}]}, temp_directory, "index.json", "summary.md")
+    writer = StreamingIndexWriter(temp_directory, "index.json", "summary.md")
+    writer.add({"filename": "new.txt", "summary": "New."})
+    writer.abort()
+
+    with open(os.path.join(temp_directory, "index.json"), encoding="utf-8") as f:
+        files = json.load(f)["files"]
+
+    # Assertions
+    assert [entry["filename"] for entry in files] == ["old.txt"]
+    assert sorted(os.listdir(temp_directory)) == ["index.json", "summary.md"]
+
+
 def test_get_timestamp():
     """Test getting timestamp from file."""
     # Create a temporary file
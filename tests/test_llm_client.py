@@ -103,3 +103,408 @@ def test_completion_error_handling(mock_completion):
 
     # Assertions
     assert topics == []
+
+
+@patch("src.llm_client.completion")
+def test_analyze_documents_batches_small_chats(mock_completion, mock_completion_response):
+    """Test that small chats share one request and results are demultiplexed."""
+    mock_completion_response.choices[0].message.content = (
+        '```json\n[{"id": 2, "topics": ["b1", "b2"], "summary": "Second chat."},'
+        ' {"id": 1, "topics": ["a1"], "summary": "First chat."}]\n```'
+    )
+    mock_completion.return_value = mock_completion_response
+
+    client = LLMClient("test-provider", rate_limit_delay=0, batch_token_budget=1000)
+    results = client.analyze_documents([["Hello"], ["Hi", "there"]], 2)
+
+    # Assertions
+    assert mock_completion.call_count == 1
+    assert results == [(["a1"], "First chat."), (["b1", "b2"], "Second chat.")]
+
+
+@patch("src.llm_client.completion")
+def test_analyze_documents_falls_back_on_malformed_response(mock_completion, mock_completion_response):
+    """Test that documents missing from the batch response get single requests."""
+    batch_response = MagicMock()
+    batch_response.choices = [MagicMock()]
+    batch_response.choices[0].message.content = '[{"id": 1, "topics": ["a1"], "summary": "First chat."}]'
+    mock_completion_response.choices[0].message.content = "fallback"
+    mock_completion.side_effect = [batch_response, mock_completion_response, mock_completion_response]
+
+    client = LLMClient("test-provider", rate_limit_delay=0, batch_token_budget=1000)
+    results = client.analyze_documents([["Hello"], ["Hi there"]], 2)
+
+    # Assertions
+    assert mock_completion.call_count == 3
+    assert results[0] == (["a1"], "First chat.")
+    assert results[1] == (["fallback"], "fallback")
+
+
+
+def test_analyze_documents_falls_back_when_batch_request_raises(mock_completion_response):
+    """Test that a batch request failing after its retries falls back to single requests."""
+    import litellm
+
+    mock_completion_response.choices[0].message.content = "fallback"
+    client = LLMClient("test-provider", rate_limit_delay=0, batch_token_budget=1000)
+    error = litellm.RateLimitError("slow down", model="test-provider", llm_provider="test")
+
+    with patch.object(client, "_make_llm_request", side_effect=[error, *[mock_completion_response] * 4]) as request:
+        results = client.analyze_documents([["Hello"], ["Hi there"]], 2)
+
+    # Assertions
+    assert request.call_count == 5
+    assert results == [(["fallback"], "fallback")] * 2
+
+
+def test_pack_documents_respects_budget():
+    """Test that documents are packed up to the token budget."""
+    client = LLMClient("test-provider", batch_token_budget=10)
+
+    batches = client._pack_documents(["x" * 20, "x" * 20, "x" * 20, "x" * 100])
+
+    # Assertions
+    assert batches == [[0, 1], [2], [3]]
+
+
+def test_inflight_requests_are_coalesced(mock_completion_response):
+    """Test that identical concurrent async requests share one provider call."""
+    import asyncio
+
+    calls = []
+
+    async def slow_acompletion(model, messages):
+        calls.append(messages)
+        await asyncio.sleep(0.05)
+        return mock_completion_response
+
+    async def run(client):
+        return await asyncio.gather(
+            client.summarize_async(["Hello"]),
+            client.summarize_async(["Hello"]),
+            client.summarize_async(["Something else"]),
+        )
+
+    with patch("src.llm_client.acompletion", side_effect=slow_acompletion):
+        client = LLMClient("test-provider", rate_limit_delay=0)
+        results = asyncio.run(run(client))
+
+    # Assertions
+    assert len(calls) == 2
+    assert client.coalesced_requests == 1
+    assert results[0] == results[1]
+
+
+@patch("src.llm_client.completion")
+def test_failover_to_healthy_provider(mock_completion):
+    """Test that a provider outage fails over to the next provider without backoff."""
+    import litellm
+    from src.router import ProviderRouter
+
+    def fake_completion(model, messages):
+        if model == "down-provider":
+            raise litellm.ServiceUnavailableError("unavailable", llm_provider="test", model=model)
+        return litellm.completion(model="gpt-3.5-turbo", messages=messages, mock_response="topic1, topic2")
+
+    mock_completion.side_effect = fake_completion
+    router = ProviderRouter([("down-provider", 1000), ("up-provider", 1)])
+    client = LLMClient("down-provider", rate_limit_delay=0, router=router)
+
+    topics = client.extract_topics(["Hello"], 2)
+
+    # Assertions
+    assert topics == ["topic1", "topic2"]
+    assert router.stats["down-provider"].failures >= 1
+    assert router.stats["up-provider"].requests == 1
+
+
+def test_hedged_async_request(mock_completion_response):
+    """Test that a request slower than the latency percentile is hedged."""
+    import asyncio
+    from src.router import ProviderRouter
+
+    async def fake_acompletion(model, messages):
+        await asyncio.sleep(1.0 if model == "slow" else 0.01)
+        return mock_completion_response
+
+    router = ProviderRouter([("slow", 1), ("fast", 1)], hedge_percentile=95, hedge_min_samples=1)
+    router.record("slow", 0.05, True)
+    router.record("fast", 0.05, True)
+    router.choose = lambda exclude=(): "fast" if "slow" in exclude else "slow"
+
+    with patch("src.llm_client.acompletion", side_effect=fake_acompletion):
+        client = LLMClient("slow", rate_limit_delay=0, router=router)
+        summary = asyncio.run(asyncio.wait_for(client.summarize_async(["Hello"]), timeout=0.5))
+
+    # Assertions
+    assert summary == "topic1, topic2, topic3"
+    assert client.hedged_requests == 1
+
+
+def test_single_provider_straggler_is_not_reissued(mock_completion_response):
+    """Test that a slow request is not duplicated to the same provider, sync or async."""
+    import asyncio
+    import time
+    from src.router import ProviderRouter
+
+    calls = []
+
+    def slow_completion(model, messages):
+        calls.append(model)
+        time.sleep(0.05)
+        return mock_completion_response
+
+    async def slow_acompletion(model, messages):
+        calls.append(model)
+        await asyncio.sleep(0.05)
+        return mock_completion_response
+
+    router = ProviderRouter([("only", 1)], hedge_percentile=95, hedge_min_samples=1)
+    router.record("only", 0.001, True)
+
+    with patch("src.llm_client.completion", side_effect=slow_completion), patch(
+        "src.llm_client.acompletion", side_effect=slow_acompletion
+    ):
+        client = LLMClient("only", rate_limit_delay=0, router=router)
+        summary = client.summarize(["Hello"])
+        summary_async = asyncio.run(client.summarize_async(["Hello again"]))
+
+    # Assertions
+    assert summary == summary_async == "topic1, topic2, topic3"
+    assert calls == ["only", "only"]
+    assert client.hedged_requests == 0
+
+
+@patch("src.llm_client.completion")
+def test_circuit_breaker_short_circuits_outage(mock_completion):
+    """Test that an open circuit skips the provider and retries during an outage."""
+    import litellm
+    from src.circuit_breaker import CircuitBreaker
+
+    mock_completion.side_effect = litellm.ServiceUnavailableError("down", llm_provider="test", model="test-provider")
+    breaker = CircuitBreaker(min_calls=1, reset_timeout=60)
+    client = LLMClient("test-provider", rate_limit_delay=0, circuit_breaker=breaker)
+
+    summary = client.summarize(["Hello there"])
+    calls_after_first = mock_completion.call_count
+    client.summarize(["Hello again"])
+
+    # Assertions
+    assert calls_after_first == 1  # circuit opened after the first failure, no retries
+    assert mock_completion.call_count == 1
+    assert client.degraded_calls == 2
+    assert "approximately" in summary
+
+
+def test_unfinished_probe_does_not_wedge_circuit(tmp_path, mock_completion_response):
+    """Test that a half-open probe that is cancelled or misses the cassette gives its slot back."""
+    import asyncio
+    from src.cassette import Cassette, CassetteMiss
+    from src.circuit_breaker import CircuitBreaker, CLOSED, HALF_OPEN
+
+    breaker = CircuitBreaker(min_calls=1, reset_timeout=0)
+    breaker.record_failure()
+
+    async def hanging_acompletion(model, messages):
+        await asyncio.sleep(10)
+
+    async def cancel_probe(client):
+        probe = asyncio.ensure_future(client._acall_provider("test-provider", [{"role": "user", "content": "Hi"}]))
+        await asyncio.sleep(0.01)
+        probe.cancel()
+        await asyncio.gather(probe, return_exceptions=True)
+
+    client = LLMClient("test-provider", rate_limit_delay=0, circuit_breaker=breaker)
+    assert breaker.allow_request()
+    with patch("src.llm_client.acompletion", side_effect=hanging_acompletion):
+        asyncio.run(cancel_probe(client))
+    probes_after_cancel = breaker.probes_in_flight
+
+    (tmp_path / "empty.jsonl").write_text("", encoding="utf-8")
+    replay_client = LLMClient(
+        "test-provider", rate_limit_delay=0, circuit_breaker=breaker, cassette=Cassette(str(tmp_path / "empty.jsonl"), mode="replay")
+    )
+    assert breaker.allow_request()
+    with pytest.raises(CassetteMiss):
+        replay_client._call_provider("test-provider", [{"role": "user", "content": "Hi"}])
+
+    # Assertions
+    assert probes_after_cancel == 0
+    assert breaker.state == HALF_OPEN
+    assert breaker.probes_in_flight == 0
+    with patch("src.llm_client.completion", return_value=mock_completion_response):
+        assert client.summarize(["Hello"]) == "topic1, topic2, topic3"
+    assert breaker.state == CLOSED
+
+
+@patch("src.llm_client.completion")
+def test_cascade_escalates_on_invalid_answer(mock_completion):
+    """Test that the cascade escalates to the stronger model when topics are missing."""
+    from src.cascade import CascadePolicy
+
+    def respond(model, messages):
+        response = MagicMock()
+        response.choices[0].message.content = "AI" if model == "small" else "AI, ML, Python"
+        return response
+
+    mock_completion.side_effect = respond
+    cascade = CascadePolicy(["small", "large"])
+    client = LLMClient("test-provider", rate_limit_delay=0, cascade=cascade)
+
+    topics = client.extract_topics(["Let's talk about AI and ML in Python"], 3)
+
+    # Assertions
+    assert topics == ["AI", "ML", "Python"]
+    assert [c.kwargs["model"] for c in mock_completion.call_args_list] == ["small", "large"]
+    assert cascade.snapshot()["small"]["escalated"] == 1
+    assert cascade.snapshot()["large"]["accepted"] == 1
+
+
+@patch("src.llm_client.completion")
+def test_cascade_accepts_cheap_answer(mock_completion):
+    """Test that a valid answer from the cheap model is used without escalation."""
+    from src.cascade import CascadePolicy
+
+    mock_response = MagicMock()
+    mock_response.choices[0].message.content = "A short chat about AI."
+    mock_completion.return_value = mock_response
+    client = LLMClient("test-provider", rate_limit_delay=0, cascade=CascadePolicy(["small", "large"]))
+
+    summary = client.summarize(["Hello", "Let's talk about AI"])
+
+    # Assertions
+    assert summary == "A short chat about AI."
+    mock_completion.assert_called_once()
+    assert mock_completion.call_args.kwargs["model"] == "small"
+
+
+@patch("src.llm_client.completion")
+def test_budget_exhausted_uses_fallback(mock_completion):
+    """Test that calls fall back offline once the run budget is used up."""
+    from src.budget import RunBudget
+
+    mock_response = MagicMock()
+    mock_response.choices[0].message.content = "A chat about AI."
+    mock_response.usage.prompt_tokens = 50
+    mock_response.usage.completion_tokens = 10
+    mock_completion.return_value = mock_response
+    budget = RunBudget(max_input_tokens=50)
+    client = LLMClient("test-provider", rate_limit_delay=0, budget=budget)
+
+    first = client.summarize(["Let's talk about AI"])
+    second = client.summarize(["Let's talk about ML"])
+
+    # Assertions
+    assert first == "A chat about AI."
+    assert "approximately" in second
+    assert mock_completion.call_count == 1
+    assert client.degraded_calls == 1
+    assert budget.snapshot()["by_provider"]["test-provider"]["input_tokens"] == 50
+
+
+@patch("src.llm_client.completion")
+def test_budget_downgrade_switches_model(mock_completion):
+    """Test that the downgrade action sends later calls to the cheaper model."""
+    from src.budget import RunBudget
+
+    mock_response = MagicMock()
+    mock_response.choices[0].message.content = "A chat about AI."
+    mock_response.usage.prompt_tokens = 50
+    mock_response.usage.completion_tokens = 10
+    mock_completion.return_value = mock_response
+    budget = RunBudget(max_input_tokens=50, action="downgrade", downgrade_model="cheap-model")
+    client = LLMClient("test-provider", rate_limit_delay=0, budget=budget)
+
+    client.summarize(["Let's talk about AI"])
+    client.summarize(["Let's talk about ML"])
+
+    # Assertions
+    assert [c.kwargs["model"] for c in mock_completion.call_args_list] == ["test-provider", "cheap-model"]
+
+
+@patch("src.llm_client.acompletion")
+def test_async_requests_use_adaptive_limiter(mock_acompletion):
+    """Test that async requests hold a slot of the adaptive concurrency limiter."""
+    import asyncio
+    from src.concurrency import AdaptiveLimiter
+
+    mock_response = MagicMock()
+    mock_response.choices[0].message.content = "A chat about AI."
+    mock_acompletion.return_value = mock_response
+    limiter = AdaptiveLimiter(initial=1, max_limit=4)
+    client = LLMClient("test-provider", rate_limit_delay=0, concurrency=limiter)
+
+    async def run():
+        return await asyncio.gather(*(client.summarize_async([f"Chat {i} about AI"]) for i in range(3)))
+
+    summaries = asyncio.run(run())
+
+    # Assertions
+    assert summaries == ["A chat about AI."] * 3
+    assert limiter.in_flight == 0
+    assert limiter.limit == 3
+    assert limiter.baseline_latency is not None
+
+
+@patch("src.llm_client.completion")
+def test_request_timeout_passed_and_counted(mock_completion):
+    """Test that requests carry a timeout and timed-out calls fall back."""
+    import litellm
+
+    mock_completion.side_effect = litellm.Timeout("timed out", model="test-provider", llm_provider="test")
+    client = LLMClient("test-provider", max_retries=1, rate_limit_delay=0, request_timeout=30)
+
+    summary = client.summarize(["Hello there"])
+
+    # Assertions
+    assert mock_completion.call_args.kwargs["timeout"] == 30
+    assert client.timed_out_requests == 1
+    assert "approximately" in summary
+
+
+@patch("src.llm_client.completion")
+def test_file_deadline_skips_requests(mock_completion):
+    """Test that no requests are sent once the file deadline has passed."""
+    import time
+    from src.llm_client import file_deadline
+
+    client = LLMClient("test-provider", rate_limit_delay=0)
+    with file_deadline(0.01):
+        time.sleep(0.02)
+        summary = client.summarize(["Hello there"])
+
+    # Assertions
+    assert not mock_completion.called
+    assert client.degraded_calls == 1
+    assert "approximately" in summary
+
+
+@patch("src.llm_client.acompletion")
+def test_async_request_timeout(mock_acompletion):
+    """Test that a hung async request is abandoned at its timeout."""
+    import asyncio
+
+    async def hang(**kwargs):
+        await asyncio.sleep(10)
+
+    mock_acompletion.side_effect = hang
+    client = LLMClient("test-provider", max_retries=0, rate_limit_delay=0, request_timeout=0.05)
+
+    summary = asyncio.run(client.summarize_async(["Hello there"]))
+
+    # Assertions
+    assert client.timed_out_requests == 1
+    assert "approximately" in summary
+
+
+@patch("src.llm_client.completion")
+def test_cancel_stops_new_requests(mock_completion):
+    """Test that a cancelled client no longer calls the provider."""
+    client = LLMClient("test-provider", rate_limit_delay=0)
+    client.cancel()
+
+    topics = client.extract_topics(["Let's talk about machine learning models"], 2)
+
+    # Assertions
+    assert not mock_completion.called
+    assert topics
@@ -3,10 +3,11 @@ Tests for the logger module.
 """
 
 import os
+import json
 import tempfile
 import logging
 import pytest
-from src.logger import setup_logger
+from src.logger import setup_logger, log_context, stop_logging
 
 
 def test_setup_logger():
@@ -55,3 +56,36 @@ def test_setup_logger_creates_directory():
 
         # Assert directory was created
         assert os.path.exists(log_dir)
+
+
+def test_setup_logger_json_queue():
+    """Test queued JSON logging with file correlation IDs."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        log_file = os.path.join(tmpdir, "test.log")
+        logger = setup_logger("DEBUG", log_file, json_format=True, use_queue=True)
+        try:
+            # Records are queued, not written by the calling thread
+            assert len(logger.handlers) == 1
+
+            with log_context("chats/a.txt") as file_id:
+                logger.info("Finished %s in %.2fs", "chats/a.txt", 1.5, extra={"duration": 1.5})
+                try:
+                    raise ValueError("boom")
+                except ValueError:
+                    logger.exception("Error processing file %s", "chats/a.txt")
+            logger.info("Outside any file")
+        finally:
+            stop_logging()
+            setup_logger("INFO", os.devnull)
+
+        with open(log_file, "r") as f:
+            records = [json.loads(line) for line in f]
+
+        # Assertions
+        assert records[0]["message"] == "Finished chats/a.txt in 1.50s"
+        assert records[0]["file_id"] == file_id
+        assert records[0]["file"] == "chats/a.txt"
+        assert records[0]["duration"] == 1.5
+        assert records[1]["file_id"] == file_id
+        assert "ValueError: boom" in records[1]["exception"]
+        assert "file_id" not in records[2]
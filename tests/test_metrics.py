@@ -0,0 +1,147 @@
+"""
+Tests for the metrics module.
+"""
+
+import time
+import pytest
+import litellm
+from unittest.mock import patch, MagicMock
+from src import metrics
+from src.metrics import Histogram, RunMetrics
+from src.file_parser import parse_path
+from src.llm_client import LLMClient
+
+
+@pytest.fixture
+def recorder():
+    """Activate a fresh recorder for the test."""
+    run_metrics = RunMetrics(slowest=2)
+    metrics.activate(run_metrics)
+    yield run_metrics
+    metrics.activate(None)
+
+
+def test_histogram_quantiles():
+    """Test bucket counts and quantile estimates."""
+    histogram = Histogram()
+    for value in [0.004] * 90 + [0.2] * 9 + [3.0]:
+        histogram.observe(value)
+
+    snapshot = histogram.snapshot()
+
+    # Assertions
+    assert snapshot["count"] == 100
+    assert snapshot["p50"] == 0.005
+    assert snapshot["p95"] == 0.25
+    assert snapshot["max"] == 3.0
+    assert snapshot["buckets"]["0.005"] == 90
+    assert snapshot["buckets"]["+Inf"] == 100
+
+
+def test_helpers_are_noops_without_recorder():
+    """Test that instrumentation costs nothing when metrics are off."""
+    with metrics.file_scope("a.txt"), metrics.timed("parse"):
+        metrics.count("retries")
+
+    # Assertions
+    assert metrics.active() is None
+
+
+def test_file_scope_attribution(recorder):
+    """Test per-file attribution, batch splitting and nested scopes."""
+    with metrics.file_scope("a.txt"):
+        metrics.observe("parse", 0.2)
+        with metrics.file_scope("a.txt"):
+            metrics.observe("llm_call", 1.0)
+    with metrics.file_scope(["b.txt", "c.txt"]):
+        metrics.observe("llm_call", 2.0)
+        metrics.count("retries")
+    metrics.observe("discovery", 0.1)
+
+    report = recorder.report()
+
+    # Assertions
+    assert report["files"]["a.txt"]["seconds"] == {"llm_call": 1.0, "parse": 0.2}
+    assert report["files"]["b.txt"]["seconds"]["llm_call"] == 1.0
+    assert report["files"]["c.txt"]["counts"]["retries"] == 1
+    assert report["stages"]["llm_call"]["count"] == 2
+    assert report["stages"]["discovery"]["sum"] == 0.1
+    assert report["retries"]["retries"] == 1
+    assert report["files_processed"] == 3
+
+
+def test_slowest_files(recorder):
+    """Test that the report lists the files with the most wall-clock time."""
+    for path, seconds in (("fast.txt", 0.0), ("slow.txt", 0.03), ("medium.txt", 0.01)):
+        with metrics.file_scope(path):
+            time.sleep(seconds)
+
+    report = recorder.report()
+
+    # Assertions
+    assert [entry["path"] for entry in report["slowest_files"]] == ["slow.txt", "medium.txt"]
+    assert report["per_file"]["total"]["count"] == 3
+
+
+
+def test_report_without_file_records():
+    """Test that files are folded into the per-file histograms and slowest list as they finish."""
+    recorder = RunMetrics(slowest=2, keep_files=False)
+    metrics.activate(recorder)
+    try:
+        for path, seconds in (("fast.txt", 0.0), ("slow.txt", 0.03), ("medium.txt", 0.01)):
+            with metrics.file_scope(path):
+                metrics.observe("parse", 0.1)
+                time.sleep(seconds)
+        held = len(recorder.files)
+        report = recorder.report()
+    finally:
+        metrics.activate(None)
+
+    # Assertions
+    assert held == 0
+    assert report["files"] == {}
+    assert report["files_processed"] == 3
+    assert [entry["path"] for entry in report["slowest_files"]] == ["slow.txt", "medium.txt"]
+    assert report["slowest_files"][0]["seconds"] == {"parse": 0.1}
+    assert report["per_file"]["total"]["count"] == 3
+    assert report["per_file"]["parse"]["sum"] == 0.3
+
+
+def test_parse_and_read_are_timed(recorder, tmp_path):
+    """Test that reading and parsing a file are recorded as separate stages."""
+    chat = tmp_path / "chat.txt"
+    chat.write_text("User: Hello\nAssistant: Hi\n", encoding="utf-8")
+
+    with metrics.file_scope(str(chat)):
+        parse_path(str(chat))
+
+    seconds = recorder.report()["files"][str(chat)]["seconds"]
+
+    # Assertions
+    assert set(seconds) == {"read", "parse"}
+
+
+@patch("src.llm_client.completion")
+def test_llm_calls_retries_and_sleeps_are_recorded(mock_completion, recorder):
+    """Test that provider calls, retries with their backoff and rate-limit sleeps are recorded."""
+    mock_response = MagicMock()
+    mock_response.choices[0].message.content = "A chat about AI."
+    error = litellm.RateLimitError("slow down", model="test-provider", llm_provider="test")
+    mock_completion.side_effect = [error, mock_response, mock_response]
+    client = LLMClient("test-provider", rate_limit_delay=0.01)
+
+    with patch("src.llm_client.LLMClient._retry_wait", return_value=0), metrics.file_scope("chat.txt"):
+        client.summarize(["Let's talk about AI"])
+        client.summarize(["Let's talk about AI again"])
+
+    report = recorder.report(client)
+
+    # Assertions
+    assert report["stages"]["llm_call"]["count"] == 3
+    assert report["retries"]["retries"] == 1
+    assert report["retries"]["by_error"] == {"RateLimitError": 1}
+    assert report["retries"]["rate_limit_sleeps"] >= 1
+    assert report["counters"]["llm_errors"] == 1
+    assert report["files"]["chat.txt"]["counts"]["llm_call"] == 3
+    assert report["cache"]["coalesced_requests"] == 0
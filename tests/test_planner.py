@@ -0,0 +1,59 @@
+"""
+Tests for the planner module.
+"""
+
+import os
+import tempfile
+import pytest
+from unittest.mock import patch
+from src.planner import build_plan, estimate_file, plan_settings, PROMPT_OVERHEAD_TOKENS
+
+
+@pytest.fixture
+def corpus():
+    """Create a small corpus with one duplicate and one long chat."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        paths = []
+        chat = "\n".join(f"User: question number {i} about python packaging and wheels" for i in range(10))
+        for name, content in (("a.txt", chat), ("b.txt", chat), ("c.txt", "User: Hello\nAssistant: Hi")):
+            path = os.path.join(tmpdir, name)
+            with open(path, "w") as f:
+                f.write(content)
+            paths.append(path)
+        yield paths
+
+
+def test_estimate_file(corpus):
+    """Test the per-file estimate for a single-session chat."""
+    estimate = estimate_file(corpus[2], plan_settings())
+
+    # Assertions
+    assert estimate["message_count"] == 2
+    assert estimate["requests"] == 2
+    assert estimate["input_tokens"] > 2 * PROMPT_OVERHEAD_TOKENS
+    assert estimate["batchable_tokens"] > 0
+
+
+def test_build_plan_with_dedup_and_batching(corpus):
+    """Test that duplicates are skipped and small chats are packed into batch requests."""
+    with patch("src.planner.Config.DEDUP_ENABLED", True):
+        plan = build_plan(corpus, "gpt-4o-mini", batch_token_budget=4000, rate_limit_delay=1.0, request_latency=2.0)
+
+    # Assertions
+    assert plan["files"] == 3
+    assert plan["duplicates"] == 1
+    assert plan["batched_files"] == 2
+    assert plan["requests"] == 1
+    assert plan["estimated_seconds"] == 2.0
+    assert plan["estimated_cost"] > 0
+    assert plan["file_estimates"][1]["duplicate_of"] == corpus[0]
+
+
+def test_build_plan_unknown_model(corpus):
+    """Test that unpriced models give no cost estimate instead of failing."""
+    plan = build_plan(corpus, "no-such/model", workers=1)
+
+    # Assertions
+    assert plan["requests"] == 6
+    assert plan["estimated_cost"] is None
+    assert plan["estimated_seconds"] == 12.0
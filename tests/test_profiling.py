@@ -0,0 +1,129 @@
+"""
+Tests for the profiling module.
+"""
+
+import os
+import json
+import time
+import asyncio
+import pytest
+from src import profiling
+from src.profiling import Profiler, CPUSampler, MemoryProfiler, LoopLagMonitor
+
+
+def burn_cpu(seconds):
+    """Keep the CPU busy for ``seconds`` of process time."""
+    end = time.process_time() + seconds
+    total = 0
+    while time.process_time() < end:
+        total += sum(i * i for i in range(200))
+    return total
+
+
+def block_loop(seconds):
+    """Block the calling thread, and with it any event loop running on it."""
+    time.sleep(seconds)
+
+
+def test_cpu_sampler_finds_hot_function(tmp_path):
+    """Test that the sampler attributes CPU time to the busy function."""
+    sampler = CPUSampler(interval=0.002)
+    sampler.start()
+    try:
+        burn_cpu(0.2)
+    finally:
+        sampler.stop()
+
+    summary = sampler.summary()
+    paths = sampler.write(str(tmp_path))
+
+    # Assertions
+    assert summary["samples"] > 10
+    hot = [entry for entry in summary["top_total"] if entry["function"].startswith("burn_cpu ")]
+    assert hot and hot[0]["percent"] > 80
+    with open(paths[0], encoding="utf-8") as f:
+        stack, count = f.readline().rsplit(" ", 1)
+    assert "burn_cpu" in stack
+    assert int(count) > 0
+
+
+def test_memory_profiler_reports_top_allocators(tmp_path):
+    """Test that per-stage allocations point at the allocating line."""
+    profiler = MemoryProfiler(top=5)
+    profiler.start()
+    try:
+        with profiler.stage("allocate"):
+            data = [bytearray(1024) for _ in range(2000)]
+        del data
+    finally:
+        profiler.stop()
+
+    paths = profiler.write(str(tmp_path))
+    with open(paths[0], encoding="utf-8") as f:
+        report = json.load(f)
+
+    stage = report["stages"][0]
+
+    # Assertions
+    assert stage["stage"] == "allocate"
+    assert stage["peak_mb"] >= 1.5
+    assert "test_profiling.py" in stage["top_allocators"][0]["location"]
+
+
+def test_loop_monitor_captures_blocking_stack(tmp_path):
+    """Test that a blocked event loop is measured and the blocking call identified."""
+    monitor = LoopLagMonitor(interval=0.02, threshold=0.1)
+    monitor.start()
+
+    async def run():
+        async with monitor.watch():
+            await asyncio.sleep(0.05)
+            block_loop(0.3)
+            await asyncio.sleep(0.05)
+
+    try:
+        asyncio.run(run())
+    finally:
+        monitor.stop()
+
+    paths = monitor.write(str(tmp_path))
+    with open(paths[0], encoding="utf-8") as f:
+        report = json.load(f)
+
+    # Assertions
+    assert report["stalls"] >= 1
+    assert report["lag"]["max"] >= 0.2
+    assert any("block_loop" in frame for frame in report["blocking_stacks"][0]["stack"])
+
+
+def test_profiler_hooks(tmp_path):
+    """Test the module-level hooks with and without an active profiler."""
+    with profiling.stage("idle"):
+        pass
+
+    profiler = Profiler(["memory", "loop"])
+    profiler.start()
+    try:
+        with profiling.stage("work"):
+            [bytearray(100) for _ in range(100)]
+
+        async def run():
+            async with profiling.watch_loop():
+                await asyncio.sleep(0.06)
+
+        asyncio.run(run())
+    finally:
+        profiler.stop()
+
+    paths = profiler.write(str(tmp_path))
+
+    # Assertions
+    assert sorted(os.path.basename(path) for path in paths) == ["profile_loop.json", "profile_memory.json"]
+    assert [stage["stage"] for stage in profiler.memory.stages] == ["work"]
+    assert profiler.loop.lag.count >= 1
+
+
+def test_invalid_mode():
+    """Test that unknown profile modes are rejected."""
+    with pytest.raises(ValueError):
+        Profiler(["gpu"])
@@ -0,0 +1,73 @@
+"""
+Tests for the progress module.
+"""
+
+import io
+import pytest
+from unittest.mock import patch
+from src import progress
+from src.progress import Progress
+
+
+def test_eta_uses_remaining_tokens(make_files):
+    """Test that the ETA follows the estimated tokens left, not the file count."""
+    paths = make_files([400, 400, 400, 4000])
+    tracker = Progress(paths, mode="log")
+
+    with patch("src.progress.time.monotonic", side_effect=[tracker.started + 10] * 2):
+        tracker.advance(paths[:3])
+        file_rate, token_rate = tracker.rates()
+
+    # Assertions
+    assert tracker.total_tokens == 1300
+    # The elapsed time is measured from an arbitrary monotonic start, so it is only 10s up to rounding
+    assert file_rate == pytest.approx(0.3)
+    assert token_rate == pytest.approx(30.0)
+    # Three quarters of the files are done, but most of the tokens are left
+    assert round(tracker.eta(token_rate)) == 33
+    assert tracker.eta(0.0) is None
+
+
+def test_bar_on_terminal(make_files):
+    """Test that the bar is redrawn in place and finished with a newline."""
+    paths = make_files([40, 40])
+    stream = io.StringIO()
+    stream.isatty = lambda: True
+    tracker = Progress(paths, mode="auto", interval=0.01, stream=stream)
+
+    tracker.start()
+    progress.advance(paths[0])
+    progress.advance([paths[1]])
+    tracker.stop()
+    progress.advance(paths[0])
+
+    output = stream.getvalue()
+
+    # Assertions
+    assert tracker.mode == "bar"
+    assert tracker.files_done == 2
+    assert output.startswith("\r[")
+    assert output.endswith("ETA 0s\x1b[K\n")
+    assert "[2/2 100.0%]" in output
+
+
+def test_log_lines_when_not_a_terminal(make_files):
+    """Test that progress degrades to log lines without a terminal."""
+    paths = make_files([40])
+
+    with patch("src.progress.logger") as mock_logger:
+        with progress.track(paths, "auto") as tracker:
+            progress.advance(paths[0])
+
+    # Assertions
+    assert tracker.mode == "log"
+    assert mock_logger.info.call_args[0][0].startswith("Progress: [1/1 100.0%]")
+
+
+def test_off():
+    """Test that tracking can be turned off."""
+    with progress.track(["a.txt"], "off") as tracker:
+        progress.advance("a.txt")
+
+    # Assertions
+    assert tracker is None
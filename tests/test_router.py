@@ -0,0 +1,73 @@
+"""
+Tests for the router module.
+"""
+
+import random
+import pytest
+from src.router import ProviderRouter, parse_provider_spec
+
+
+def test_parse_provider_spec():
+    """Test parsing weighted provider lists."""
+    assert parse_provider_spec("gemini/gemini-2.0-flash=3, openai/gpt-4o-mini") == [
+        ("gemini/gemini-2.0-flash", 3.0),
+        ("openai/gpt-4o-mini", 1.0),
+    ]
+
+    with pytest.raises(ValueError):
+        parse_provider_spec("model=heavy")
+
+
+def test_choose_respects_weights():
+    """Test that weights bias provider selection."""
+    router = ProviderRouter([("a", 9), ("b", 1)], rng=random.Random(0))
+
+    picks = [router.choose() for _ in range(1000)]
+
+    # Assertions
+    assert picks.count("a") > 800
+
+
+def test_choose_prefers_faster_provider():
+    """Test that observed latency shifts traffic to the faster provider."""
+    router = ProviderRouter([("slow", 1), ("fast", 1)], rng=random.Random(0))
+    for _ in range(10):
+        router.record("slow", 5.0, True)
+        router.record("fast", 0.5, True)
+
+    picks = [router.choose() for _ in range(1000)]
+
+    # Assertions
+    assert picks.count("fast") > 800
+
+
+def test_failing_provider_is_skipped():
+    """Test failover away from a provider that just errored."""
+    router = ProviderRouter([("a", 100), ("b", 1)], rng=random.Random(0))
+    router.record("a", 0.1, False)
+
+    # Assertions
+    assert all(router.choose() == "b" for _ in range(50))
+    assert router.snapshot()["a"]["failures"] == 1
+    assert router.alternate("b") == "b"
+
+
+def test_hedge_delay_needs_samples():
+    """Test that hedging waits for enough latency samples."""
+    router = ProviderRouter([("a", 1)], hedge_percentile=90, hedge_min_samples=10)
+
+    for latency in range(1, 10):
+        router.record("a", latency / 10, True)
+    assert router.hedge_delay("a") is None
+
+    router.record("a", 1.0, True)
+    assert router.hedge_delay("a") == 1.0
+
+
+def test_hedge_multiplier():
+    """Test that the hedge delay scales with the multiplier for straggler re-issue."""
+    router = ProviderRouter([("a", 1)], hedge_percentile=95, hedge_min_samples=1, hedge_multiplier=3)
+    router.record("a", 2.0, True)
+
+    # Assertions
+    assert router.hedge_delay("a") == 6.0
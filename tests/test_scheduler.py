@@ -0,0 +1,69 @@
+"""
+Tests for the scheduling module.
+"""
+
+import os
+import heapq
+import pytest
+from src.scheduler import schedule, sort_key, priority_rank
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    """Files of different sizes and ages, in discovery order."""
+    paths = []
+    for i, (name, size) in enumerate([("a.txt", 300), ("b.txt", 100), ("c.txt", 5000), ("d.txt", 200)]):
+        path = tmp_path / name
+        path.write_text("x" * size, encoding="utf-8")
+        # a.txt is the oldest, d.txt the newest
+        os.utime(path, (1_000_000 + i, 1_000_000 + i))
+        paths.append(str(path))
+    return paths
+
+
+def names(paths):
+    return [os.path.basename(path) for path in paths]
+
+
+def test_policies(corpus):
+    """Test the order of each policy; ties keep discovery order."""
+    # Assertions
+    assert schedule(corpus) == corpus
+    assert names(schedule(corpus, "newest")) == ["d.txt", "c.txt", "b.txt", "a.txt"]
+    assert names(schedule(corpus, "smallest")) == ["b.txt", "d.txt", "a.txt", "c.txt"]
+    assert names(schedule(corpus, "largest")) == ["c.txt", "a.txt", "d.txt", "b.txt"]
+    assert names(schedule(corpus, "cached", cached={corpus[3], corpus[1]})) == ["b.txt", "d.txt", "a.txt", "c.txt"]
+    with pytest.raises(ValueError):
+        schedule(corpus, "random")
+
+
+def test_priority_paths(corpus, tmp_path):
+    """Test that explicit priority paths go first, in the order given, ahead of the policy."""
+    nested = tmp_path / "urgent"
+    nested.mkdir()
+    (nested / "e.txt").write_text("x", encoding="utf-8")
+    files = corpus + [str(nested / "e.txt")]
+
+    ordered = schedule(files, "largest", priority_paths=[corpus[3], str(nested), str(tmp_path / "b.*")])
+
+    # Assertions
+    assert names(ordered) == ["d.txt", "e.txt", "b.txt", "c.txt", "a.txt"]
+    # A directory only matches the files below it
+    assert priority_rank(str(tmp_path / "urgent-old.txt"), [str(nested)]) == 1
+    # Vanished files sort after existing ones
+    assert sort_key("largest")(str(tmp_path / "missing.txt")) > sort_key("largest")(corpus[0])
+
+
+def test_largest_first_shortens_makespan(corpus):
+    """Test that starting the longest chat first finishes sooner with concurrent workers."""
+
+    def makespan(ordered, workers=2):
+        # Each file goes to the worker that frees up first; processing time grows with size
+        finish = [0.0] * workers
+        for path in ordered:
+            heapq.heapreplace(finish, finish[0] + os.path.getsize(path))
+        return max(finish)
+
+    # Assertions
+    assert makespan(schedule(corpus, "largest")) < makespan(schedule(corpus, "smallest"))
+    assert makespan(schedule(corpus, "largest")) == os.path.getsize(corpus[2])
@@ -0,0 +1,81 @@
+"""
+Tests for the segmenter module.
+"""
+
+import pytest
+from datetime import datetime
+from src.file_parser import TimedMessages
+from src.segmenter import segment_messages, parse_message_time, parse_time_value
+
+
+def test_parse_message_time():
+    """Test extracting leading timestamps from message lines."""
+    assert parse_message_time("[2024-01-05 10:32] alice: hi") == datetime(2024, 1, 5, 10, 32)
+    assert parse_message_time("2024/01/05T10:32:11 bob: hello") == datetime(2024, 1, 5, 10, 32, 11)
+    assert parse_message_time("alice: no timestamp here") is None
+
+
+def test_parse_time_value():
+    """Test converting JSON timestamp values."""
+    assert parse_time_value("2024-01-05T10:32:00Z") == datetime(2024, 1, 5, 10, 32)
+    assert parse_time_value(1704450720) == datetime.fromtimestamp(1704450720)
+    assert parse_time_value(1704450720000) == datetime.fromtimestamp(1704450720)
+    assert parse_time_value("yesterday") is None
+
+
+def test_segment_by_time_gap():
+    """Test that idle gaps start new sessions."""
+    messages = [
+        "[2024-01-05 10:00] alice: hi",
+        "[2024-01-05 10:05] bob: hello",
+        "[2024-01-07 09:00] alice: back again",
+        "[2024-01-07 09:01] bob: welcome back",
+    ]
+
+    sessions = segment_messages(messages, gap_minutes=120, max_chars=0)
+
+    # Assertions
+    assert len(sessions) == 2
+    assert (sessions[0]["start"], sessions[0]["end"]) == (0, 2)
+    assert (sessions[1]["start"], sessions[1]["end"]) == (2, 4)
+    assert sessions[1]["start_time"] == "2024-01-07T09:00:00"
+    assert sessions[1]["end_time"] == "2024-01-07T09:01:00"
+
+
+def test_segment_by_size():
+    """Test that sessions are capped by character count."""
+    messages = ["x" * 40] * 10
+
+    sessions = segment_messages(messages, gap_minutes=0, max_chars=100)
+
+    # Assertions
+    assert len(sessions) == 5
+    assert sum(s["end"] - s["start"] for s in sessions) == 10
+    assert all(s["char_count"] <= 100 for s in sessions)
+
+
+def test_segment_caps_session_count():
+    """Test that adjacent sessions are merged to stay within the session limit."""
+    messages = ["x" * 40] * 10
+
+    sessions = segment_messages(messages, gap_minutes=0, max_chars=100, max_sessions=2)
+
+    # Assertions
+    assert [(s["index"], s["start"], s["end"]) for s in sessions] == [(1, 0, 4), (2, 4, 10)]
+    assert sum(s["char_count"] for s in sessions) == 10 * 41
+
+
+def test_segment_uses_parser_times():
+    """Test that timestamps supplied by the parser take precedence."""
+    messages = TimedMessages(["hi", "hello", "later"], ["2024-01-05T10:00:00", "2024-01-05T10:01:00", 1704800000])
+
+    sessions = segment_messages(messages, gap_minutes=60, max_chars=0)
+
+    # Assertions
+    assert len(sessions) == 2
+    assert sessions[1]["start"] == 2
+
+
+def test_segment_empty_messages():
+    """Test segmenting an empty message list."""
+    assert segment_messages([], gap_minutes=60, max_chars=100) == []
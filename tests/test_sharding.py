@@ -0,0 +1,98 @@
+"""
+Tests for the sharding module.
+"""
+
+import os
+import json
+import pytest
+from src.sharding import parse_shard, shard_of, select_shard, shard_filename, write_manifest, merge_shards
+from src.index_builder import build_index
+
+
+def test_parse_shard():
+    """Test shard specifications."""
+    assert parse_shard("0/4") == (0, 4)
+    assert parse_shard("3/4") == (3, 4)
+    for spec in ("4/4", "-1/4", "1/0", "1", "a/b", "1/2/3"):
+        with pytest.raises(ValueError):
+            parse_shard(spec)
+
+
+def test_partition_is_deterministic_and_complete():
+    """Test that every file lands in exactly one shard, independent of the mount point."""
+    relative = [f"chats/{i:03d}.txt" for i in range(200)]
+    shards = [
+        select_shard([os.path.join("/mnt/a", path) for path in relative], "/mnt/a", index, 4) for index in range(4)
+    ]
+
+    # Assertions
+    assert sorted(path for shard in shards for path in shard) == sorted(os.path.join("/mnt/a", path) for path in relative)
+    assert all(30 < len(shard) < 70 for shard in shards)
+    assert all(
+        shard_of(os.path.join("/mnt/a", path), "/mnt/a", 4) == shard_of(os.path.join("/data/b", path), "/data/b", 4)
+        for path in relative
+    )
+
+
+def write_shard(output_dir, index, count, entries, cost):
+    """Write a shard's partial index and manifest as a sharded run would."""
+    build_index(
+        {"files": entries},
+        str(output_dir),
+        shard_filename("chat_index.json", index, count),
+        shard_filename("chat_summaries.md", index, count),
+    )
+    usage = {"total": {"requests": len(entries), "input_tokens": 100, "output_tokens": 10, "cost": cost}}
+    chat_files = [entry["path"] for entry in entries if "parent" not in entry]
+    write_manifest(str(output_dir), index, count, "/chats", chat_files, entries, usage)
+
+
+def entry(path, **extra):
+    """Index entry for ``path``."""
+    return {"filename": os.path.basename(path), "path": path, "timestamp": "", "topics": [], "summary": path, **extra}
+
+
+def test_merge_shards(tmp_path):
+    """Test that shard outputs from several directories merge into one index ordered by path."""
+    write_shard(tmp_path / "host-a", 0, 2, [entry("/chats/b.txt"), entry("/chats/b.txt", parent="/chats/b.txt")], 0.5)
+    write_shard(tmp_path / "host-b", 1, 2, [entry("/chats/a.txt"), entry("/chats/c.txt")], 0.25)
+
+    index_data = merge_shards([str(tmp_path / "host-a"), str(tmp_path / "host-b")], "chat_index.json")
+
+    # Assertions
+    assert [(e["path"], "parent" in e) for e in index_data["files"]] == [
+        ("/chats/a.txt", False),
+        ("/chats/b.txt", False),
+        ("/chats/b.txt", True),
+        ("/chats/c.txt", False),
+    ]
+    assert index_data["metadata"]["shards"] == 2
+    assert index_data["metadata"]["usage"]["total"] == {"requests": 4, "input_tokens": 200, "output_tokens": 20, "cost": 0.75}
+
+
+def test_merge_rejects_incomplete_runs(tmp_path):
+    """Test that a missing shard or mixed shard counts fail the merge."""
+    write_shard(tmp_path, 0, 3, [entry("/chats/a.txt")], 0.0)
+    with pytest.raises(ValueError, match="Missing shards 1, 2 of 3"):
+        merge_shards([str(tmp_path)], "chat_index.json")
+
+    write_shard(tmp_path, 0, 2, [entry("/chats/a.txt")], 0.0)
+    with pytest.raises(ValueError, match="different shard counts"):
+        merge_shards([str(tmp_path)], "chat_index.json")
+
+    with pytest.raises(ValueError, match="No shard manifests"):
+        merge_shards([str(tmp_path / "empty")], "chat_index.json")
+
+
+def test_manifest_lists_unprocessed_files(tmp_path):
+    """Test that the manifest records files the shard did not finish."""
+    path = write_manifest(str(tmp_path), 1, 2, "/chats", ["/chats/a.txt", "/chats/b.txt"], [entry("/chats/a.txt")])
+
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    # Assertions
+    assert os.path.basename(path) == "manifest.shard-1-of-2.json"
+    assert manifest["files"] == 2
+    assert manifest["processed"] == 1
+    assert manifest["missing"] == ["b.txt"]
@@ -0,0 +1,34 @@
+"""
+Tests for the directory watcher module.
+"""
+
+import os
+from src.watcher import DirectoryWatcher
+
+
+def test_poll_debounces_and_detects_changes(tmp_path):
+    """Test that new, modified and deleted files are reported once they settle."""
+    (tmp_path / "nested").mkdir()
+    first = tmp_path / "first.txt"
+    first.write_text("User: Hi", encoding="utf-8")
+    (tmp_path / "notes.log").write_text("ignored", encoding="utf-8")
+    watcher = DirectoryWatcher(str(tmp_path), ["txt", ".json"], debounce=1.0)
+
+    # Files present at startup are taken as known right away
+    assert watcher.prime() == [str(first)]
+
+    second = tmp_path / "nested" / "second.json"
+    second.write_text("{}", encoding="utf-8")
+    # Seen but not settled yet
+    assert watcher.poll(now=100.0) == ([], [])
+    # Still being written: the debounce starts over
+    second.write_text('{"messages": []}', encoding="utf-8")
+    assert watcher.poll(now=100.8) == ([], [])
+    assert watcher.poll(now=101.2) == ([], [])
+    assert watcher.poll(now=101.9) == ([str(second)], [])
+    assert watcher.poll(now=103.0) == ([], [])
+
+    first.write_text("User: Hi again", encoding="utf-8")
+    os.remove(second)
+    assert watcher.poll(now=104.0) == ([], [str(second)])
+    assert watcher.poll(now=105.0) == ([str(first)], [])
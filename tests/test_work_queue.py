@@ -0,0 +1,106 @@
+"""
+Tests for the work queue module.
+"""
+
+import time
+import threading
+from src.work_queue import JobQueue
+
+
+def test_lease_largest_first_and_complete(make_files, tmp_path):
+    """Test exclusive leases in size order and stored results."""
+    small, large = make_files([10, 1000])
+    worker_a = JobQueue(str(tmp_path / "jobs.db"), worker_id="a")
+    worker_b = JobQueue(str(tmp_path / "jobs.db"), worker_id="b")
+
+    # Assertions
+    assert worker_a.enqueue([small, large]) == 2
+    assert worker_b.enqueue([small]) == 0
+    assert worker_a.lease() == large
+    assert worker_b.lease() == small
+    assert worker_a.lease() is None
+    assert not worker_a.drained()
+
+    assert worker_b.complete(small, [{"path": small, "summary": "small"}])
+    assert worker_a.complete(large, [{"path": large, "summary": "large"}, {"path": large, "parent": large}])
+    assert worker_a.drained()
+    assert [entry["path"] for entry in worker_b.results()] == [small, large, large]
+
+
+def test_expired_lease_is_reassigned(make_files, tmp_path):
+    """Test that a crashed worker's file goes to another worker and poison files end up failed."""
+    (path,) = make_files([10])
+    crashed = JobQueue(str(tmp_path / "jobs.db"), lease_seconds=0.05, max_attempts=2, worker_id="crashed")
+    other = JobQueue(str(tmp_path / "jobs.db"), lease_seconds=0.05, max_attempts=2, worker_id="other")
+    crashed.enqueue([path])
+
+    assert crashed.lease() == path
+    assert other.lease() is None
+    time.sleep(0.1)
+    assert other.lease() == path
+    # The original worker learns that it lost the lease
+    assert not crashed.renew(path)
+
+    # Second expiry with no attempts left: the file is failed instead of leased again
+    time.sleep(0.1)
+    assert crashed.lease() is None
+    assert crashed.counts()["failed"] == 1
+    assert crashed.drained()
+
+
+def test_fail_retries_until_attempts_run_out(make_files, tmp_path):
+    """Test that errors give the file back until it ran out of attempts."""
+    (path,) = make_files([10])
+    queue = JobQueue(str(tmp_path / "jobs.db"), max_attempts=2)
+    queue.enqueue([path])
+
+    queue.fail(queue.lease(), "boom")
+    assert queue.counts()["pending"] == 1
+    queue.fail(queue.lease(), "boom")
+
+    # Assertions
+    assert queue.counts()["failed"] == 1
+    assert queue.lease() is None
+
+
+def test_heartbeat_keeps_lease(make_files, tmp_path):
+    """Test that heartbeats keep a long-running file away from other workers."""
+    (path,) = make_files([10])
+    worker = JobQueue(str(tmp_path / "jobs.db"), lease_seconds=0.2, worker_id="busy")
+    other = JobQueue(str(tmp_path / "jobs.db"), lease_seconds=0.2, worker_id="other")
+    worker.enqueue([path])
+
+    with worker.heartbeat(worker.lease(), interval=0.05):
+        time.sleep(0.5)
+        stolen = other.lease()
+
+    # Assertions
+    assert stolen is None
+
+
+def test_concurrent_workers_lease_each_file_once(make_files, tmp_path):
+    """Test that concurrent workers share the jobs without processing a file twice."""
+    paths = make_files(range(1, 41))
+    JobQueue(str(tmp_path / "jobs.db")).enqueue(paths)
+    processed = []
+
+    def work(worker_id):
+        queue = JobQueue(str(tmp_path / "jobs.db"), worker_id=worker_id)
+        while True:
+            path = queue.lease()
+            if path is None:
+                return
+            processed.append(path)
+            queue.complete(path, [{"path": path, "worker": worker_id}])
+
+    threads = [threading.Thread(target=work, args=(f"w{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    results = JobQueue(str(tmp_path / "jobs.db")).results()
+
+    # Assertions
+    assert sorted(processed) == sorted(paths)
+    assert len(results) == len(paths)